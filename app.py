@@ -1,11 +1,30 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, make_response, stream_with_context
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from http import HTTPStatus
-
-from src.settings import config
-from src.run_api import run_text2sql_api
+import os
+import sys
+import json
+import logging
+import threading
+
+from src.settings import config, sqldb_path, get_app_context
+from src.run_api import run_text2sql_api, stream_text2sql_api, run_text2sql_batch, parse_query_request, parse_batch_request
+from src.metrics import render_metrics
+from src.shared_store import SharedRateLimitStorage  # Registers the shared store schemes for `storage_uri`
+from src.utility import get_table_versions
+from src.http_cache import (
+    NO_STORE,
+    REVALIDATE,
+    PRIVATE_REVALIDATE,
+    StaticAssets,
+    CompressionPolicy,
+    answer_etag,
+    etag_matches,
+)
+
+logger = logging.getLogger("src.server")
 
 
 class Text2SQLServer:
@@ -20,13 +39,19 @@ class Text2SQLServer:
         # Load server configuration
         self.server_config = self.config.get('server', {'host':'0.0.0.0', 'port':5001, 'debug':False})
 
-        # Setup rate limiter
+        # Setup rate limiter, shared by all workers when a shared store is configured
         self.limiter = Limiter(
             get_remote_address,
             app=self.app,
-            default_limits=["50 per minute"]  # Limit API usage
+            default_limits=[self.server_config.get('rate_limit', "50 per minute")],  # Limit API usage
+            storage_uri=self.config.get('shared_store', {}).get('uri', "memory://"),
         )
 
+        # Setup fingerprinted static URLs and response compression
+        self.static_assets = StaticAssets(self.app.static_folder, max_age=self.server_config.get('static_max_age', 31_536_000))
+        self.compression = CompressionPolicy(**self.server_config.get('compression', {}))
+        self.app.jinja_env.globals["static_url"] = self.static_assets.url
+
         # Register routes and configurations
         self.register_routes()
         self.setup_global_configs()
@@ -35,8 +60,16 @@ class Text2SQLServer:
     def register_routes(self):
         """Register all API routes"""
         self.app.add_url_rule(rule='/', endpoint='home', view_func=self.home)
-        self.app.add_url_rule(rule='/run_api', endpoint='text2sql', view_func=self.text2sql_endpoint, methods=['POST'], )
+        self.app.add_url_rule(rule='/run_api', endpoint='text2sql', view_func=self.text2sql_endpoint, methods=['GET', 'POST'])
+        self.app.add_url_rule(rule='/run_api/stream', endpoint='text2sql_stream', view_func=self.text2sql_stream_endpoint, methods=['GET', 'POST'])
+        self.app.add_url_rule(rule='/run_api/batch', endpoint='text2sql_batch', view_func=self.text2sql_batch_endpoint, methods=['POST'])
         self.app.add_url_rule(rule='/health', endpoint='health_check', view_func=self.health_check, methods=['GET'])
+        self.app.add_url_rule(rule='/index_advisor', endpoint='index_advisor', view_func=self.index_advisor_report, methods=['GET'])
+        self.app.add_url_rule(rule='/metrics', endpoint='metrics', view_func=self.metrics, methods=['GET'])
+
+        # Probes and scrapers are not rate limited (static files are exempt by default)
+        self.limiter.exempt(self.health_check)
+        self.limiter.exempt(self.metrics)
 
 
     def setup_global_configs(self):
@@ -44,10 +77,17 @@ class Text2SQLServer:
         
         @self.app.after_request
         def add_headers(response):
-            """Modify headers to disable caching and improve security"""
-            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-            response.headers["Pragma"] = "no-cache"
-            response.headers["Expires"] = "0"
+            """Apply the per-route cache policy, compress large responses and improve security"""
+            if request.endpoint == 'static':
+                filename = (request.view_args or {}).get('filename', '')
+                response.headers["Cache-Control"] = self.static_assets.cache_control(filename, request.args.get('v'))
+            elif "Cache-Control" not in response.headers:
+                # Routes without their own policy are never cached
+                response.headers["Cache-Control"] = NO_STORE
+                response.headers["Pragma"] = "no-cache"
+                response.headers["Expires"] = "0"
+
+            self.compress_response(response)
 
             # Security headers
             # response.headers["X-Frame-Options"] = "DENY"
@@ -58,43 +98,154 @@ class Text2SQLServer:
             return response
 
 
+    def compress_response(self, response):
+        """Compress a complete response body with gzip or brotli when the client accepts it"""
+        if not self.compression.compressible(response.mimetype):
+            return
+        response.vary.add("Accept-Encoding")
+        if response.is_streamed or response.direct_passthrough or "Content-Encoding" in response.headers:
+            return
+
+        encoding = self.compression.encoding_for(request.headers.get("Accept-Encoding"), response.mimetype, response.content_length)
+        if encoding is None:
+            return
+        response.set_data(self.compression.compress(response.get_data(), encoding))
+        response.headers["Content-Encoding"] = encoding
+
+
     def home(self):
-        """Render the index.html template."""
-        return render_template("index.html")
+        """Render the index.html template (revalidated by ETag, as it links the current static fingerprints)."""
+        response = make_response(render_template("index.html"))
+        response.headers["Cache-Control"] = REVALIDATE
+        response.add_etag()
+        return response.make_conditional(request)
 
 
     def text2sql_endpoint(self):
-        """Endpoint to handle Text2SQL queries and return the result"""
+        """Endpoint to handle Text2SQL queries and return the result (conditional on the question and data version)"""
+        try:
+            data = request.get_json(silent=True) if request.method == 'POST' else request.args
+
+            try:
+                query = parse_query_request(data)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), HTTPStatus.BAD_REQUEST
+
+            # The answer only changes with the data, so a client holding it is told so without running the pipeline
+            etag = answer_etag(query, get_table_versions(sqldb_path))
+            if etag_matches(request.headers.get("If-None-Match"), etag):
+                response = Response(status=HTTPStatus.NOT_MODIFIED)
+            else:
+                result = run_text2sql_api(query)
+                response = jsonify({'status':'success', 'result':result})
+                if result.get("failed"):
+                    # A failure is not the answer for this data version; the client asks again
+                    return response
+
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = PRIVATE_REVALIDATE
+            return response
+
+        except Exception as e:
+            return jsonify({'status':'error', 'message': str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+    def text2sql_stream_endpoint(self):
+        """Endpoint streaming stage progress and the final response tokens as server-sent events"""
+        data = request.get_json(silent=True) or request.args
+
+        try:
+            query = parse_query_request(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), HTTPStatus.BAD_REQUEST
+
+        def generate():
+            try:
+                for event, payload in stream_text2sql_api(query):
+                    yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
+
+        response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+        response.headers["X-Accel-Buffering"] = "no"  # Disable proxy buffering
+        return response
+
+
+    def text2sql_batch_endpoint(self):
+        """Endpoint answering a list of questions, in order as JSON or as NDJSON lines in completion order"""
         try:
-            data = request.get_json()
+            queries, concurrency, stream = parse_batch_request(request.get_json(silent=True), self.config.get('batch', {}))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), HTTPStatus.BAD_REQUEST
 
-            if not data or 'query' not in data:
-                return jsonify({'error': 'Missing query parameter'}), HTTPStatus.BAD_REQUEST
+        if stream:
+            def generate():
+                for index, result in run_text2sql_batch(queries, concurrency):
+                    yield json.dumps({'index': index, 'query': queries[index], **result}) + "\n"
 
-            query = data['query']
-            result = run_text2sql_api(query)
+            return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
 
-            return jsonify({'status':'success', 'result':result}), HTTPStatus.OK
+        try:
+            results = [None] * len(queries)
+            for index, result in run_text2sql_batch(queries, concurrency):
+                results[index] = {'query': queries[index], **result}
+            return jsonify({'status':'success', 'results':results}), HTTPStatus.OK
 
         except Exception as e:
             return jsonify({'status':'error', 'message': str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
 
+    def index_advisor_report(self):
+        """Report columns used by generated SQL and the indexes proposed for them"""
+        index_advisor = get_app_context().index_advisor
+        if index_advisor is None:
+            return jsonify({'status':'error', 'message':'Index advisor is disabled'}), HTTPStatus.NOT_FOUND
+        return jsonify({'status':'success', 'result':index_advisor.report()}), HTTPStatus.OK
+
+
+    def metrics(self):
+        """Pipeline stage latencies, LLM token counts and cache hit/miss counts in Prometheus text format"""
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
     def health_check(self):
-        """Health check endpoint to verify the server status"""
-        return jsonify({'status':'healthy', 'message':'Text2SQL API is running'}), HTTPStatus.OK
+        """Health check endpoint to verify the server status (answers before models and index are loaded)"""
+        return jsonify({'status':'healthy', 'message':'Text2SQL API is running',
+                        'ready': get_app_context().ready}), HTTPStatus.OK
+
+
+    def start_warmup(self):
+        """Build the database, schema context and vector index in the background so /health answers immediately"""
+        if self.server_config.get('warmup_on_start', True):
+            threading.Thread(target=get_app_context().warmup, name="warmup", daemon=True).start()
 
 
     def run(self):
-        """Run the Flask server with configuration from config.yml"""
+        """Run the server with configuration from config.yml: gunicorn workers, or the Flask development server"""
         host = self.server_config.get('host', '0.0.0.0')
         port = self.server_config.get('port', 5001)
         debug = self.server_config.get('debug', False)
 
-        print(f"Starting Text2SQL server on {host}:{port}")
+        if not debug and self.server_config.get('runner', "gunicorn") == "gunicorn":
+            from gunicorn.app.wsgiapp import WSGIApplication
+
+            # gunicorn.conf.py reads the worker count and preloads the read-only state
+            logger.info("Starting Text2SQL server on %s:%s with %s gunicorn workers",
+                        host, port, self.server_config.get('workers', 4))
+            sys.argv = [sys.argv[0], "-c", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn.conf.py")]
+            WSGIApplication("%(prog)s [OPTIONS] [APP_MODULE]").run()
+            return
+
+        logger.info("Starting Text2SQL server on %s:%s", host, port)
+        self.start_warmup()
         self.app.run(host=host, port=port, debug=debug)
 
 
+def create_app():
+    """Application factory for WSGI servers, e.g. `gunicorn -c gunicorn.conf.py`"""
+    return Text2SQLServer().app
+
+
 if __name__ == '__main__':
     # Create and run server instance
     server = Text2SQLServer()
@@ -0,0 +1,303 @@
+import json
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from http import HTTPStatus
+from limits import parse
+from limits.storage import storage_from_string
+from limits.aio.storage import MovingWindowSupport
+from limits.aio.strategies import FixedWindowRateLimiter, MovingWindowRateLimiter
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import Response, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route, Mount, Match
+from starlette.staticfiles import StaticFiles
+from starlette.templating import Jinja2Templates
+
+from src.settings import config, sqldb_path, get_app_context
+from src.run_api import arun_text2sql_api, stream_text2sql_api, run_text2sql_batch, parse_query_request, parse_batch_request
+from src.metrics import render_metrics
+from src.shared_store import AsyncSharedRateLimitStorage  # Registers the shared store schemes for the limiter
+from src.utility import get_table_versions
+from src.http_cache import (
+    NO_STORE,
+    REVALIDATE,
+    PRIVATE_REVALIDATE,
+    StaticAssets,
+    CompressionPolicy,
+    content_etag,
+    answer_etag,
+    etag_matches,
+)
+
+logger = logging.getLogger("src.server")
+
+
+class Text2SQLAsyncServer:
+    """ASGI server class for the Text2SQL API, serving requests on a single event loop"""
+
+    # Routes that are not rate limited: static files, probes and scrapers
+    RATE_LIMIT_EXEMPT = ('static', 'health_check', 'metrics')
+
+    def __init__(self):
+        """Initialize Starlette application and configuration"""
+        self.config = config
+
+        # Load server configuration
+        self.server_config = self.config.get('server', {'host':'0.0.0.0', 'port':5001, 'debug':False})
+
+        # Setup rate limiter, shared by all workers when a shared store is configured (fixed windows)
+        self.rate_limit = parse(self.server_config.get('rate_limit', "50 per minute"))
+        storage = storage_from_string("async+" + self.config.get('shared_store', {}).get('uri', "memory://"))
+        strategy = MovingWindowRateLimiter if isinstance(storage, MovingWindowSupport) else FixedWindowRateLimiter
+        self.limiter = strategy(storage)
+
+        # Setup fingerprinted static URLs and response compression
+        self.static_assets = StaticAssets("static", max_age=self.server_config.get('static_max_age', 31_536_000))
+        self.compression = CompressionPolicy(**self.server_config.get('compression', {}))
+
+        self.templates = Jinja2Templates(directory="templates")
+        self.templates.env.globals["static_url"] = self.static_assets.url
+
+        # Register routes and configurations
+        self.app = Starlette(
+            debug=self.server_config.get('debug', False),
+            routes=self.register_routes(),
+            middleware=[Middleware(CORSMiddleware, allow_origins=["*"])],
+            lifespan=self.lifespan,
+        )
+        self.setup_global_configs()
+
+
+    def register_routes(self):
+        """Register all API routes"""
+        return [
+            Route('/', endpoint=self.home, name='home'),
+            Route('/run_api', endpoint=self.text2sql_endpoint, methods=['GET', 'POST'], name='text2sql'),
+            Route('/run_api/stream', endpoint=self.text2sql_stream_endpoint, methods=['GET', 'POST'], name='text2sql_stream'),
+            Route('/run_api/batch', endpoint=self.text2sql_batch_endpoint, methods=['POST'], name='text2sql_batch'),
+            Route('/health', endpoint=self.health_check, methods=['GET'], name='health_check'),
+            Route('/index_advisor', endpoint=self.index_advisor_report, methods=['GET'], name='index_advisor'),
+            Route('/metrics', endpoint=self.metrics, methods=['GET'], name='metrics'),
+            Mount('/static', app=StaticFiles(directory="static"), name='static'),
+        ]
+
+
+    def setup_global_configs(self):
+        """Global configurations for rate limiting, cache, and response modifications"""
+
+        async def add_headers(request: Request, call_next):
+            """Apply the rate limit, the per-route cache policy and compress large responses"""
+            route = self.rate_limited_route(request)
+            client = request.client.host if request.client else "unknown"
+            if route is not None and not await self.limiter.hit(self.rate_limit, client, route):
+                return JSONResponse({'status':'error', 'message':'Rate limit exceeded'}, HTTPStatus.TOO_MANY_REQUESTS)
+
+            response = await call_next(request)
+            if request.url.path.startswith('/static/'):
+                filename = request.url.path.removeprefix('/static/')
+                response.headers["Cache-Control"] = self.static_assets.cache_control(filename, request.query_params.get('v'))
+            elif "Cache-Control" not in response.headers:
+                # Routes without their own policy are never cached
+                response.headers["Cache-Control"] = NO_STORE
+                response.headers["Pragma"] = "no-cache"
+                response.headers["Expires"] = "0"
+
+            return await self.compress_response(request, response)
+
+        self.app.add_middleware(BaseHTTPMiddleware, dispatch=add_headers)
+
+
+    def rate_limited_route(self, request: Request) -> str | None:
+        """Name of the route a request counts against (each route has its own limit), or None when it is exempt"""
+        for route in self.app.routes:
+            match, _ = route.matches(request.scope)
+            if match != Match.NONE:
+                return None if route.name in self.RATE_LIMIT_EXEMPT else route.name
+        return None  # Unknown paths get a 404 and are not counted, as with Flask-Limiter
+
+
+    async def compress_response(self, request: Request, response: Response) -> Response:
+        """Compress a complete response body with gzip or brotli when the client accepts it"""
+        content_type = response.headers.get("Content-Type")
+        if not self.compression.compressible(content_type):
+            return response
+        response.headers.add_vary_header("Accept-Encoding")
+
+        # Streamed responses (server-sent events, NDJSON) carry no Content-Length and pass through
+        content_length = response.headers.get("Content-Length")
+        if content_length is None or "Content-Encoding" in response.headers:
+            return response
+        encoding = self.compression.encoding_for(request.headers.get("Accept-Encoding"), content_type, int(content_length))
+        if encoding is None:
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        content = self.compression.compress(body, encoding)
+        compressed = Response(content, status_code=response.status_code)
+        compressed.raw_headers = [
+            (name, value) for name, value in response.raw_headers if name != b"content-length"
+        ] + [(b"content-length", str(len(content)).encode("latin-1"))]
+        compressed.headers["Content-Encoding"] = encoding
+        etag = compressed.headers.get("ETag")
+        if etag and not etag.startswith("W/"):
+            compressed.headers["ETag"] = f"W/{etag}"  # The compressed body is a different byte sequence
+        return compressed
+
+
+    async def home(self, request: Request):
+        """Render the index.html template (revalidated by ETag, as it links the current static fingerprints)."""
+        response = self.templates.TemplateResponse(request, "index.html")
+        etag = content_etag(response.body)
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            response = Response(status_code=HTTPStatus.NOT_MODIFIED)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = REVALIDATE
+        return response
+
+
+    async def text2sql_endpoint(self, request: Request):
+        """Endpoint to handle Text2SQL queries and return the result (conditional on the question and data version)"""
+        try:
+            try:
+                data = await request.json() if request.method == 'POST' else request.query_params
+            except ValueError:
+                data = None
+
+            try:
+                query = parse_query_request(data)
+            except ValueError as e:
+                return JSONResponse({'error': str(e)}, HTTPStatus.BAD_REQUEST)
+
+            # The answer only changes with the data, so a client holding it is told so without running the pipeline
+            etag = answer_etag(query, get_table_versions(sqldb_path))
+            if etag_matches(request.headers.get("If-None-Match"), etag):
+                response = Response(status_code=HTTPStatus.NOT_MODIFIED)
+            else:
+                result = await arun_text2sql_api(query)
+                response = JSONResponse({'status':'success', 'result':result}, HTTPStatus.OK)
+                if result.get("failed"):
+                    # A failure is not the answer for this data version; the client asks again
+                    return response
+
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = PRIVATE_REVALIDATE
+            return response
+
+        except Exception as e:
+            return JSONResponse({'status':'error', 'message': str(e)}, HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+    async def text2sql_stream_endpoint(self, request: Request):
+        """Endpoint streaming stage progress and the final response tokens as server-sent events"""
+        try:
+            data = await request.json() if request.method == 'POST' else request.query_params
+        except ValueError:
+            data = None
+
+        try:
+            query = parse_query_request(data)
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, HTTPStatus.BAD_REQUEST)
+
+        def generate():
+            # Sync generator; Starlette iterates it on a worker thread
+            try:
+                for event, payload in stream_text2sql_api(query):
+                    yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
+
+        return StreamingResponse(generate(), media_type="text/event-stream", headers={"X-Accel-Buffering": "no"})
+
+
+    async def text2sql_batch_endpoint(self, request: Request):
+        """Endpoint answering a list of questions, in order as JSON or as NDJSON lines in completion order"""
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+
+        try:
+            queries, concurrency, stream = parse_batch_request(data, self.config.get('batch', {}))
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, HTTPStatus.BAD_REQUEST)
+
+        if stream:
+            def generate():
+                # Sync generator; Starlette iterates it on a worker thread
+                for index, result in run_text2sql_batch(queries, concurrency):
+                    yield json.dumps({'index': index, 'query': queries[index], **result}) + "\n"
+
+            return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+        try:
+            results = [None] * len(queries)
+            batch = await asyncio.to_thread(lambda: list(run_text2sql_batch(queries, concurrency)))
+            for index, result in batch:
+                results[index] = {'query': queries[index], **result}
+            return JSONResponse({'status':'success', 'results':results}, HTTPStatus.OK)
+
+        except Exception as e:
+            return JSONResponse({'status':'error', 'message': str(e)}, HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+    async def index_advisor_report(self, request: Request):
+        """Report columns used by generated SQL and the indexes proposed for them"""
+        index_advisor = await asyncio.to_thread(lambda: get_app_context().index_advisor)
+        if index_advisor is None:
+            return JSONResponse({'status':'error', 'message':'Index advisor is disabled'}, HTTPStatus.NOT_FOUND)
+        return JSONResponse({'status':'success', 'result':await asyncio.to_thread(index_advisor.report)}, HTTPStatus.OK)
+
+
+    async def metrics(self, request: Request):
+        """Pipeline stage latencies, LLM token counts and cache hit/miss counts in Prometheus text format"""
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+    async def health_check(self, request: Request):
+        """Health check endpoint to verify the server status (answers before models and index are loaded)"""
+        return JSONResponse({'status':'healthy', 'message':'Text2SQL API is running',
+                             'ready': get_app_context().ready}, HTTPStatus.OK)
+
+
+    @asynccontextmanager
+    async def lifespan(self, app):
+        """Start background warmup when the server starts"""
+        self.start_warmup()
+        yield
+
+
+    def start_warmup(self):
+        """Build the database, schema context and vector index in the background so /health answers immediately"""
+        if self.server_config.get('warmup_on_start', True):
+            threading.Thread(target=get_app_context().warmup, name="warmup", daemon=True).start()
+
+
+    def run(self):
+        """Run the ASGI server with uvicorn using configuration from config.yml"""
+        import uvicorn
+
+        host = self.server_config.get('host', '0.0.0.0')
+        port = self.server_config.get('port', 5001)
+        workers = self.server_config.get('workers', 4)
+
+        logger.info("Starting async Text2SQL server on %s:%s with %s workers", host, port, workers)
+        if workers > 1:
+            # Each worker process imports this module and builds its own server
+            uvicorn.run("asgi:app", host=host, port=port, workers=workers)
+        else:
+            uvicorn.run(self.app, host=host, port=port)
+
+
+# Create server instance; `app` is the ASGI application object, e.g. `uvicorn asgi:app`
+server = Text2SQLAsyncServer()
+app = server.app
+
+
+if __name__ == '__main__':
+    server.run()
@@ -0,0 +1,145 @@
+"""
+Concurrency benchmark comparing the sync (Flask, app.py) and async (ASGI, asgi.py) serving modes.
+
+Both servers are started as subprocesses against a local fake LLM/embedding server
+(see fake_llm_server.py), so the numbers reflect how many in-flight questions each
+mode can hold rather than Groq or Ollama speed. Caches are disabled for the run.
+
+Usage (from the repository root):
+    python benchmarks/bench_concurrency.py --requests 200 --concurrency 100 --latency 0.5
+"""
+import os
+import sys
+import json
+import time
+import yaml
+import socket
+import argparse
+import tempfile
+import subprocess
+import statistics
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_llm_server import start_fake_llm_server
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    "sync": [sys.executable, "app.py"],
+    "async": [sys.executable, "asgi.py"],
+}
+
+
+def free_port() -> int:
+    """Return a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def write_benchmark_config(llm_port: int, server_port: int) -> str:
+    """Write a config.yml pointing the app at the fake server, with caches and limits relaxed."""
+    with open(os.path.join(REPO_ROOT, "config", "config.yml")) as file:
+        config = yaml.safe_load(file)
+
+    # One process per mode: the threaded Flask server against a single event loop
+    config["server"].update({"host": "127.0.0.1", "port": server_port, "debug": False,
+                             "rate_limit": "1000000 per minute", "runner": "flask", "workers": 1})
+    config["groq"]["api_base"] = f"http://127.0.0.1:{llm_port}/openai/v1"
+    config["ollama"].update({"host": "127.0.0.1", "port": str(llm_port)})
+    for cache in config.get("cache", {}).values():
+        cache["enabled"] = False
+
+    handle, path = tempfile.mkstemp(suffix=".yml")
+    with os.fdopen(handle, "w") as file:
+        yaml.safe_dump(config, file)
+    return path
+
+
+def wait_until_healthy(process: subprocess.Popen, port: int, timeout: float = 120):
+    """Poll /health until the server answers."""
+    deadline = time.time() + timeout
+    while time.time() < deadline and process.poll() is None:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not become healthy")
+
+
+def post_query(port: int, index: int) -> float:
+    """Send one question and return its latency in seconds."""
+    body = json.dumps({"query": f"How many employees work in each department? #{index}"}).encode("utf-8")
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/run_api", data=body, headers={"Content-Type": "application/json"}
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=600) as response:
+        payload = json.loads(response.read())
+    if payload.get("status") != "success":
+        raise RuntimeError(payload)
+    return time.perf_counter() - start
+
+
+def run_mode(mode: str, llm_port: int, requests: int, concurrency: int) -> dict:
+    """Start one serving mode, fire the requests and collect latency statistics."""
+    server_port = free_port()
+    config_path = write_benchmark_config(llm_port, server_port)
+    env = dict(os.environ, TEXT2SQL_CONFIG=config_path, GROQ_API_KEY="fake")
+    process = subprocess.Popen(MODES[mode], cwd=REPO_ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_healthy(process, server_port)
+        post_query(server_port, -1)  # warm-up
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda i: _safe_post(server_port, i), range(requests)))
+        elapsed = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait()
+        os.remove(config_path)
+
+    latencies = sorted(r for r in results if r is not None)
+    return {
+        "mode": mode,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": requests - len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_s": round(statistics.median(latencies), 3) if latencies else None,
+        "p95_s": round(latencies[int(len(latencies) * 0.95) - 1], 3) if latencies else None,
+    }
+
+
+def _safe_post(port: int, index: int):
+    try:
+        return post_query(port, index)
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake LLM latency per call (seconds)")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+
+    llm_server = start_fake_llm_server(latency=args.latency)
+    llm_port = llm_server.server_address[1]
+
+    for mode in args.modes:
+        print(json.dumps(run_mode(mode, llm_port, args.requests, args.concurrency)))
+
+    llm_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
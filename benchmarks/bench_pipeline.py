@@ -0,0 +1,205 @@
+"""
+Offline benchmark of the Text2SQL pipeline against synthetic HR datasets.
+
+For every dataset size a fresh worker process is started in its own working directory
+(resources/data holds the generated CSV and the HR_Dataset.yml descriptions), with Groq and
+Ollama replaced by the local fake server (fake_llm_server.py: fixed latency, scripted SQL
+from workload.py, hash embeddings).
+Each worker reports:
+
+- startup time: ingestion of the CSV, schema context and table index (cold unless --keep-state)
+- per-stage latency (mean, from src.metrics) and LLM prompt tokens per stage
+- request latency percentiles and throughput over the scripted workload
+- peak resident memory
+
+Results are printed as one JSON object per dataset size and can be saved with --output to
+compare releases.
+
+Usage (from the repository root):
+    python benchmarks/bench_pipeline.py --rows 1000 100000 1000000 10000000 --requests 80 --latency 0.05
+"""
+import os
+import sys
+import json
+import time
+import yaml
+import shutil
+import argparse
+import resource
+import tempfile
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from workload import WORKLOAD
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# State produced by a worker run; removed before each run for a cold start
+STATE_PATHS = (
+    "resources/Database.db",
+    "resources/Database.db-wal",
+    "resources/Database.db-shm",
+    "resources/Database.manifest.json",
+    "resources/Cache.db",
+    "resources/Shared.db",
+    "resources/Shared.db-wal",
+    "resources/Shared.db-shm",
+    "resources/Summary.db",
+    "resources/Summary.db-wal",
+    "resources/Summary.db-shm",
+    "resources/index_storage",
+)
+
+
+def git_revision() -> str:
+    """Return the short commit hash of the benchmarked tree."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def prepare_workdir(root: str, rows: int, llm_port: int, keep_state: bool, with_cache: bool) -> str:
+    """Create (or reuse) the working directory for one dataset size and write its config."""
+    from synthetic_hr import generate_hr_csv
+
+    workdir = os.path.join(root, f"hr_{rows}")
+    csv_path = os.path.join(workdir, "resources", "data", "HR_Dataset.csv")
+    if not os.path.exists(csv_path):
+        generate_hr_csv(csv_path, rows)
+    # The synthetic rows keep the columns of the source CSV, so its descriptions apply as they are
+    shutil.copyfile(os.path.join(REPO_ROOT, "resources", "data", "HR_Dataset.yml"),
+                    os.path.join(workdir, "resources", "data", "HR_Dataset.yml"))
+
+    if not keep_state:
+        for relative_path in STATE_PATHS:
+            path = os.path.join(workdir, relative_path)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+
+    with open(os.path.join(REPO_ROOT, "config", "config.yml")) as file:
+        config = yaml.safe_load(file)
+    config["groq"]["api_base"] = f"http://127.0.0.1:{llm_port}/openai/v1"
+    config["ollama"].update({"host": "127.0.0.1", "port": str(llm_port)})
+    config["logging"] = {"level": "WARNING"}
+    config["index_advisor"] = {"enabled": False}
+    for cache in config.get("cache", {}).values():
+        cache["enabled"] = with_cache
+
+    os.makedirs(os.path.join(workdir, "config"), exist_ok=True)
+    with open(os.path.join(workdir, "config", "config.yml"), "w") as file:
+        yaml.safe_dump(config, file)
+    return workdir
+
+
+def run_size(root: str, rows: int, llm_port: int, args) -> dict:
+    """Benchmark one dataset size in a fresh worker process."""
+    workdir = prepare_workdir(root, rows, llm_port, args.keep_state, args.with_cache)
+    env = dict(os.environ, GROQ_API_KEY="fake", PYTHONPATH=REPO_ROOT,
+               TEXT2SQL_CONFIG=os.path.join(workdir, "config", "config.yml"))
+    command = [sys.executable, os.path.abspath(__file__), "--worker",
+               "--requests", str(args.requests), "--concurrency", str(args.concurrency)]
+    completed = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Worker for {rows} rows failed:\n{completed.stderr}")
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {"rows": rows, "revision": git_revision(), "llm_latency_s": args.latency, **result}
+
+
+# ============================ Worker ============================
+def percentile(values: list, fraction: float) -> float:
+    """Return the nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, int(round(fraction * len(ordered))) - 1)]
+
+
+def worker(requests: int, concurrency: int) -> dict:
+    """Start the application in this process, run the workload and collect the measurements."""
+    start = time.perf_counter()
+    from src.settings import get_app_context
+    from src.run_api import run_text2sql_api
+    from src import metrics
+    import_s = time.perf_counter() - start
+
+    app_context = get_app_context()
+    app_context.engine
+    ingest_s = time.perf_counter() - start - import_s
+    app_context.warmup()
+    startup_s = time.perf_counter() - start
+
+    def timed_request(index: int) -> float:
+        request_start = time.perf_counter()
+        run_text2sql_api(WORKLOAD[index % len(WORKLOAD)][0])
+        return time.perf_counter() - request_start
+
+    run_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed_request, range(requests)))
+    elapsed = time.perf_counter() - run_start
+
+    stages = {
+        stage: round(values["sum"] / values["count"], 5)
+        for (stage,), values in sorted(metrics.stage_latency.summary().items())
+    }
+    prompt_tokens = {
+        stage: round(values["sum"] / values["count"], 1)
+        for (stage, kind), values in sorted(metrics.llm_tokens.summary().items())
+        if kind == "prompt_tokens"
+    }
+    return {
+        "import_s": round(import_s, 3),
+        "ingest_s": round(ingest_s, 3),
+        "startup_s": round(startup_s, 3),
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_s": round(statistics.median(latencies), 4),
+        "p95_s": round(percentile(latencies, 0.95), 4),
+        "stage_mean_s": stages,
+        "prompt_tokens_mean": prompt_tokens,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM latency per call (seconds)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "text2sql-bench"),
+                        help="Where generated datasets are kept between runs")
+    parser.add_argument("--keep-state", action="store_true", help="Reuse the ingested database and index (warm start)")
+    parser.add_argument("--with-cache", action="store_true", help="Keep the answer and SQL caches enabled")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.requests, args.concurrency)))
+        return
+
+    from fake_llm_server import start_fake_llm_server
+    llm_server = start_fake_llm_server(latency=args.latency)
+    llm_port = llm_server.server_address[1]
+
+    results = []
+    for rows in args.rows:
+        result = run_size(args.workdir, rows, llm_port, args)
+        results.append(result)
+        print(json.dumps(result))
+
+    llm_server.shutdown()
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
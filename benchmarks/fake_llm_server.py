@@ -0,0 +1,154 @@
+"""
+Local stand-in for the Groq (OpenAI-compatible) chat API and the Ollama embeddings API.
+
+Every request sleeps for a fixed latency before answering, which makes it possible to
+measure how many in-flight questions a serving mode can hold without live services.
+Text2SQL prompts quoting a question from workload.py get that question's scripted SQL;
+any other question gets a per-department headcount query.
+
+Usage:
+    python benchmarks/fake_llm_server.py --port 8089 --latency 0.5
+"""
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from workload import scripted_sql
+
+EMBED_DIM = 64
+
+SQL_RESPONSE = (
+    "Question: {question}\n"
+    "Table Selected For Query: HR_Dataset\n"
+    "SQLQuery: {sql_query}\n"
+    "Explanation: Scripted benchmark response."
+)
+DEFAULT_SQL = "SELECT Department, COUNT(*) AS Headcount FROM HR_Dataset GROUP BY Department"
+FINAL_RESPONSE = "The data shows the headcount for each department."
+
+
+def hash_embedding(text: str) -> list:
+    """Deterministic bag-of-words embedding so that similar texts get similar vectors."""
+    vector = [0.0] * EMBED_DIM
+    for word in text.lower().split():
+        digest = hashlib.md5(word.encode("utf-8")).digest()
+        vector[digest[0] % EMBED_DIM] += 1.0
+    return [v + 1e-3 for v in vector]
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """Answer chat completion and embedding requests after a fixed delay"""
+
+    latency = 0.5
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        """Silence per-request logging."""
+
+
+    def _send_json(self, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def _send_stream(self, model: str, content: str):
+        """Send the completion word by word as OpenAI-style server-sent event chunks."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for word in content.split(" "):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path.endswith("/chat/completions"):
+            time.sleep(self.latency)
+            prompt = request["messages"][-1]["content"]
+            if "SQL Query Generation Guidelines" in prompt:
+                question, sql_query = scripted_sql(prompt) or (prompt[-80:].strip(), DEFAULT_SQL)
+                content = SQL_RESPONSE.format(question=question, sql_query=sql_query)
+            else:
+                content = FINAL_RESPONSE
+            if request.get("stream"):
+                self._send_stream(request.get("model", "fake"), content)
+                return
+            self._send_json({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                          "total_tokens": (len(prompt) + len(content)) // 4},
+            })
+        elif self.path in ("/api/embeddings", "/api/embed"):
+            text = request.get("prompt") or request.get("input") or ""
+            if isinstance(text, list):
+                self._send_json({"embeddings": [hash_embedding(t) for t in text]})
+            else:
+                self._send_json({"embedding": hash_embedding(text)})
+        else:
+            self.send_error(404)
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a deep accept backlog for high-concurrency runs"""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def start_fake_llm_server(port: int = 0, latency: float = 0.5) -> FakeLLMServer:
+    """
+    Start the fake server on a background thread.
+
+    Args:
+        port (int): Port to listen on (0 picks a free port).
+        latency (float): Seconds to wait before answering each chat completion.
+
+    Returns:
+        FakeLLMServer: Running server; `server.server_address[1]` is the bound port.
+    """
+    handler = type("Handler", (FakeLLMHandler,), {"latency": latency})
+    server = FakeLLMServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    server = start_fake_llm_server(args.port, args.latency)
+    print(f"Fake LLM server listening on 127.0.0.1:{server.server_address[1]} (latency {args.latency}s)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,61 @@
+"""
+Synthetic HR datasets of any size, shaped like resources/data/HR_Dataset.csv.
+
+Rows are resampled from the real dataset (so every column keeps its value distribution
+and related columns such as DeptID/Department stay consistent); EmpID and Employee_Name
+are made unique and Salary is jittered. Output is deterministic for a given seed.
+
+Usage (from the repository root):
+    python benchmarks/synthetic_hr.py --rows 1000000 --output /tmp/hr/HR_Dataset.csv
+"""
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_CSV = os.path.join(REPO_ROOT, "resources", "data", "HR_Dataset.csv")
+
+# Rows generated and written per chunk
+CHUNK_ROWS = 200_000
+
+
+def generate_hr_csv(path: str, rows: int, seed: int = 42, source_csv: str = SOURCE_CSV):
+    """
+    Write a synthetic HR dataset with `rows` rows.
+
+    Args:
+        path (str): Output CSV path.
+        rows (int): Number of rows to generate.
+        seed (int): Random seed.
+        source_csv (str): Real dataset the rows are resampled from.
+    """
+    source = pd.read_csv(source_csv, encoding="utf-8-sig")
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    for start in range(0, rows, CHUNK_ROWS):
+        size = min(CHUNK_ROWS, rows - start)
+        chunk = source.iloc[rng.integers(0, len(source), size)].reset_index(drop=True)
+
+        emp_ids = np.arange(start, start + size) + 100_000
+        chunk["EmpID"] = emp_ids
+        chunk["Employee_Name"] = [f"Employee, {emp_id}" for emp_id in emp_ids]
+        chunk["Salary"] = (chunk["Salary"] * rng.normal(1.0, 0.1, size)).round().astype("int64")
+
+        chunk.to_csv(tmp_path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+
+    # Rename at the end so an interrupted run never leaves a truncated dataset behind
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    generate_hr_csv(args.output, args.rows, args.seed)
+    print(f"Wrote {args.rows} rows to {args.output}")
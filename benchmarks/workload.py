@@ -0,0 +1,34 @@
+"""
+Scripted benchmark workload: HR questions and the SQL the fake LLM answers them with.
+
+The mix covers the main result shapes: scalars and small groupings (answered directly),
+medium groupings and large row sets (rendered or summarized for the response LLM) and
+a non-database question (no SQL at all).
+"""
+
+WORKLOAD = [
+    ("How many employees are there?",
+     "SELECT COUNT(*) FROM HR_Dataset"),
+    ("What is the headcount per department?",
+     "SELECT Department, COUNT(*) AS Headcount FROM HR_Dataset GROUP BY Department"),
+    ("What is the average salary by position?",
+     "SELECT Position, AVG(Salary) AS AvgSalary FROM HR_Dataset GROUP BY Position ORDER BY AvgSalary DESC"),
+    ("List the employees in the Sales department",
+     "SELECT Employee_Name, Position, Salary FROM HR_Dataset WHERE Department LIKE 'Sales%'"),
+    ("Which employees have more than 15 absences?",
+     "SELECT Employee_Name, Department, Absences FROM HR_Dataset WHERE Absences > 15"),
+    ("What is the termination rate by recruitment source?",
+     "SELECT RecruitmentSource, AVG(Termd) AS TerminationRate FROM HR_Dataset GROUP BY RecruitmentSource"),
+    ("Show the ten highest salaries",
+     "SELECT Employee_Name, Salary FROM HR_Dataset ORDER BY Salary DESC LIMIT 10"),
+    ("Hello, who are you?",
+     "None"),
+]
+
+
+def scripted_sql(prompt: str):
+    """Return the scripted SQL for the workload question quoted in a Text2SQL prompt, if any."""
+    for question, sql_query in WORKLOAD:
+        if question in prompt:
+            return question, sql_query
+    return None
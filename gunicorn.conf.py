@@ -0,0 +1,30 @@
+# ============================ Gunicorn Configuration ============================
+# Usage: gunicorn -c gunicorn.conf.py
+#
+# With `server.preload` enabled the master process ingests the CSVs, renders the schema
+# context and loads the vector index once, before forking; each worker then opens its own
+# database connections and LLM/embedding clients after the fork. Rate limits and caches are
+# shared by the workers through `shared_store.uri`.
+# (module-level names are read as gunicorn settings, so `config` must not be imported directly)
+from src import settings
+from src.settings import get_app_context
+
+server_config = settings.config.get('server', {})
+
+wsgi_app = "app:create_app()"
+bind = f"{server_config.get('host', '0.0.0.0')}:{server_config.get('port', 5001)}"
+preload_app = server_config.get('preload', True)
+workers = server_config.get('workers', 4)
+threads = server_config.get('threads', 4)  # Threads per worker; LLM calls mostly wait on the network
+timeout = server_config.get('timeout', 120)
+
+
+def when_ready(server):
+    """Build read-only state in the master before any worker is forked."""
+    if server.cfg.preload_app:
+        get_app_context().warmup()
+
+
+def post_fork(server, worker):
+    """Drop connections inherited from the master so the worker opens its own."""
+    get_app_context().after_fork()
@@ -0,0 +1,549 @@
+import re
+import json
+import time
+import logging
+import asyncio
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import inspect, text
+from llama_index.core import SQLDatabase
+from llama_index.core.objects import SQLTableSchema
+
+from src.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# ============================ Query Normalization ============================
+def normalize_query(query_str: str) -> str:
+    """
+    Normalize a user query so that trivially different spellings share a cache key.
+
+    Args:
+        query_str (str): User's input query.
+
+    Returns:
+        str: Lowercased query with collapsed whitespace and no trailing punctuation.
+    """
+    query_str = re.sub(r"\s+", " ", query_str.strip().lower())
+    return query_str.rstrip(" ?.!")
+
+
+# ============================ Semantic Answer Cache ============================
+class AnswerCache:
+    """LRU answer cache with TTL expiry, exact and embedding-similarity lookup"""
+
+    def __init__(
+        self,
+        embed_model,
+        max_size: int = 1024,
+        ttl_seconds: float = 3600,
+        similarity_threshold: float = 0.97,
+        version_fn: Optional[Callable[[], Any]] = None,
+        shared_store=None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            embed_model: Embedding model used for similarity lookups (None disables them).
+            max_size (int): Maximum number of cached answers before LRU eviction.
+            ttl_seconds (float): Lifetime of a cached answer in seconds.
+            similarity_threshold (float): Minimum cosine similarity for a semantic hit.
+            version_fn (Callable): Returns the current data version; a change clears the cache.
+            shared_store (SharedStore): Store sharing exact-question answers with the other
+                workers; semantic lookups stay local. None keeps answers per process.
+        """
+        self.embed_model = embed_model
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.version_fn = version_fn
+        self.shared_store = shared_store
+
+        self._entries = OrderedDict()   # normalized query -> (expires_at, embedding, result)
+        self._pending_embeddings = OrderedDict()  # embeddings computed by misses, reused by put()
+        self._matrix = None             # stacked embeddings for vectorized similarity search
+        self._matrix_keys = []
+        self._version = version_fn() if version_fn else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+
+    def _check_version(self):
+        """Clear the cache if the underlying database has changed."""
+        if self.version_fn is None:
+            return
+        version = self.version_fn()
+        if version != self._version:
+            self._entries.clear()
+            self._pending_embeddings.clear()
+            self._matrix = None
+            self._version = version
+
+
+    def _embed(self, key: str, embedding: Optional[List[float]] = None) -> Optional[np.ndarray]:
+        """Return the unit-normalized embedding of a normalized query, computing it unless given."""
+        if self.embed_model is None:
+            return None
+        if embedding is None:
+            embedding = self.embed_model.get_query_embedding(key)
+        embedding = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+
+    def _semantic_lookup(self, embedding: np.ndarray) -> Optional[str]:
+        """Return the key of the most similar live entry above the threshold."""
+        if self._matrix is None:
+            self._matrix_keys = [k for k, (_, e, _) in self._entries.items() if e is not None]
+            if not self._matrix_keys:
+                return None
+            self._matrix = np.stack([self._entries[k][1] for k in self._matrix_keys])
+
+        scores = self._matrix @ embedding
+        best = int(np.argmax(scores))
+        if scores[best] >= self.similarity_threshold:
+            return self._matrix_keys[best]
+        return None
+
+
+    def get(self, query_str: str, embedding: Optional[List[float]] = None):
+        """
+        Look up a cached answer by exact normalized text, then by embedding similarity.
+
+        Args:
+            query_str (str): User's input query.
+            embedding (List[float]): Precomputed embedding of the normalized query, e.g. from a batch call.
+
+        Returns:
+            Any: Cached result if found and still valid, otherwise None.
+        """
+        key = exact_key = normalize_query(query_str)
+
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+
+        if entry is None and self._entries:
+            embedding = self._embed(key, embedding)
+            if embedding is not None:
+                with self._lock:
+                    match = self._semantic_lookup(embedding)
+                    entry = self._entries.get(match) if match else None
+                    if entry is None:
+                        self._pending_embeddings[key] = embedding
+                        if len(self._pending_embeddings) > 64:
+                            self._pending_embeddings.popitem(last=False)
+                    key = match or key
+
+        with self._lock:
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                record_cache_lookup("answer", True)
+                return entry[2]
+            if entry is not None:
+                # Expired entry
+                self._entries.pop(key, None)
+                self._matrix = None
+
+        # Another worker may have answered the same question
+        result = self._get_shared(exact_key)
+        with self._lock:
+            if result is not None:
+                self._insert(exact_key, self._pending_embeddings.pop(exact_key, None), result)
+                self.hits += 1
+                record_cache_lookup("answer", True)
+                return result
+            self.misses += 1
+            record_cache_lookup("answer", False)
+            return None
+
+
+    async def aget(self, query_str: str):
+        """Async version of `get`; embeds and searches on a worker thread."""
+        return await asyncio.to_thread(self.get, query_str)
+
+
+    def put(self, query_str: str, result, embedding: Optional[List[float]] = None):
+        """
+        Store an answer for the given query, evicting the least recently used entry if full.
+
+        Args:
+            query_str (str): User's input query.
+            result: Answer to cache.
+            embedding (List[float]): Precomputed embedding of the normalized query, e.g. from a batch call.
+        """
+        key = normalize_query(query_str)
+
+        with self._lock:
+            pending = self._pending_embeddings.pop(key, None)
+        embedding = pending if pending is not None else self._embed(key, embedding)
+
+        with self._lock:
+            self._insert(key, embedding, result)
+            version_key = self._version_key()
+
+        if self.shared_store is not None:
+            try:
+                self.shared_store.set(
+                    "answer", key, {"version": version_key, "result": result}, ttl_seconds=self.ttl_seconds
+                )
+            except TypeError:
+                logger.debug("Answer for %r is not JSON-serializable; kept in this process only", key)
+
+
+    def _insert(self, key: str, embedding: Optional[np.ndarray], result):
+        """Add an entry, evicting the least recently used ones beyond `max_size` (lock held)."""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, embedding, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        self._matrix = None
+
+
+    def _version_key(self) -> str:
+        """Data version in a form comparable across processes (lock held)."""
+        return json.dumps(self._version, sort_keys=True, default=str)
+
+
+    def _get_shared(self, key: str):
+        """Return an answer another worker stored for the same question and data version, or None."""
+        if self.shared_store is None:
+            return None
+        value = self.shared_store.get("answer", key)
+        with self._lock:
+            version_key = self._version_key()
+        if value is None or value.get("version") != version_key:
+            return None
+        return value["result"]
+
+
+    async def aput(self, query_str: str, result):
+        """Async version of `put`."""
+        await asyncio.to_thread(self.put, query_str, result)
+
+
+    def clear(self):
+        """Remove all cached answers."""
+        with self._lock:
+            self._entries.clear()
+            self._pending_embeddings.clear()
+            self._matrix = None
+
+
+# ============================ Generated SQL Cache ============================
+class SQLQueryCache:
+    """Persistent cache of generated SQL keyed by normalized question and schema fingerprint"""
+
+    def __init__(self, db_path: str):
+        """
+        Open (or create) the SQLite side table holding generated SQL.
+
+        Args:
+            db_path (str): Path to the SQLite file used for the cache.
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sql_query_cache (
+                question    TEXT NOT NULL,
+                schema_hash TEXT NOT NULL,
+                sql_query   TEXT NOT NULL,
+                created_at  REAL NOT NULL,
+                hits        INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (question, schema_hash)
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sql_fix_cache (
+                question    TEXT NOT NULL,
+                failed_sql  TEXT NOT NULL,
+                schema_hash TEXT NOT NULL,
+                fixed_sql   TEXT NOT NULL,
+                created_at  REAL NOT NULL,
+                hits        INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (question, failed_sql, schema_hash)
+            )
+            """
+        )
+        self._conn.commit()
+
+
+    @staticmethod
+    def schema_hash(schema: str) -> str:
+        """Return a stable fingerprint of the schema string sent to the LLM."""
+        return hashlib.sha256(schema.encode("utf-8")).hexdigest()
+
+
+    def get(self, query_str: str, schema: str) -> Optional[str]:
+        """
+        Look up previously generated SQL for a question against the same schema.
+
+        Args:
+            query_str (str): User's input query.
+            schema (str): Schema string the SQL was generated against.
+
+        Returns:
+            Optional[str]: Cached SQL query, or None on a miss.
+        """
+        key = (normalize_query(query_str), self.schema_hash(schema))
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sql_query FROM sql_query_cache WHERE question = ? AND schema_hash = ?", key
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE sql_query_cache SET hits = hits + 1 WHERE question = ? AND schema_hash = ?", key
+                )
+                self._conn.commit()
+        record_cache_lookup("sql", row is not None)
+        return row[0] if row else None
+
+
+    def put(self, query_str: str, schema: str, sql_query: str):
+        """
+        Store generated SQL for a question and schema.
+
+        Args:
+            query_str (str): User's input query.
+            schema (str): Schema string the SQL was generated against.
+            sql_query (str): SQL extracted from the LLM response.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sql_query_cache (question, schema_hash, sql_query, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (normalize_query(query_str), self.schema_hash(schema), sql_query, time.time()),
+            )
+            self._conn.commit()
+
+
+    def get_fix(self, query_str: str, sql_query: str, schema: str) -> Optional[str]:
+        """
+        Look up the known correction of an SQL query that failed for the same question and schema.
+
+        The correction was written for one question, so the same broken SQL generated for a
+        different question is not served with it.
+
+        Args:
+            query_str (str): User's input query the SQL was generated for.
+            sql_query (str): SQL query that failed.
+            schema (str): Schema string the SQL was generated against.
+
+        Returns:
+            Optional[str]: Corrected SQL query, or None on a miss.
+        """
+        key = (normalize_query(query_str), sql_query, self.schema_hash(schema))
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fixed_sql FROM sql_fix_cache WHERE question = ? AND failed_sql = ? AND schema_hash = ?", key
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE sql_fix_cache SET hits = hits + 1 WHERE question = ? AND failed_sql = ? AND schema_hash = ?",
+                    key,
+                )
+                self._conn.commit()
+        record_cache_lookup("sql_fix", row is not None)
+        return row[0] if row else None
+
+
+    def put_fix(self, query_str: str, sql_query: str, schema: str, fixed_sql: str):
+        """
+        Store the correction of a failed SQL query.
+
+        Args:
+            query_str (str): User's input query the SQL was generated for.
+            sql_query (str): SQL query that failed.
+            schema (str): Schema string the SQL was generated against.
+            fixed_sql (str): Corrected SQL query that executed successfully.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sql_fix_cache (question, failed_sql, schema_hash, fixed_sql, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (normalize_query(query_str), sql_query, self.schema_hash(schema), fixed_sql, time.time()),
+            )
+            self._conn.commit()
+
+
+    def discard(self, sql_query: str):
+        """
+        Drop every cache entry that produced the given SQL, e.g. after it failed to execute.
+
+        Args:
+            sql_query (str): SQL query to remove.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM sql_query_cache WHERE sql_query = ?", (sql_query,))
+            self._conn.execute("DELETE FROM sql_fix_cache WHERE fixed_sql = ?", (sql_query,))
+            self._conn.commit()
+
+
+# ============================ Schema Context Cache ============================
+class SchemaContextCache:
+    """Rendered table-info strings per table, rebuilt only when a table's DDL or row count changes"""
+
+    def __init__(
+        self,
+        sql_database: SQLDatabase,
+        table_schema_objs: List[SQLTableSchema],
+        column_descriptions: Optional[Dict[str, Dict[str, str]]] = None,
+        version_fn: Optional[Callable[[], Any]] = None,
+    ):
+        """
+        Render the context string of every table once.
+
+        Args:
+            sql_database (SQLDatabase): Database whose tables are described.
+            table_schema_objs (List[SQLTableSchema]): Tables and their context descriptions.
+            column_descriptions (Dict[str, Dict[str, str]]): Description of each column, per table.
+            version_fn (Callable): Returns the current database version; the per-table
+                signatures are only re-checked when it changes.
+        """
+        self.engine = sql_database.engine
+        self.version_fn = version_fn
+        self._descriptions = {obj.table_name: obj.context_str for obj in table_schema_objs}
+        self._column_descriptions = column_descriptions or {}
+        self._signatures: Dict[str, tuple] = {}
+        self._columns: Dict[str, List[Tuple[str, str]]] = {}
+        self._foreign_keys: Dict[str, str] = {}
+        self._contexts: Dict[str, str] = {}
+        self._version = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+
+    def _table_signatures(self, table_names: List[str]) -> Dict[str, tuple]:
+        """Return the (DDL, row count) signature of each table."""
+        signatures = {}
+        with self.engine.connect() as conn:
+            ddl = dict(conn.execute(text("SELECT name, sql FROM sqlite_master WHERE type = 'table'")).fetchall())
+            for table_name in table_names:
+                if table_name not in ddl:
+                    continue
+                row_count = conn.execute(text(f'SELECT COUNT(*) FROM "{table_name}"')).scalar()
+                signatures[table_name] = (ddl[table_name], row_count)
+        return signatures
+
+
+    def _reflect(self, table_names: List[str]):
+        """Reflect the given tables afresh: one rendered line per column, and their foreign keys."""
+        inspector = inspect(self.engine)
+        for table_name in table_names:
+            descriptions = self._column_descriptions.get(table_name, {})
+            column_lines = []
+            for column in inspector.get_columns(table_name):
+                line = f"- {column['name']} ({column['type']!s})"
+                if descriptions.get(column['name']):
+                    line += f": {descriptions[column['name']]}"
+                column_lines.append((column['name'], line))
+            self._columns[table_name] = column_lines
+
+            self._foreign_keys[table_name] = ", ".join(
+                f"{fk['constrained_columns']} -> {fk['referred_table']}.{fk['referred_columns']}"
+                for fk in inspector.get_foreign_keys(table_name)
+            )
+            self._contexts[table_name] = self._format(table_name, None)
+
+
+    def _format(self, table_name: str, columns: Optional[List[str]]) -> str:
+        """Render the context string of a table showing all columns, or only `columns`."""
+        column_lines = self._columns[table_name]
+        if columns is None:
+            shown = column_lines
+            header = f"Table '{table_name}' has columns:"
+        else:
+            selected = set(columns)
+            shown = [(name, line) for name, line in column_lines if name in selected]
+            header = f"Table '{table_name}' has columns ({len(shown)} of {len(column_lines)} shown):"
+
+        lines = [header] + [line for _, line in shown]
+        if self._foreign_keys[table_name]:
+            lines.append(f"Foreign keys: {self._foreign_keys[table_name]}")
+
+        # Append additional context or description of the table, if available
+        if self._descriptions.get(table_name):
+            lines.append(f"The table description is: {self._descriptions[table_name]}")
+        return "\n".join(lines)
+
+
+    def refresh(self, force: bool = False):
+        """
+        Re-render the tables whose DDL or row count changed since the last refresh.
+
+        Args:
+            force (bool): Check the signatures even if the database version is unchanged.
+        """
+        version = self.version_fn() if self.version_fn else None
+        if not force and self._contexts and version == self._version:
+            return
+
+        with self._lock:
+            signatures = self._table_signatures(list(self._descriptions))
+            changed = [t for t, sig in signatures.items() if self._signatures.get(t) != sig]
+            if changed:
+                self._reflect(changed)
+                logger.info("Schema context rendered for tables: %s", changed)
+            self._signatures = signatures
+            self._version = version
+
+
+    def column_lines(self, table_name: str) -> List[Tuple[str, str]]:
+        """
+        Return the rendered line of every column of a table, in table order.
+
+        Args:
+            table_name (str): Name of the table.
+
+        Returns:
+            List[Tuple[str, str]]: (column name, line) pairs.
+        """
+        self.refresh()
+        return self._columns.get(table_name, [])
+
+
+    def table_columns(self) -> Dict[str, List[str]]:
+        """Return the column names of every table."""
+        self.refresh()
+        return {table_name: [name for name, _ in lines] for table_name, lines in self._columns.items()}
+
+
+    def row_counts(self) -> Dict[str, int]:
+        """Return the row count of every table as of the last refresh."""
+        self.refresh()
+        return {table_name: signature[1] for table_name, signature in self._signatures.items()}
+
+
+    def get(self, table_schema_obj: SQLTableSchema, columns: Optional[List[str]] = None) -> str:
+        """
+        Return the rendered context string of a table.
+
+        Args:
+            table_schema_obj (SQLTableSchema): Table schema object from the retriever.
+            columns (List[str], optional): Only show these columns; all columns if None.
+
+        Returns:
+            str: Table schema with its description merged in.
+        """
+        self.refresh()
+        table_name = table_schema_obj.table_name
+
+        if table_name not in self._contexts or self._descriptions.get(table_name) != table_schema_obj.context_str:
+            with self._lock:
+                self._descriptions[table_name] = table_schema_obj.context_str
+                self._reflect([table_name])
+
+        if columns is None:
+            return self._contexts[table_name]
+        return self._format(table_name, columns)
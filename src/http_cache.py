@@ -0,0 +1,167 @@
+import os
+import gzip
+import hashlib
+import threading
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # Optional; responses fall back to gzip
+    brotli = None
+
+from src.cache import normalize_query
+
+# Cache-Control policies by kind of response
+NO_STORE = "no-cache, no-store, must-revalidate"   # Default for API responses
+REVALIDATE = "no-cache"                             # Cacheable, but revalidated with the ETag on every use
+PRIVATE_REVALIDATE = "private, no-cache"            # Per-user answers, revalidated with the ETag
+
+# Content types worth compressing; server-sent events are never buffered for compression
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+UNCOMPRESSIBLE_TYPES = ("text/event-stream",)
+
+
+# ============================ ETags ============================
+def content_etag(body: bytes) -> str:
+    """Strong ETag of a response body."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def answer_etag(query_str: str, table_versions: Dict[str, int]) -> str:
+    """
+    Weak ETag of an answer, known before the pipeline runs: the same question against the
+    same data is answered the same way, so a client holding it can be told 304 immediately.
+
+    Args:
+        query_str (str): User's input query (normalized like the answer cache key).
+        table_versions (Dict[str, int]): Ingestion version of every table, from `get_table_versions`.
+
+    Returns:
+        str: Weak ETag (the body may be served compressed or not).
+    """
+    key = f"{normalize_query(query_str)}\0{sorted(table_versions.items())}"
+    return f'W/"{hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an `If-None-Match` header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+# ============================ Static Assets ============================
+class StaticAssets:
+    """Content fingerprints of the static files, used to version their URLs so they can be cached for good"""
+
+    def __init__(self, directory: str, max_age: int = 31_536_000):
+        """
+        Initialize the fingerprint cache.
+
+        Args:
+            directory (str): Directory the static files are served from.
+            max_age (int): Lifetime in seconds of a fingerprinted asset in browser caches.
+        """
+        self.directory = directory
+        self.max_age = max_age
+        self._versions = {}  # filename -> ((mtime, size), version)
+        self._lock = threading.Lock()
+
+
+    def version(self, filename: str) -> Optional[str]:
+        """Return the content fingerprint of a static file (re-hashed only when it changes), or None if missing."""
+        path = os.path.join(self.directory, filename)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._versions.get(filename)
+        if cached is None or cached[0] != stamp:
+            with open(path, "rb") as f:
+                cached = (stamp, hashlib.sha256(f.read()).hexdigest()[:12])
+            with self._lock:
+                self._versions[filename] = cached
+        return cached[1]
+
+
+    def url(self, filename: str) -> str:
+        """Fingerprinted URL of a static file, used by the templates as `static_url('style.css')`."""
+        version = self.version(filename)
+        return f"/static/{filename}?v={version}" if version else f"/static/{filename}"
+
+
+    def cache_control(self, filename: str, requested_version: Optional[str]) -> str:
+        """Cache forever a request for the current fingerprint; revalidate unversioned or outdated URLs."""
+        if requested_version and requested_version == self.version(filename):
+            return f"public, max-age={self.max_age}, immutable"
+        return REVALIDATE
+
+
+# ============================ Compression ============================
+class CompressionPolicy:
+    """Chooses and applies gzip or brotli compression for complete (non-streamed) responses"""
+
+    def __init__(self, enabled: bool = True, min_size: int = 1024, level: int = 6):
+        """
+        Initialize the policy.
+
+        Args:
+            enabled (bool): Compress responses at all.
+            min_size (int): Smallest body in bytes worth compressing.
+            level (int): gzip compression level (1-9); brotli uses the matching quality.
+        """
+        self.enabled = enabled
+        self.min_size = min_size
+        self.level = level
+
+
+    def compressible(self, content_type: Optional[str]) -> bool:
+        """Whether responses of this content type are compressed (and so vary by `Accept-Encoding`)."""
+        content_type = (content_type or "").lower()
+        return (
+            self.enabled
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+            and not content_type.startswith(UNCOMPRESSIBLE_TYPES)
+        )
+
+
+    def encoding_for(self, accept_encoding: Optional[str], content_type: Optional[str], content_length: Optional[int]) -> Optional[str]:
+        """
+        Pick the encoding for a response.
+
+        Args:
+            accept_encoding (str): Request's `Accept-Encoding` header.
+            content_type (str): Response content type.
+            content_length (int): Body size, or None for a streamed response (never compressed).
+
+        Returns:
+            Optional[str]: "br", "gzip" or None to send the body as is.
+        """
+        if content_length is None or content_length < self.min_size or not self.compressible(content_type):
+            return None
+
+        accepted = set()
+        for item in (accept_encoding or "").split(","):
+            coding, _, params = item.strip().partition(";")
+            if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                continue
+            accepted.add(coding.strip().lower())
+
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted or "*" in accepted:
+            return "gzip"
+        return None
+
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """Compress a body with the encoding returned by `encoding_for`."""
+        if encoding == "br":
+            return brotli.compress(body, quality=min(self.level + 2, 11))
+        return gzip.compress(body, compresslevel=self.level, mtime=0)
@@ -0,0 +1,290 @@
+import logging
+import threading
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional
+
+import sqlglot
+from sqlglot import exp
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Weight of a column reference per clause; filters and joins benefit most from an index
+CLAUSE_WEIGHTS = {
+    exp.Where: 1.0,
+    exp.Join: 1.0,
+    exp.Group: 0.5,
+    exp.Order: 0.5,
+}
+
+# Estimated per-entry overhead of an SQLite index (rowid, record header, b-tree slack)
+INDEX_ENTRY_OVERHEAD_BYTES = 16
+
+
+# ============================ Index Advisor ============================
+class IndexAdvisor:
+    """Record executed SQL, tally predicate columns and propose or create SQLite indexes for them"""
+
+    def __init__(
+        self,
+        engine,
+        min_queries: int = 5,
+        size_budget_mb: float = 64,
+        auto_create: bool = False,
+        check_every: int = 50,
+        version_fn: Optional[Callable[[], Dict[str, int]]] = None,
+    ):
+        """
+        Initialize the advisor.
+
+        Args:
+            engine (sqlalchemy.engine.Engine): Engine of the database to index.
+            min_queries (int): Weighted number of uses before a column is proposed.
+            size_budget_mb (float): Maximum estimated total size of advisor-created indexes.
+            auto_create (bool): Create proposed indexes automatically every `check_every` queries.
+            check_every (int): Number of recorded queries between automatic index passes.
+            version_fn (Callable): Returns the data version of every table (lower-cased name); column
+                statistics are cached until their table's version changes (never cached without it).
+        """
+        self.engine = engine
+        self.min_queries = min_queries
+        self.size_budget_bytes = size_budget_mb * 1024 * 1024
+        self.auto_create = auto_create
+        self.check_every = check_every
+        self.version_fn = version_fn
+
+        self._usage = Counter()                   # (table, column) -> weighted use count
+        self._clauses = defaultdict(Counter)      # (table, column) -> clause name -> count
+        self._table_names: Dict[str, Optional[str]] = {}       # lower-cased name -> name as created
+        self._table_columns: Dict[str, Dict[str, str]] = {}    # table -> lower-cased column -> column
+        self._column_stats: Dict[tuple, tuple] = {}            # (table, column) -> (table version, stats)
+        self._recorded = 0
+        self._lock = threading.Lock()
+        self._applying = threading.Lock()
+
+
+    # ============================ Recording ============================
+    def _table_name(self, name: str) -> Optional[str]:
+        """Return (and cache) the name of a table as created, matched case-insensitively like SQLite does, or None."""
+        key = name.lower()
+        if key not in self._table_names:
+            with self.engine.connect() as conn:
+                row = conn.execute(
+                    text("SELECT name FROM sqlite_master WHERE type = 'table' AND lower(name) = :name"), {"name": key}
+                ).fetchone()
+            self._table_names[key] = row[0] if row else None
+        return self._table_names[key]
+
+
+    def _columns_of(self, table_name: str) -> Dict[str, str]:
+        """Return (and cache) the column names of a table by lower-cased name."""
+        if table_name not in self._table_columns:
+            with self.engine.connect() as conn:
+                rows = conn.execute(text(f'PRAGMA table_info("{table_name}")')).fetchall()
+            self._table_columns[table_name] = {row[1].lower(): row[1] for row in rows}
+        return self._table_columns[table_name]
+
+
+    def extract_columns(self, sql_query: str) -> List[tuple]:
+        """
+        Parse an SQL query and return the table columns used in WHERE, JOIN, GROUP BY and ORDER BY.
+
+        Args:
+            sql_query (str): SQL query to analyze.
+
+        Returns:
+            List[tuple]: (table, column, clause class) for every resolved column reference, with
+                the table and column names as created (identifiers are case-insensitive).
+        """
+        try:
+            tree = sqlglot.parse_one(sql_query, read="sqlite")
+        except sqlglot.errors.ParseError:
+            return []
+
+        # Aliases and names of the database tables in the query, lower-cased; CTE names resolve to None
+        aliases = {}
+        for table in tree.find_all(exp.Table):
+            table_name = self._table_name(table.name)
+            if table_name is not None:
+                aliases[table.alias_or_name.lower()] = table_name
+        tables = set(aliases.values())
+
+        used = []
+        for column in tree.find_all(exp.Column):
+            clause = column.find_ancestor(*CLAUSE_WEIGHTS)
+            if clause is None:
+                continue
+
+            # Resolve the column's table from its qualifier, or from the tables that have it
+            if column.table:
+                table_name = aliases.get(column.table.lower()) or self._table_name(column.table)
+                candidates = [table_name] if table_name else []
+            else:
+                candidates = sorted(tables)
+            for table_name in candidates:
+                column_name = self._columns_of(table_name).get(column.name.lower())
+                if column_name is not None:
+                    used.append((table_name, column_name, type(clause)))
+                    break
+        return used
+
+
+    def record(self, sql_query: str):
+        """
+        Record an executed SQL query.
+
+        Args:
+            sql_query (str): SQL query that ran against the database.
+        """
+        used = self.extract_columns(sql_query)
+
+        with self._lock:
+            for table_name, column_name, clause in used:
+                self._usage[(table_name, column_name)] += CLAUSE_WEIGHTS[clause]
+                self._clauses[(table_name, column_name)][clause.key.upper()] += 1
+            self._recorded += 1
+            run_pass = self.auto_create and self._recorded % self.check_every == 0
+
+        if run_pass and not self._applying.locked():
+            threading.Thread(target=self.apply, name="index-advisor", daemon=True).start()
+
+
+    # ============================ Proposals ============================
+    def _indexed_columns(self, conn, table_name: str) -> set:
+        """Return the columns that already lead an index on the table."""
+        indexed = set()
+        for index in conn.execute(text(f'PRAGMA index_list("{table_name}")')).fetchall():
+            info = conn.execute(text(f'PRAGMA index_info("{index[1]}")')).fetchall()
+            if info:
+                indexed.add(info[0][2])
+        return indexed
+
+
+    def _stats_of(self, conn, table_name: str, column_name: str) -> tuple:
+        """
+        Return the row count, distinct values and average width of a column.
+
+        The full scans run once per table version; without `version_fn` they run on every call.
+        """
+        version = self.version_fn().get(table_name.lower()) if self.version_fn else None
+        key = (table_name, column_name)
+        with self._lock:
+            cached = self._column_stats.get(key)
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+
+        stats = tuple(conn.execute(text(
+            f'SELECT COUNT(*), COUNT(DISTINCT "{column_name}"), AVG(LENGTH("{column_name}")) '
+            f'FROM "{table_name}"'
+        )).fetchone())
+        if version is not None:
+            with self._lock:
+                self._column_stats[key] = (version, stats)
+        return stats
+
+
+    def proposals(self) -> List[dict]:
+        """
+        Rank the frequently used columns that have no index yet.
+
+        Returns:
+            List[dict]: Proposed indexes with usage, clause counts and estimated size, best first.
+        """
+        with self._lock:
+            usage = [(key, score) for key, score in self._usage.most_common() if score >= self.min_queries]
+            clauses = {key: dict(self._clauses[key]) for key, _ in usage}
+
+        proposals = []
+        with self.engine.connect() as conn:
+            for (table_name, column_name), score in usage:
+                if column_name in self._indexed_columns(conn, table_name):
+                    continue
+
+                rows, distinct, avg_width = self._stats_of(conn, table_name, column_name)
+
+                # A column with a single value cannot narrow a scan
+                if distinct <= 1:
+                    continue
+
+                proposals.append({
+                    "table": table_name,
+                    "column": column_name,
+                    "score": score,
+                    "clauses": clauses[(table_name, column_name)],
+                    "distinct_values": distinct,
+                    "estimated_bytes": int(rows * ((avg_width or 0) + INDEX_ENTRY_OVERHEAD_BYTES)),
+                    "sql": f'CREATE INDEX IF NOT EXISTS "ix_advisor_{table_name}_{column_name}" '
+                           f'ON "{table_name}" ("{column_name}")',
+                })
+        return proposals
+
+
+    def _advisor_index_bytes(self, conn) -> int:
+        """Estimate the size of the indexes this advisor already created."""
+        total = 0
+        names = conn.execute(text(
+            "SELECT tbl_name, name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_advisor_%'"
+        )).fetchall()
+        for table_name, index_name in names:
+            column_name = conn.execute(text(f'PRAGMA index_info("{index_name}")')).fetchone()[2]
+            rows, _, avg_width = self._stats_of(conn, table_name, column_name)
+            total += int(rows * ((avg_width or 0) + INDEX_ENTRY_OVERHEAD_BYTES))
+        return total
+
+
+    def apply(self) -> List[dict]:
+        """
+        Create the proposed indexes that fit in the size budget, then refresh planner statistics.
+
+        Returns:
+            List[dict]: Proposals that were created.
+        """
+        if not self._applying.acquire(blocking=False):
+            return []
+        try:
+            proposals = self.proposals()
+            if not proposals:
+                return []
+
+            created = []
+            with self.engine.begin() as conn:
+                used_bytes = self._advisor_index_bytes(conn)
+                for proposal in proposals:
+                    if used_bytes + proposal["estimated_bytes"] > self.size_budget_bytes:
+                        continue
+                    conn.execute(text(proposal["sql"]))
+                    used_bytes += proposal["estimated_bytes"]
+                    created.append(proposal)
+                    logger.info("Index advisor created index on %s.%s", proposal['table'], proposal['column'])
+                if created:
+                    conn.execute(text("ANALYZE"))
+            return created
+        finally:
+            self._applying.release()
+
+
+    def report(self) -> dict:
+        """
+        Summarize recorded usage, proposals and the size budget.
+
+        Returns:
+            dict: Report suitable for returning as JSON.
+        """
+        with self._lock:
+            usage = [
+                {"table": t, "column": c, "score": score, "clauses": dict(self._clauses[(t, c)])}
+                for (t, c), score in self._usage.most_common()
+            ]
+            recorded = self._recorded
+
+        with self.engine.connect() as conn:
+            used_bytes = self._advisor_index_bytes(conn)
+
+        return {
+            "recorded_queries": recorded,
+            "auto_create": self.auto_create,
+            "size_budget_bytes": int(self.size_budget_bytes),
+            "advisor_index_bytes": used_bytes,
+            "column_usage": usage,
+            "proposals": self.proposals(),
+        }
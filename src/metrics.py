@@ -0,0 +1,198 @@
+import time
+import asyncio
+import functools
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# Latency buckets (seconds) covering cache hits through slow LLM calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Token-count buckets per LLM call
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+def _format_labels(label_names: Tuple[str, ...], label_values: Tuple[str, ...], extra: str = "") -> str:
+    """Render a Prometheus label set, e.g. `{stage="text2sql_llm",le="0.5"}`."""
+    pairs = [f'{name}="{value}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# ============================ Metric Types ============================
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: Dict[tuple, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+
+    def inc(self, *label_values: str, amount: float = 1):
+        """Add `amount` to the series identified by `label_values`."""
+        with self._lock:
+            self._values[label_values] += amount
+
+
+    def render(self) -> List[str]:
+        """Return the counter in the Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[tuple, List[int]] = {}
+        self._sums: Dict[tuple, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+
+    def observe(self, value: float, *label_values: str):
+        """Record one observation in the series identified by `label_values`."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.setdefault(label_values, [0] * (len(self.buckets) + 1))
+            counts[index] += 1
+            self._sums[label_values] += value
+
+
+    def summary(self) -> Dict[tuple, dict]:
+        """Return the observation count and sum of every series."""
+        with self._lock:
+            return {
+                label_values: {"count": sum(counts), "sum": self._sums[label_values]}
+                for label_values, counts in self._counts.items()
+            }
+
+
+    def render(self) -> List[str]:
+        """Return the histogram in the Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, counts in sorted(self._counts.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    labels = _format_labels(self.label_names, label_values, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.label_names, label_values)
+                lines.append(f"{self.name}_sum{labels} {self._sums[label_values]}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# ============================ Pipeline Metrics ============================
+stage_latency = Histogram(
+    "text2sql_stage_latency_seconds", "Latency of each query pipeline stage", ("stage",)
+)
+request_latency = Histogram(
+    "text2sql_request_latency_seconds", "End-to-end latency of a Text2SQL question", ("mode",)
+)
+stage_errors = Counter(
+    "text2sql_stage_errors_total", "Exceptions raised by each query pipeline stage", ("stage",)
+)
+request_errors = Counter(
+    "text2sql_request_errors_total", "Text2SQL questions that failed with an exception", ("mode",)
+)
+llm_tokens = Histogram(
+    "text2sql_llm_tokens", "Tokens per LLM call", ("stage", "kind"), buckets=TOKEN_BUCKETS
+)
+llm_tokens_total = Counter(
+    "text2sql_llm_tokens_total", "Tokens sent to and received from the LLM", ("stage", "kind")
+)
+cache_requests = Counter(
+    "text2sql_cache_requests_total", "Cache lookups by cache and result (hit or miss)", ("cache", "result")
+)
+speculation_results = Counter(
+    "text2sql_speculative_sql_total", "Speculative Text2SQL calls by result (hit or miss)", ("result",)
+)
+sql_repairs = Counter(
+    "text2sql_sql_repairs_total", "Attempts to correct failed SQL by result (fixed, failed or exhausted)", ("result",)
+)
+
+METRICS = (
+    stage_latency, request_latency, stage_errors, request_errors, llm_tokens, llm_tokens_total, cache_requests,
+    speculation_results, sql_repairs,
+)
+
+
+def timed(stage: str, histogram: Histogram = stage_latency, errors: Counter = stage_errors):
+    """
+    Decorator recording the wall time (and exceptions) of a sync or async function under `stage`.
+
+    Args:
+        stage (str): Label value identifying the stage.
+        histogram (Histogram): Histogram receiving the observation.
+        errors (Counter): Counter receiving the exceptions.
+
+    Returns:
+        Callable: Decorator preserving the wrapped function's signature.
+    """
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception:
+                    errors.inc(stage)
+                    raise
+                finally:
+                    histogram.observe(time.perf_counter() - start, stage)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                errors.inc(stage)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start, stage)
+        return wrapper
+    return decorator
+
+
+def record_token_usage(stage: str, response):
+    """
+    Record the prompt and completion token counts an LLM response reports.
+
+    Args:
+        stage (str): Pipeline stage that made the call.
+        response (ChatResponse): LLM response; OpenAI-compatible clients put usage in `additional_kwargs`.
+    """
+    usage = getattr(response, "additional_kwargs", None) or {}
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind) is not None:
+            llm_tokens.observe(usage[kind], stage, kind)
+            llm_tokens_total.inc(stage, kind, amount=usage[kind])
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Count a cache lookup as a hit or a miss."""
+    cache_requests.inc(cache, "hit" if hit else "miss")
+
+
+def render_metrics() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
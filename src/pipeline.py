@@ -1,62 +1,148 @@
+import logging
 from llama_index.core.query_pipeline import FnComponent
 from llama_index.core.query_pipeline import  QueryPipeline, InputComponent, Link
 
-from src.settings import table_retriever, llm
+from src.settings import AppContext, get_app_context
 from src.prompt import (
     sql_llm_prompt_function,
     final_response_prompt
 )
 
 from src.pipeline_modules import (
-    get_sqltable_info, 
+    retrieve_tables,
+    aretrieve_tables,
+    get_sqltable_info,
+    aget_sqltable_info,
+    generate_sql_response,
+    agenerate_sql_response,
+    start_speculative_sql,
+    astart_speculative_sql,
     extract_sql_query_from_response,
     execute_sql_query,
+    aexecute_sql_query,
+    executed_sql_query,
+    render_sql_result,
+    has_sql_query,
+    is_direct_answer,
+    is_failed_query,
+    build_direct_answer,
+    generate_final_response,
+    agenerate_final_response,
 )
 
+logger = logging.getLogger(__name__)
+
 # Define functional components for the pipeline
-get_table_info_component = FnComponent(fn=get_sqltable_info)
+# (async variants are used by `sql_query_pipeline.arun`; stage timings are recorded in src.metrics)
+fetch_table_name = FnComponent(fn=retrieve_tables, async_fn=aretrieve_tables)
+get_table_info_component = FnComponent(fn=get_sqltable_info, async_fn=aget_sqltable_info)
 text2sql_prompt = FnComponent(fn=sql_llm_prompt_function)
+speculative_sql = FnComponent(fn=start_speculative_sql, async_fn=astart_speculative_sql)
+# `speculative` is required (a None value is fine) so the LLM module waits for the speculation module
+text2sql_llm = FnComponent(
+    fn=generate_sql_response, async_fn=agenerate_sql_response,
+    req_params={"query_str", "schema", "prompt", "speculative"}, opt_params=set(),
+)
 sql_query_fetcher = FnComponent(fn=extract_sql_query_from_response)
-sql_query_executor = FnComponent(fn=execute_sql_query)
+sql_query_executor = FnComponent(fn=execute_sql_query, async_fn=aexecute_sql_query)
+render_data = FnComponent(fn=render_sql_result)
+direct_answer = FnComponent(fn=build_direct_answer)
 response_prompt = FnComponent(fn=final_response_prompt)
+response_llm = FnComponent(fn=generate_final_response, async_fn=agenerate_final_response)
 
 
-# Create the query pipeline with defined modules
-sql_query_pipeline = QueryPipeline(
-    modules={
-        "input": InputComponent(),
-        "fetch_table_name": table_retriever,
-        "get_table_info": get_table_info_component,
-        "text2sql_prompt": text2sql_prompt,
-        "text2sql_llm": llm,
-        "sql_query_fetcher": sql_query_fetcher,
-        "sql_query_executor": sql_query_executor,
-        "response_prompt": response_prompt,
-        "response_llm": llm,
-    }, 
-    verbose=True
-)
+# ============================ Query Pipeline ============================
+def build_sql_query_pipeline(app_context: AppContext) -> QueryPipeline:
+    """
+    Build the Text2SQL query pipeline on the context's retriever and LLM.
+
+    On the async pipeline, `speculative_sql` starts the Text2SQL call on the full schema
+    alongside table retrieval; `text2sql_llm` uses that call when retrieval selects the same
+    schema and cancels it otherwise.
+
+    Conditional links route small results, SQL queries that failed to run, and questions for
+    which no SQL query was generated to `direct_answer` instead of the response prompt and
+    LLM; modules whose inputs are never linked are skipped.
+
+    Args:
+        app_context (AppContext): Application context providing the configuration, models and
+            retrievers (resolved by the components on first use).
+
+    Returns:
+        QueryPipeline: Pipeline taking `query_str` and returning the final response.
+    """
+    def direct_answers_enabled() -> bool:
+        return app_context.config.get('response', {}).get('direct_answer', {}).get('enabled', True)
+
+    # Create the query pipeline with defined modules
+    sql_query_pipeline = QueryPipeline(
+        modules={
+            "input": InputComponent(),
+            # Listed before retrieval so speculation starts first
+            "speculative_sql": speculative_sql,
+            "fetch_table_name": fetch_table_name,
+            "get_table_info": get_table_info_component,
+            "text2sql_prompt": text2sql_prompt,
+            "text2sql_llm": text2sql_llm,
+            "sql_query_fetcher": sql_query_fetcher,
+            "sql_query_executor": sql_query_executor,
+            "render_data": render_data,
+            "direct_answer": direct_answer,
+            "response_prompt": response_prompt,
+            "response_llm": response_llm,
+        },
+        verbose=logger.isEnabledFor(logging.DEBUG)  # Per-module pipeline output only at DEBUG level
+    )
+
+    # Define the flow of data between components
+    sql_query_pipeline.add_links([
+        Link("input", "fetch_table_name"),
+        Link("fetch_table_name", "get_table_info", dest_key="table_schema_objs"),
+        Link("input", "text2sql_prompt", dest_key="query_str"),
+        Link("get_table_info", "text2sql_prompt", dest_key="schema"),
+        Link("input", "text2sql_llm", dest_key="query_str"),
+        Link("get_table_info", "text2sql_llm", dest_key="schema"),
+        Link("text2sql_prompt", "text2sql_llm", dest_key="prompt"),
+        Link("input", "speculative_sql", dest_key="query_str"),
+        Link("speculative_sql", "text2sql_llm", dest_key="speculative"),
+        Link("text2sql_llm", "sql_query_fetcher", dest_key="response"),
+        Link("sql_query_fetcher", "sql_query_executor", dest_key="sql_query", condition_fn=has_sql_query),
+        # Question and schema let the executor have failed SQL corrected by the LLM
+        Link("input", "sql_query_executor", dest_key="query_str"),
+        Link("get_table_info", "sql_query_executor", dest_key="schema"),
+
+        # Small results, failed queries and non-database questions are answered without the response LLM
+        Link("sql_query_fetcher", "direct_answer", dest_key="sql_query"),
+        Link("sql_query_executor", "direct_answer", dest_key="data",
+             condition_fn=lambda data: is_failed_query(data) or is_direct_answer(data)),
+        Link("sql_query_fetcher", "direct_answer", dest_key="data", input_fn=lambda sql_query: None,
+             condition_fn=lambda sql_query: not has_sql_query(sql_query) and direct_answers_enabled()),
+
+        Link("input", "response_prompt", dest_key="query_str"),
+        Link("sql_query_fetcher", "response_prompt", dest_key="sql_query"),
+        # The SQL that actually ran replaces the generated one (they differ after a repair)
+        Link("sql_query_executor", "response_prompt", dest_key="sql_query", input_fn=executed_sql_query,
+             condition_fn=bool),
+        Link("sql_query_executor", "render_data", dest_key="data",
+             condition_fn=lambda data: not is_failed_query(data) and not is_direct_answer(data)),
+        Link("render_data", "response_prompt", dest_key="data"),
+        Link("sql_query_fetcher", "response_prompt", dest_key="data", input_fn=lambda sql_query: None,
+             condition_fn=lambda sql_query: not has_sql_query(sql_query) and not direct_answers_enabled()),
+
+        Link("response_prompt", "response_llm"),
+    ])
 
-# Define the flow of data between components
-sql_query_pipeline.add_links([
-    Link("input", "fetch_table_name"),
-    Link("fetch_table_name", "get_table_info", dest_key="table_schema_objs"),
-    Link("input", "text2sql_prompt", dest_key="query_str"),
-    Link("get_table_info", "text2sql_prompt", dest_key="schema"),
-    Link("text2sql_prompt", "text2sql_llm"),
-    Link("text2sql_llm", "sql_query_fetcher", dest_key="response"),
-    Link("sql_query_fetcher", "sql_query_executor", dest_key="sql_query"),
+    return sql_query_pipeline
 
-    Link("input", "response_prompt", dest_key="query_str"),
-    Link("sql_query_fetcher", "response_prompt", dest_key="sql_query"),
-    Link("sql_query_executor", "response_prompt", dest_key="data"),
 
-    Link("response_prompt", "response_llm"),
-])
+def get_sql_query_pipeline() -> QueryPipeline:
+    """Return the process-wide query pipeline, building it (and its resources) on first use."""
+    app_context = get_app_context()
+    return app_context.get_or_create("sql_query_pipeline", lambda: build_sql_query_pipeline(app_context))
 
 
 # # Create a graph visualization of the pipeline
 # from pyvis.network import Network
 # net = Network(notebook=True, cdn_resources="in_line", directed=True)
-# net.from_nx(sql_query_pipeline.dag)
+# net.from_nx(get_sql_query_pipeline().dag)
 # net.show("sql_query_pipeline.html")
\ No newline at end of file
@@ -0,0 +1,63 @@
+from typing import Any
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from llama_index.core.query_pipeline import QueryPipeline
+
+
+# ============================ Parallel Pipeline Executor ============================
+class ParallelPipelineExecutor:
+    """Runs a query pipeline as a dataflow graph, executing independent modules concurrently"""
+
+    def __init__(self, max_workers: int = 16):
+        """
+        Initialize the thread pool shared by all requests of the process.
+
+        Args:
+            max_workers (int): Maximum number of modules running at the same time.
+        """
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+
+
+    def run(self, pipeline: QueryPipeline, **pipeline_inputs: Any) -> Any:
+        """
+        Run `pipeline`, starting each module as soon as its required inputs are available.
+
+        `QueryPipeline.run` executes ready modules one after another; here every ready module
+        is submitted to the pool, and outputs are routed through the pipeline's links (including
+        their conditions) in the calling thread as modules finish.
+
+        Args:
+            pipeline (QueryPipeline): Pipeline with a single root and a single output module.
+            **pipeline_inputs: Inputs of the root module, e.g. `query_str`.
+
+        Returns:
+            Any: Output of the pipeline's leaf module.
+        """
+        run_state = pipeline.get_run_state(**pipeline_inputs)
+        scheduled = set()
+        running = {}
+
+        while True:
+            for module_key in pipeline.get_next_module_keys(run_state):
+                if module_key in scheduled:
+                    continue
+                scheduled.add(module_key)
+                module = run_state.module_dict[module_key]
+                module_input = dict(run_state.all_module_inputs[module_key])
+                running[self._pool.submit(module.run_component, **module_input)] = module_key
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                module_key = running.pop(future)
+                pipeline.process_component_output(future.result(), module_key, run_state)
+
+        if len(run_state.result_outputs) != 1:
+            raise ValueError("Only one output is supported.")
+        result_output = next(iter(run_state.result_outputs.values()))
+        if isinstance(result_output, dict) and len(result_output) == 1:
+            return next(iter(result_output.values()))
+        return result_output
@@ -1,11 +1,101 @@
-import os
+import time
+import asyncio
+import logging
 import pandas as pd
-from typing import List
-from llama_index.core.llms import ChatResponse
+from typing import List, Optional
+from llama_index.core import QueryBundle
+from llama_index.core.llms import ChatResponse, ChatMessage, MessageRole
+from llama_index.core.objects import SQLTableSchema
+
+from src.settings import get_app_context
+from src.prompt import sql_llm_prompt_function, sql_repair_prompt
+from src.metrics import timed, record_token_usage, stage_errors, speculation_results, sql_repairs
+from src.result_renderer import (
+    add_row_limit, render_result, render_markdown_answer,
+    numeric_columns, summary_queries, summarize_query_results,
+)
+from src.sql_validator import referenced_tables, is_aggregate
+
+logger = logging.getLogger(__name__)
+
+# Reply to questions that need no SQL when direct answers are enabled
+NON_DATABASE_REPLY = "I can answer questions about the HR data, for example employees, departments, salaries or performance."
+
+# Reply when the generated SQL (and every correction) failed to run
+FAILED_QUERY_REPLY = "Sorry, I couldn't answer that question from the data. Please try rephrasing it."
+
+
+# ============================ Table Retrieval Functions ============================
+@timed("embed_queries")
+def embed_queries(query_strs: List[str]) -> List[List[float]]:
+    """
+    Embed several queries with as few embedding-model round trips as possible.
+
+    Ollama's `/api/embed` accepts a list of inputs, so the whole batch is a single request;
+    other embedding models embed the queries one by one.
+
+    Args:
+        query_strs (List[str]): Queries to embed.
+
+    Returns:
+        List[List[float]]: One embedding per query, in order.
+    """
+    if not query_strs:
+        return []
+    embed_model = get_app_context().embedding_model
+    client = getattr(embed_model, "_client", None)
+    if hasattr(client, "embed"):
+        result = client.embed(model=embed_model.model_name, input=query_strs)
+        return [list(embedding) for embedding in result["embeddings"]]
+    return [embed_model.get_query_embedding(query_str) for query_str in query_strs]
+
+
+@timed("fetch_table_name")
+def retrieve_tables(query_str: str, embedding: Optional[List[float]] = None) -> List[SQLTableSchema]:
+    """
+    Retrieve the table schemas most similar to the user's query.
+
+    Args:
+        query_str (str): User's input query.
+        embedding (List[float]): Precomputed query embedding (e.g. from `embed_queries`).
+
+    Returns:
+        List[SQLTableSchema]: Table schema objects of the retrieved tables.
+    """
+    app_context = get_app_context()
+    # When every question selects the whole schema, the embedding call and vector search are skipped
+    if app_context.table_retriever.covers_all_tables():
+        return app_context.table_schema_objs
+    return app_context.table_retriever.retrieve(QueryBundle(query_str=query_str, embedding=embedding))
+
+
+@timed("fetch_table_name")
+async def aretrieve_tables(query_str: str) -> List[SQLTableSchema]:
+    """Async version of `retrieve_tables` using the retriever's async embedding call."""
+    app_context = get_app_context()
+    if await asyncio.to_thread(app_context.table_retriever.covers_all_tables):
+        return app_context.table_schema_objs
+    return await app_context.table_retriever.aretrieve(query_str)
 
-from src.settings import sql_database, SQLTableSchema, SQL_QUERY_EXECUTOR
 
 # ============================ Get SQL Table Info Functions ============================
+def _render_schema(table_schema_objs: List[SQLTableSchema]) -> str:
+    """Join the cached context strings of the tables, in table-name order."""
+    context_strs = []
+    schema_context_cache = get_app_context().schema_context_cache
+
+    # Canonical order: the same set of tables always gives the same schema string
+    # (stable SQL cache keys, and speculative SQL can be matched against it)
+    for table_schema_obj in sorted(table_schema_objs, key=lambda t: t.table_name):
+        # Get the pre-rendered schema, basic information and description of the table,
+        # limited to the columns the retriever selected
+        context_strs.append(schema_context_cache.get(table_schema_obj, getattr(table_schema_obj, "columns", None)))
+
+    # Return a combined context string for all tables
+    return "\n\n".join(context_strs)
+
+
+@timed("get_table_info")
 def get_sqltable_info(table_schema_objs: List[SQLTableSchema]) -> str:
     """
     Generate a context string for each table based on its schema and additional context.
@@ -16,20 +106,172 @@ def get_sqltable_info(table_schema_objs: List[SQLTableSchema]) -> str:
     Returns:
         str: Combined context string for all tables.
     """
-    context_strs = []
+    return _render_schema(table_schema_objs)
 
-    for table_schema_obj in table_schema_objs:
-        # Get the schema and basic information of the table
-        table_info = sql_database.get_single_table_info(table_schema_obj.table_name)
 
-        # Append additional context or description of the table, if available
-        if table_schema_obj.context_str:
-            table_info += f"\nThe table description is: {table_schema_obj.context_str}"
+async def aget_sqltable_info(table_schema_objs: List[SQLTableSchema]) -> str:
+    """Async version of `get_sqltable_info`; any schema refresh runs on a worker thread."""
+    return await asyncio.to_thread(get_sqltable_info, table_schema_objs)
 
-        context_strs.append(table_info)
 
-    # Return a combined context string for all tables
-    return "\n\n".join(context_strs)
+# ============================ Generate SQL Query Functions ============================
+def _generate_sql_response(query_str: str, schema: str, prompt: str) -> ChatResponse:
+    """Ask the LLM for an SQL query, reusing SQL already generated for the same question and schema."""
+    app_context = get_app_context()
+    sql_query_cache = app_context.sql_query_cache
+
+    if sql_query_cache is not None:
+        cached_sql_query = sql_query_cache.get(query_str, schema)
+        if cached_sql_query is not None:
+            return ChatResponse(
+                message=ChatMessage(role=MessageRole.ASSISTANT, content=f"SQLQuery: {cached_sql_query}")
+            )
+
+    response = app_context.llm.chat([ChatMessage(role=MessageRole.USER, content=prompt)])
+    record_token_usage("text2sql_llm", response)
+
+    if sql_query_cache is not None:
+        sql_query = extract_sql_query_from_response(response)
+        if sql_query:
+            sql_query_cache.put(query_str, schema, sql_query)
+
+    return response
+
+
+async def _agenerate_sql_response(query_str: str, schema: str, prompt: str) -> ChatResponse:
+    """Async version of `_generate_sql_response` using the LLM's async client."""
+    app_context = get_app_context()
+    sql_query_cache = app_context.sql_query_cache
+
+    if sql_query_cache is not None:
+        cached_sql_query = await asyncio.to_thread(sql_query_cache.get, query_str, schema)
+        if cached_sql_query is not None:
+            return ChatResponse(
+                message=ChatMessage(role=MessageRole.ASSISTANT, content=f"SQLQuery: {cached_sql_query}")
+            )
+
+    response = await app_context.llm.achat([ChatMessage(role=MessageRole.USER, content=prompt)])
+    record_token_usage("text2sql_llm", response)
+
+    if sql_query_cache is not None:
+        sql_query = extract_sql_query_from_response(response)
+        if sql_query:
+            await asyncio.to_thread(sql_query_cache.put, query_str, schema, sql_query)
+
+    return response
+
+
+@timed("text2sql_llm")
+def generate_sql_response(
+    query_str: str, schema: str, prompt: str, speculative: Optional["SpeculativeSQL"] = None
+) -> ChatResponse:
+    """
+    Ask the LLM for an SQL query, reusing SQL already generated for the same question and schema.
+
+    Args:
+        query_str (str): User's input query.
+        schema (str): Schema string the SQL is generated against.
+        prompt (str): Text2SQL prompt for the LLM.
+        speculative (SpeculativeSQL, optional): Output of `start_speculative_sql`, always None
+            (the sync pipeline does not speculate).
+
+    Returns:
+        ChatResponse: LLM response, or a synthetic response carrying the cached SQL query.
+    """
+    return _generate_sql_response(query_str, schema, prompt)
+
+
+@timed("text2sql_llm")
+async def agenerate_sql_response(
+    query_str: str, schema: str, prompt: str, speculative: Optional["SpeculativeSQL"] = None
+) -> ChatResponse:
+    """
+    Async version of `generate_sql_response` using the LLM's async client.
+
+    Args:
+        query_str (str): User's input query.
+        schema (str): Schema string the SQL is generated against.
+        prompt (str): Text2SQL prompt for the LLM.
+        speculative (SpeculativeSQL, optional): Call started by `astart_speculative_sql` on the full
+            schema; its result is used when retrieval selected the same schema, otherwise it is cancelled.
+
+    Returns:
+        ChatResponse: LLM response, or a synthetic response carrying the cached SQL query.
+    """
+    if speculative is not None:
+        if speculative.schema == schema:
+            speculation_results.inc("hit")
+            return await speculative.future
+        speculative.cancel()
+        speculation_results.inc("miss")
+
+    return await _agenerate_sql_response(query_str, schema, prompt)
+
+
+# ============================ Speculative SQL Functions ============================
+class SpeculativeSQL:
+    """Text2SQL LLM call started on the full schema while table retrieval is still running"""
+
+    def __init__(self, schema: str, task: asyncio.Task):
+        self.schema = schema
+        self.future = task
+
+
+    def cancel(self):
+        """Cancel the speculative call, aborting its in-flight LLM request."""
+        self.future.cancel()
+
+
+def _speculation_schema() -> Optional[str]:
+    """Return the full schema when speculation is enabled and retrieval may select all of it, else None."""
+    app_context = get_app_context()
+    speculation_config = app_context.config.get('pipeline', {}).get('speculation', {})
+    if not speculation_config.get('enabled', True):
+        return None
+
+    # A schema too large for the retrieval budget never matches the selected one, and
+    # when every question selects all of it retrieval is skipped, leaving nothing to overlap
+    table_retriever = app_context.table_retriever
+    if not table_retriever.full_schema_fits() or table_retriever.covers_all_tables():
+        return None
+    return _render_schema(app_context.table_schema_objs)
+
+
+def start_speculative_sql(query_str: str) -> Optional[SpeculativeSQL]:
+    """
+    Sync pipeline counterpart of `astart_speculative_sql`, which never speculates: an LLM
+    call running on a thread cannot be stopped, so every miss would still pay for it.
+
+    Args:
+        query_str (str): User's input query.
+
+    Returns:
+        Optional[SpeculativeSQL]: Always None.
+    """
+    return None
+
+
+async def astart_speculative_sql(query_str: str) -> Optional[SpeculativeSQL]:
+    """
+    Start the Text2SQL LLM call on the full schema as a task, so it overlaps with table
+    retrieval. `agenerate_sql_response` uses it if retrieval selects every table and
+    cancels it otherwise.
+
+    Args:
+        query_str (str): User's input query.
+
+    Returns:
+        Optional[SpeculativeSQL]: The running call, or None when speculation does not apply.
+    """
+    schema = await asyncio.to_thread(_speculation_schema)
+    if schema is None:
+        return None
+
+    prompt = sql_llm_prompt_function(query_str, schema)
+    task = asyncio.create_task(_agenerate_sql_response(query_str, schema, prompt))
+    # Retrieve the exception of a dropped task so asyncio does not log it as unhandled
+    task.add_done_callback(lambda done: done.cancelled() or done.exception())
+    return SpeculativeSQL(schema, task)
 
 
 # ============================ Extract SQL Query Functions ============================
@@ -45,7 +287,7 @@ def extract_sql_query_from_response(response: ChatResponse) -> str:
         str: Extracted SQL query.
     """
     response_content = response.message.content
-    print(response_content)
+    logger.debug("Text2SQL LLM response: %s", response_content)
 
     # Locate the starting position of the SQL query in the response
     sql_query_start = response_content.find("SQLQuery:")
@@ -69,32 +311,328 @@ def extract_sql_query_from_response(response: ChatResponse) -> str:
 
 
 # ============================ Execute SQL Query Functions ============================
-def execute_sql_query(sql_query: str):
+@timed("validate_sql")
+def validate_sql_query(sql_query: str):
+    """
+    Parse the SQL query and check it against the cached schema and its query plan before it runs.
+
+    Args:
+        sql_query (str): The SQL query to validate.
+
+    Returns:
+        exp.Expression: Parsed query.
+
+    Raises:
+        SQLValidationError: If the query is not a single read-only SELECT, refers to unknown
+            tables or columns, or its plan is too costly.
+    """
+    return get_app_context().sql_validator.validate(sql_query)
+
+
+def _run_sql_query(sql_query: str):
+    """Validate and run a query (row-capped), raising on any validation or SQLite error."""
+    app_context = get_app_context()
+
+    # Results of SQL that already ran and validated are reused until its tables are re-ingested
+    result_cache = app_context.result_cache
+    cached = result_cache.get(sql_query) if result_cache is not None else None
+    if cached is not None:
+        data = app_context.sql_query_executor.to_nodes(*cached)
+    else:
+        # Cap the rows of non-aggregate queries, then validate exactly what will run
+        row_limit = app_context.config.get('response', {}).get('row_limit', 1000)
+        limited_sql_query = add_row_limit(sql_query, row_limit)
+        tree = validate_sql_query(limited_sql_query)
+
+        # Execute the query if it passes validation
+        data = app_context.sql_query_executor.retrieve(limited_sql_query)
+
+        if result_cache is not None:
+            metadata = data[0].metadata
+            result_cache.put(
+                sql_query, limited_sql_query, referenced_tables(tree),
+                metadata["col_keys"], metadata["result"], aggregate=is_aggregate(tree),
+            )
+
+    # Record the predicate columns for index recommendations, cache hits included
+    if app_context.index_advisor is not None:
+        app_context.index_advisor.record(sql_query)
+    return _with_unlimited_sql(data, sql_query)
+
+
+def _with_unlimited_sql(data, sql_query: str):
+    """Keep the query as generated in the result metadata when a row limit was added to it."""
+    if data and data[0].metadata.get("sql_query") != sql_query:
+        data[0].metadata["unlimited_sql_query"] = sql_query
+    return data
+
+
+def _discard_failed_sql(sql_query: str, error: Exception):
+    """Log a failed query and make sure it is never served from the SQL cache again."""
+    logger.error("Error occurred while executing the SQL query: %s", error)
+    stage_errors.inc("sql_query_executor")
+
+    sql_query_cache = get_app_context().sql_query_cache
+    if sql_query_cache is not None:
+        sql_query_cache.discard(sql_query)
+
+
+@timed("sql_repair")
+def repair_sql_query(query_str: str, schema: str, sql_query: str, error: str) -> str:
+    """
+    Ask the LLM to correct a failed SQL query, reusing a known fix for the same question, query and schema.
+
+    Args:
+        query_str (str): User's input query.
+        schema (str): Schema string the SQL was generated against.
+        sql_query (str): SQL query that failed.
+        error (str): Validation or SQLite error message.
+
+    Returns:
+        str: Corrected SQL query (may be empty or `None` if the LLM gave up).
+    """
+    app_context = get_app_context()
+    sql_query_cache = app_context.sql_query_cache
+    if sql_query_cache is not None:
+        fixed_sql = sql_query_cache.get_fix(query_str, sql_query, schema)
+        if fixed_sql is not None:
+            return fixed_sql
+
+    prompt = sql_repair_prompt(query_str, schema, sql_query, error)
+    response = app_context.llm.chat([ChatMessage(role=MessageRole.USER, content=prompt)])
+    record_token_usage("sql_repair", response)
+    return extract_sql_query_from_response(response)
+
+
+def _repair_and_execute(query_str: str, schema: str, sql_query: str, error: Exception):
+    """
+    Feed the error back to the LLM and run its corrections, within the attempt and latency budget.
+
+    Returns:
+        Any: Query result of the first correction that runs, or None.
+    """
+    app_context = get_app_context()
+    repair_config = app_context.config.get('sql_repair', {})
+    if not repair_config.get('enabled', True):
+        return None
+
+    deadline = time.monotonic() + repair_config.get('latency_budget_seconds', 10)
+    failed_sql_queries = [sql_query]
+    for _ in range(repair_config.get('max_attempts', 2)):
+        if time.monotonic() >= deadline:
+            break
+
+        fixed_sql = repair_sql_query(query_str, schema, failed_sql_queries[-1], str(error))
+        if not has_sql_query(fixed_sql) or fixed_sql in failed_sql_queries:
+            break
+
+        logger.info("Retrying with corrected SQL query: %s", fixed_sql)
+        try:
+            data = _run_sql_query(fixed_sql)
+        except Exception as e:
+            _discard_failed_sql(fixed_sql, e)
+            sql_repairs.inc("failed")
+            failed_sql_queries.append(fixed_sql)
+            error = e
+            continue
+
+        # Remember the fix for every query in the chain, and serve it for this question from now on
+        sql_query_cache = app_context.sql_query_cache
+        if sql_query_cache is not None:
+            for failed_sql in failed_sql_queries:
+                sql_query_cache.put_fix(query_str, failed_sql, schema, fixed_sql)
+            sql_query_cache.put(query_str, schema, fixed_sql)
+        sql_repairs.inc("fixed")
+        data[0].metadata["repaired_from"] = sql_query
+        return data
+
+    sql_repairs.inc("exhausted")
+    return None
+
+
+@timed("sql_query_executor")
+def execute_sql_query(sql_query: str, query_str: Optional[str] = None, schema: Optional[str] = None):
     """
     Execute the given SQL query after validating it for safety.
 
+    If the query fails and the question and schema are given, the error is fed back to the
+    LLM for a bounded number of corrections (config `sql_repair`).
+
     Args:
         sql_query (str): The SQL query to execute.
+        query_str (str, optional): User's input query the SQL was generated for.
+        schema (str, optional): Schema string the SQL was generated against.
 
     Returns:
-        Any: Query result if successful, or None if an error occurs.
+        Any: Query result if successful (its metadata holds the SQL that actually ran),
+            or None if an error occurs.
     """
+    logger.info("Executing SQL query: %s", sql_query)
     try:
-        # Convert the SQL query to lowercase for case-insensitive checks
-        sql_lower = sql_query.lower()
-        print(sql_query)
+        return _run_sql_query(sql_query)
+    except Exception as e:
+        _discard_failed_sql(sql_query, e)
+        if query_str is None or schema is None:
+            return None
+        return _repair_and_execute(query_str, schema, sql_query, e)
 
-        # List of forbidden destructive and modification SQL keywords
-        forbidden_keywords = ["delete", "drop", "truncate", "alter", "update", "insert"]
 
-        # Check if the SQL query contains any forbidden keywords
-        if any(keyword in sql_lower for keyword in forbidden_keywords):
-            raise ValueError("Destructive or modifying SQL operation detected. Operation not allowed.")
+async def aexecute_sql_query(sql_query: str, query_str: Optional[str] = None, schema: Optional[str] = None):
+    """Async version of `execute_sql_query`; runs the query (and any repair) on a worker thread so the event loop stays free."""
+    return await asyncio.to_thread(execute_sql_query, sql_query, query_str, schema)
+
+
+def executed_sql_query(data) -> Optional[str]:
+    """Return the SQL that produced a query result (row-capped, and the corrected one after a repair), or None if it failed."""
+    if not data:
+        return None
+    return data[0].metadata["sql_query"]
 
-        # Execute the query if it passes validation
-        data = SQL_QUERY_EXECUTOR.retrieve(sql_query)
-        return data
 
+# ============================ Render Data Functions ============================
+@timed("render_data")
+def render_sql_result(data):
+    """
+    Render the query result for the response prompt within the configured row and token budget.
+
+    Args:
+        data (List[NodeWithScore]): Output of `execute_sql_query`, or None if the query failed.
+
+    Returns:
+        Optional[str]: CSV rows or an aggregate summary, or None if there is no result.
+    """
+    if not data:
+        return None
+
+    response_config = get_app_context().config.get('response', {})
+    metadata = data[0].metadata
+    columns = metadata.get("col_keys", [])
+    rows = metadata.get("result", [])
+    row_limit = response_config.get('row_limit', 1000)
+
+    # A result cut by the row limit is summarized in SQL over all of its rows
+    total_rows, summary = None, None
+    if row_limit and len(rows) >= row_limit and metadata.get("unlimited_sql_query"):
+        total_rows, summary = _summarize_full_result(metadata["unlimited_sql_query"], columns, rows)
+
+    return render_result(
+        columns=columns,
+        rows=rows,
+        max_rows=response_config.get('max_rows', 50),
+        max_tokens=response_config.get('max_data_tokens', 2000),
+        row_limit=row_limit,
+        total_rows=total_rows,
+        summary=summary,
+    )
+
+
+def _summarize_full_result(sql_query: str, columns: List[str], rows: List[tuple]):
+    """
+    Compute the column summary of a row-capped result over every row of its query.
+
+    Args:
+        sql_query (str): Validated query, without the row limit.
+        columns (List[str]): Column names.
+        rows (List[tuple]): Fetched (capped) rows, used to tell numeric columns apart.
+
+    Returns:
+        Tuple[Optional[int], Optional[str]]: Total row count and summary, or (None, None) if
+            the summary queries fail, in which case the fetched rows are summarized instead.
+    """
+    executor = get_app_context().sql_query_executor
+    numeric = numeric_columns(columns, rows)
+    try:
+        results = [executor.execute(query)[1] for query in summary_queries(sql_query, numeric)]
     except Exception as e:
-        print(f"Error occurred while executing the SQL query: {str(e)}")
-        return None
\ No newline at end of file
+        logger.warning("Could not summarize the full query result: %s", e)
+        return None, None
+    return summarize_query_results(columns, numeric, results)
+
+
+# ============================ Direct Answer Functions ============================
+def has_sql_query(sql_query: str) -> bool:
+    """Whether the LLM produced an SQL query rather than `None` for a non-database question."""
+    return sql_query.strip().strip("`").strip().lower() not in ("", "none")
+
+
+def is_direct_answer(data) -> bool:
+    """
+    Whether a query result is small enough to answer from a template instead of the response LLM.
+
+    Args:
+        data (List[NodeWithScore]): Output of `execute_sql_query`, or None if the query failed.
+
+    Returns:
+        bool: True if direct answers are enabled and the result has at most `max_rows` rows.
+    """
+    direct_answer_config = get_app_context().config.get('response', {}).get('direct_answer', {})
+    if not direct_answer_config.get('enabled', True) or not data:
+        return False
+    return len(data[0].metadata.get("result", [])) <= direct_answer_config.get('max_rows', 10)
+
+
+def is_failed_query(data) -> bool:
+    """Whether the SQL query (and every correction) failed, so there is no data to answer from."""
+    return data is None
+
+
+def use_direct_answer(sql_query: str, data) -> bool:
+    """Whether the answer is built by `build_direct_answer` (the routing of the pipeline's conditional links)."""
+    if is_direct_answer(data) or (has_sql_query(sql_query) and is_failed_query(data)):
+        return True
+    direct_answer_config = get_app_context().config.get('response', {}).get('direct_answer', {})
+    return not has_sql_query(sql_query) and direct_answer_config.get('enabled', True)
+
+
+@timed("direct_answer")
+def build_direct_answer(sql_query: str, data) -> ChatResponse:
+    """
+    Answer without the response LLM: a templated answer for a small result, the configured
+    reply for a non-database question, or a fixed reply when the SQL query failed to run.
+
+    Args:
+        sql_query (str): SQL query used to fetch the data.
+        data (List[NodeWithScore]): Query result, or None when no SQL query was generated or it failed.
+
+    Returns:
+        ChatResponse: Synthetic response carrying the answer; a failed query is flagged with
+            `failed_query` in `additional_kwargs`, so the reply is never cached.
+    """
+    if data is None and has_sql_query(sql_query):
+        # Never let the response LLM answer without data
+        answer = get_app_context().config.get('response', {}).get('failed_query_reply', FAILED_QUERY_REPLY)
+        return ChatResponse(
+            message=ChatMessage(role=MessageRole.ASSISTANT, content=answer), additional_kwargs={"failed_query": True}
+        )
+    elif data is None:
+        direct_answer_config = get_app_context().config.get('response', {}).get('direct_answer', {})
+        answer = direct_answer_config.get('non_database_reply', NON_DATABASE_REPLY)
+    else:
+        metadata = data[0].metadata
+        answer = render_markdown_answer(metadata.get("col_keys", []), metadata.get("result", []))
+    return ChatResponse(message=ChatMessage(role=MessageRole.ASSISTANT, content=answer))
+
+
+# ============================ Final Response Functions ============================
+@timed("response_llm")
+def generate_final_response(prompt: str) -> ChatResponse:
+    """
+    Ask the LLM to answer the user's question from the query results.
+
+    Args:
+        prompt (str): Response prompt built by `final_response_prompt`.
+
+    Returns:
+        ChatResponse: LLM response.
+    """
+    response = get_app_context().llm.chat([ChatMessage(role=MessageRole.USER, content=prompt)])
+    record_token_usage("response_llm", response)
+    return response
+
+
+@timed("response_llm")
+async def agenerate_final_response(prompt: str) -> ChatResponse:
+    """Async version of `generate_final_response` using the LLM's async client."""
+    response = await get_app_context().llm.achat([ChatMessage(role=MessageRole.USER, content=prompt)])
+    record_token_usage("response_llm", response)
+    return response
@@ -0,0 +1,314 @@
+import re
+import sys
+import json
+import time
+import logging
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_sql(sql_query: str) -> str:
+    """
+    Normalize SQL text so trivially different spellings of a query share a cache key.
+
+    Only whitespace and a trailing semicolon are normalized; string literals stay case-sensitive.
+
+    Args:
+        sql_query (str): SQL query.
+
+    Returns:
+        str: Query with collapsed whitespace and no trailing semicolon.
+    """
+    return re.sub(r"\s+", " ", sql_query.strip().rstrip(";").strip())
+
+
+# ============================ Columnar Results ============================
+class ColumnarResult:
+    """Query result stored as one NumPy array per column instead of a list of row tuples"""
+
+    def __init__(self, columns: List[str], arrays: List[np.ndarray], row_count: int):
+        self.columns = columns
+        self.arrays = arrays
+        self.row_count = row_count
+
+
+    @staticmethod
+    def _to_array(values: list) -> np.ndarray:
+        """Pack a column into a typed array when every value has the same numeric type, else an object array."""
+        if values and all(type(value) is int for value in values):
+            try:
+                return np.array(values, dtype=np.int64)
+            except OverflowError:
+                pass
+        elif values and all(type(value) is float for value in values):
+            return np.array(values, dtype=np.float64)
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+
+
+    @classmethod
+    def from_rows(cls, columns: List[str], rows: List[tuple]) -> "ColumnarResult":
+        """Build a columnar result from result rows."""
+        arrays = [cls._to_array([row[i] for row in rows]) for i in range(len(columns))]
+        return cls(list(columns), arrays, len(rows))
+
+
+    def to_rows(self) -> List[tuple]:
+        """Return the result as row tuples of plain Python values."""
+        if not self.arrays:
+            return [() for _ in range(self.row_count)]
+        return list(zip(*(array.tolist() for array in self.arrays)))
+
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the result."""
+        size = 0
+        for array in self.arrays:
+            size += array.nbytes
+            if array.dtype == object:
+                size += sum(sys.getsizeof(value) for value in array)
+        return size
+
+
+# ============================ Result Cache ============================
+class ResultCache:
+    """
+    Results of generated SQL by normalized query text, invalidated per table by the ingestion
+    versions; frequently repeated aggregates can be promoted to materialized summary tables
+    """
+
+    def __init__(
+        self,
+        version_fn: Callable[[], Dict[str, int]],
+        max_entries: int = 256,
+        max_bytes: int = 64 * 1024 * 1024,
+        summary_db_path: Optional[str] = None,
+        promote_after: int = 5,
+        shared_store=None,
+        shared_ttl_seconds: float = 3600,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            version_fn (Callable): Returns the current data version of every table (lower-cased name).
+            max_entries (int): Maximum number of cached results before LRU eviction.
+            max_bytes (int): Maximum approximate memory held by cached results.
+            summary_db_path (str): SQLite file holding materialized aggregates; None disables them.
+            promote_after (int): Uses (executions or cache hits) of an aggregate query after which it is materialized.
+            shared_store (SharedStore): Store sharing results with the other workers; None keeps them per process.
+            shared_ttl_seconds (float): Lifetime of a result in the shared store.
+        """
+        self.version_fn = version_fn
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.promote_after = promote_after
+        self.shared_store = shared_store
+        self.shared_ttl_seconds = shared_ttl_seconds
+
+        self._entries = OrderedDict()   # normalized SQL -> (executed SQL, table versions, ColumnarResult, aggregate)
+        self._bytes = 0
+        self._uses: Dict[str, int] = {}  # uses of aggregate results not materialized yet
+        self._materialized = set()
+        self._lock = threading.Lock()
+
+        self._summary_conn = None
+        if summary_db_path:
+            self._summary_conn = sqlite3.connect(summary_db_path, check_same_thread=False)
+            self._summary_conn.execute("PRAGMA journal_mode=WAL")
+            self._summary_conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS materialized_results (
+                    sql_key        TEXT PRIMARY KEY,
+                    table_name     TEXT NOT NULL,
+                    sql_query      TEXT NOT NULL,
+                    columns        TEXT NOT NULL,
+                    table_versions TEXT NOT NULL,
+                    created_at     REAL NOT NULL,
+                    hits           INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            self._summary_conn.commit()
+
+
+    def _is_current(self, table_versions: Dict[str, int]) -> bool:
+        """Whether none of the tables a result was computed from has been re-ingested since."""
+        versions = self.version_fn()
+        return all(versions.get(table) == version for table, version in table_versions.items())
+
+
+    def get(self, sql_query: str) -> Optional[Tuple[str, List[str], List[tuple]]]:
+        """
+        Look up the result of a query in memory, then in the shared store and then among the materialized aggregates.
+
+        Args:
+            sql_query (str): Generated SQL query.
+
+        Returns:
+            Optional[Tuple[str, List[str], List[tuple]]]: (executed SQL, column names, rows), or None on a miss.
+        """
+        key = normalize_sql(sql_query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._is_current(entry[1]):
+                self._evict(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            if self.shared_store is not None:
+                entry = self._load_shared(key)
+            if entry is None and self._summary_conn is not None:
+                entry = self._load_materialized(key)
+            if entry is not None:
+                with self._lock:
+                    self._store(key, entry)
+
+        record_cache_lookup("result", entry is not None)
+        if entry is None:
+            return None
+        self._record_use(key, entry)
+        executed_sql_query, _, result, _ = entry
+        return executed_sql_query, result.columns, result.to_rows()
+
+
+    def put(
+        self,
+        sql_query: str,
+        executed_sql_query: str,
+        tables: List[str],
+        columns: List[str],
+        rows: List[tuple],
+        aggregate: bool = False,
+    ):
+        """
+        Store the result of a query.
+
+        Args:
+            sql_query (str): Generated SQL query (the cache key).
+            executed_sql_query (str): SQL that actually ran (e.g. with a row limit added).
+            tables (List[str]): Tables the query reads (lower-cased).
+            columns (List[str]): Column names of the result.
+            rows (List[tuple]): Result rows.
+            aggregate (bool): Whether the query aggregates, making it a candidate for materialization.
+        """
+        key = normalize_sql(sql_query)
+        versions = self.version_fn()
+        table_versions = {t: versions.get(t) for t in tables}
+        entry = (executed_sql_query, table_versions, ColumnarResult.from_rows(columns, rows), aggregate)
+
+        with self._lock:
+            self._store(key, entry)
+        self._record_use(key, entry)
+
+        if self.shared_store is not None:
+            value = {"sql_query": executed_sql_query, "table_versions": table_versions,
+                     "columns": list(columns), "rows": rows, "aggregate": aggregate}
+            try:
+                self.shared_store.set("result", key, value, ttl_seconds=self.shared_ttl_seconds)
+            except TypeError:
+                logger.debug("Result of %r is not JSON-serializable; kept in this process only", key)
+
+
+    def _store(self, key: str, entry: tuple):
+        """Insert an entry and evict least recently used ones beyond the limits (lock held)."""
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = entry
+        self._bytes += entry[2].nbytes
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._evict(next(iter(self._entries)))
+
+
+    def _evict(self, key: str):
+        """Remove an entry (lock held)."""
+        entry = self._entries.pop(key)
+        self._bytes -= entry[2].nbytes
+
+
+    def _load_shared(self, key: str) -> Optional[tuple]:
+        """Read a result another worker stored, unless its tables were re-ingested since."""
+        value = self.shared_store.get("result", key)
+        if value is None or not self._is_current(value["table_versions"]):
+            return None
+        rows = [tuple(row) for row in value["rows"]]
+        result = ColumnarResult.from_rows(value["columns"], rows)
+        return value["sql_query"], value["table_versions"], result, value["aggregate"]
+
+
+    # ============================ Materialized Aggregates ============================
+    def _record_use(self, key: str, entry: tuple):
+        """Count a use of an aggregate result and materialize it once it is used `promote_after` times."""
+        if not entry[3] or self._summary_conn is None:
+            return
+        with self._lock:
+            if key in self._materialized:
+                return
+            # Use counts only steer promotion; forget them wholesale rather than grow unbounded
+            if len(self._uses) > 10 * self.max_entries:
+                self._uses.clear()
+            uses = self._uses[key] = self._uses.get(key, 0) + 1
+        if uses >= self.promote_after:
+            self._materialize(key, entry)
+
+
+    def _materialize(self, key: str, entry: tuple):
+        """Persist an aggregate result as a summary table so every worker and restart can reuse it."""
+        executed_sql_query, table_versions, result, _ = entry
+        if not result.columns:
+            return
+        table_name = f"mv_{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}"
+        column_defs = ", ".join(f'"c{i}"' for i in range(len(result.columns)))
+        placeholders = ", ".join("?" for _ in result.columns)
+
+        with self._lock:
+            self._summary_conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+            self._summary_conn.execute(f'CREATE TABLE "{table_name}" ({column_defs})')
+            self._summary_conn.executemany(f'INSERT INTO "{table_name}" VALUES ({placeholders})', result.to_rows())
+            self._summary_conn.execute(
+                "INSERT OR REPLACE INTO materialized_results "
+                "(sql_key, table_name, sql_query, columns, table_versions, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, table_name, executed_sql_query, json.dumps(result.columns), json.dumps(table_versions), time.time()),
+            )
+            self._summary_conn.commit()
+            self._uses.pop(key, None)
+            self._materialized.add(key)
+        logger.info("Materialized aggregate query as %s: %s", table_name, executed_sql_query)
+
+
+    def _load_materialized(self, key: str) -> Optional[tuple]:
+        """Read a materialized aggregate, dropping it if its source tables were re-ingested."""
+        with self._lock:
+            row = self._summary_conn.execute(
+                "SELECT table_name, sql_query, columns, table_versions FROM materialized_results WHERE sql_key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            table_name, executed_sql_query, columns, table_versions = row
+            table_versions = json.loads(table_versions)
+            if not self._is_current(table_versions):
+                self._summary_conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+                self._summary_conn.execute("DELETE FROM materialized_results WHERE sql_key = ?", (key,))
+                self._summary_conn.commit()
+                self._materialized.discard(key)
+                return None
+
+            rows = self._summary_conn.execute(f'SELECT * FROM "{table_name}" ORDER BY rowid').fetchall()
+            self._summary_conn.execute("UPDATE materialized_results SET hits = hits + 1 WHERE sql_key = ?", (key,))
+            self._summary_conn.commit()
+            self._materialized.add(key)
+        return executed_sql_query, table_versions, ColumnarResult.from_rows(json.loads(columns), rows), True
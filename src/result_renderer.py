@@ -0,0 +1,301 @@
+import io
+import csv
+import pandas as pd
+from typing import List, Optional, Tuple
+
+import sqlglot
+from sqlglot import exp
+
+# Rough characters-per-token ratio used to estimate prompt size without a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Most common values listed per text column in a summary
+TOP_VALUES = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of LLM tokens in a string."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+# ============================ Row Limit ============================
+def _aggregates_rows(select: exp.Select) -> bool:
+    """Whether a SELECT itself groups or aggregates its rows; aggregates in subqueries and window functions do not count."""
+    if select.args.get("group") or select.args.get("having"):
+        return True
+    nested = (exp.Subquery, exp.Select, exp.Window)
+    return any(
+        isinstance(node, exp.AggFunc)
+        for projection in select.expressions
+        for node in projection.walk(prune=lambda node: isinstance(node, nested))
+    )
+
+
+def add_row_limit(sql_query: str, limit: int) -> str:
+    """
+    Add `LIMIT limit` to a plain SELECT whose outer query has no LIMIT, aggregate or GROUP BY.
+
+    The clause is appended to the SQL as written, so the query (and the column names of its
+    result) stays exactly as generated. Aggregating queries already return few rows, and
+    anything sqlglot cannot parse is returned unchanged.
+
+    Args:
+        sql_query (str): Generated SQL query.
+        limit (int): Maximum number of rows to fetch; 0 disables the rewrite.
+
+    Returns:
+        str: SQL query with a row limit, or the original query.
+    """
+    if not limit:
+        return sql_query
+    try:
+        tree = sqlglot.parse_one(sql_query, read="sqlite")
+        tokens = sqlglot.tokenize(sql_query, read="sqlite")
+    except sqlglot.errors.SqlglotError:
+        return sql_query
+
+    if not isinstance(tree, exp.Select) or tree.args.get("limit") or _aggregates_rows(tree):
+        return sql_query
+
+    # Cut after the last token, dropping a trailing semicolon or comment the LIMIT would land behind
+    statement_tokens = [token for token in tokens if token.token_type != sqlglot.TokenType.SEMICOLON]
+    return f"{sql_query[:statement_tokens[-1].end + 1]} LIMIT {limit}"
+
+
+# ============================ Result Rendering ============================
+def _format_number(value) -> str:
+    """Format a number without scientific notation, dropping trailing zeros."""
+    return f"{float(value):.2f}".rstrip("0").rstrip(".")
+
+
+def render_csv(columns: List[str], rows: List[tuple]) -> str:
+    """Render rows as CSV, preceded by a header line when `columns` is given."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if columns:
+        writer.writerow(columns)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def numeric_columns(columns: List[str], rows: List[tuple]) -> List[bool]:
+    """Return, per column, whether its (non-empty) values are numbers."""
+    df = pd.DataFrame(rows, columns=range(len(columns)))
+    flags = []
+    for position in range(len(columns)):
+        series = df[position].dropna()
+        flags.append(pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series))
+    return flags
+
+
+def _summary_line(name: str, stats: dict) -> str:
+    """Format the statistics of one column: `count` non-empty values, plus min/max/mean/sum or distinct/top values."""
+    if not stats["count"]:
+        return f"- {name}: all values empty"
+    if "mean" in stats:
+        return (
+            f"- {name} (numeric): min={_format_number(stats['min'])}, max={_format_number(stats['max'])}, "
+            f"mean={_format_number(stats['mean'])}, sum={_format_number(stats['sum'])}"
+        )
+    if stats["distinct"] == stats["count"]:
+        examples = ", ".join(str(value) for value, _ in stats["top"])
+        return f"- {name}: all {stats['distinct']} values distinct, e.g. {examples}"
+    common = ", ".join(f"{value} ({count})" for value, count in stats["top"])
+    return f"- {name}: {stats['distinct']} distinct values; most common: {common}"
+
+
+def summarize_rows(columns: List[str], rows: List[tuple]) -> str:
+    """
+    Describe every column of a result set: min/max/mean/sum for numeric columns,
+    distinct count and most common values for the rest.
+
+    Args:
+        columns (List[str]): Column names.
+        rows (List[tuple]): Result rows.
+
+    Returns:
+        str: One line per column.
+    """
+    df = pd.DataFrame(rows, columns=range(len(columns)))
+    lines = []
+    for position, (name, numeric) in enumerate(zip(columns, numeric_columns(columns, rows))):
+        series = df[position].dropna()
+        stats = {"count": len(series)}
+        if series.empty:
+            pass
+        elif numeric:
+            stats.update(min=series.min(), max=series.max(), mean=series.mean(), sum=series.sum())
+        else:
+            counts = series.astype(str).value_counts()
+            stats.update(distinct=len(counts), top=list(counts.head(TOP_VALUES).items()))
+        lines.append(_summary_line(name, stats))
+    return "\n".join(lines)
+
+
+def summary_queries(sql_query: str, numeric: List[bool]) -> List[str]:
+    """
+    Build the SQL computing the column summary over every row of a query, not just the fetched ones.
+
+    The query is wrapped in a CTE with positional column names (`c0`, `c1`, ...), so
+    duplicate or expression column names need no quoting.
+
+    Args:
+        sql_query (str): Query without the row limit.
+        numeric (List[bool]): Per column, whether it is numeric (from `numeric_columns`).
+
+    Returns:
+        List[str]: One query returning the row count and per-column aggregates, then one
+            most-common-values query per non-numeric column.
+    """
+    names = [f"c{i}" for i in range(len(numeric))]
+    cte = f"WITH result({', '.join(names)}) AS ({sql_query.strip().rstrip(';')})"
+
+    aggregates = ["COUNT(*)"]
+    for name, is_numeric in zip(names, numeric):
+        aggregates.append(f"COUNT({name})")
+        if is_numeric:
+            aggregates += [f"MIN({name})", f"MAX({name})", f"AVG({name})", f"SUM({name})"]
+        else:
+            aggregates.append(f"COUNT(DISTINCT {name})")
+
+    queries = [f"{cte} SELECT {', '.join(aggregates)} FROM result"]
+    for name, is_numeric in zip(names, numeric):
+        if not is_numeric:
+            queries.append(
+                f"{cte} SELECT CAST({name} AS TEXT), COUNT(*) FROM result WHERE {name} IS NOT NULL "
+                f"GROUP BY 1 ORDER BY 2 DESC, 1 LIMIT {TOP_VALUES}"
+            )
+    return queries
+
+
+def summarize_query_results(columns: List[str], numeric: List[bool], results: List[List[tuple]]) -> Tuple[int, str]:
+    """
+    Describe every column from the output of the `summary_queries`.
+
+    Args:
+        columns (List[str]): Column names.
+        numeric (List[bool]): Per column, whether it is numeric.
+        results (List[List[tuple]]): Rows returned by each summary query, in order.
+
+    Returns:
+        Tuple[int, str]: Total row count of the query, and one line per column.
+    """
+    aggregates = list(results[0][0])
+    top_values = iter(results[1:])
+    total_rows = aggregates.pop(0)
+
+    lines = []
+    for name, is_numeric in zip(columns, numeric):
+        stats = {"count": aggregates.pop(0)}
+        if is_numeric:
+            stats.update(zip(("min", "max", "mean", "sum"), aggregates[:4]))
+            del aggregates[:4]
+        else:
+            stats.update(distinct=aggregates.pop(0), top=next(top_values))
+        lines.append(_summary_line(name, stats))
+    return total_rows, "\n".join(lines)
+
+
+def render_result(
+    columns: List[str],
+    rows: List[tuple],
+    max_rows: int = 50,
+    max_tokens: int = 2000,
+    row_limit: int = 0,
+    total_rows: Optional[int] = None,
+    summary: Optional[str] = None,
+) -> str:
+    """
+    Render a query result for the response prompt within a row and token budget.
+
+    Results within the budget are sent in full as CSV. Larger results are replaced by
+    per-column aggregates plus as many leading rows as still fit, so the prompt size
+    does not grow with the number of rows.
+
+    Args:
+        columns (List[str]): Column names.
+        rows (List[tuple]): Result rows.
+        max_rows (int): Maximum number of rows sent verbatim.
+        max_tokens (int): Estimated token budget for the rendered data.
+        row_limit (int): LIMIT applied to the query, used to flag truncated results.
+        total_rows (int): Row count of the query without the row limit, if known.
+        summary (str): Column summary over every row of the query (`summarize_query_results`);
+            without it, a truncated result is summarized from the fetched rows and labelled so.
+
+    Returns:
+        str: CSV, or a summary followed by sample rows.
+    """
+    if not rows:
+        return "The query returned no rows."
+
+    full = render_csv(columns, rows)
+    if len(rows) <= max_rows and estimate_tokens(full) <= max_tokens:
+        return full
+
+    if summary is not None:
+        header = (
+            f"The query returned {total_rows} rows ({len(rows)} fetched, capped by the row limit); "
+            f"summary per column over all {total_rows} rows:\n{summary}\n"
+        )
+    elif row_limit and len(rows) >= row_limit:
+        header = (
+            f"The query returned more than {len(rows)} rows (capped by the row limit); summary per column "
+            f"of the first {len(rows)} rows only, not of the full result:\n{summarize_rows(columns, rows)}\n"
+        )
+    else:
+        header = f"The query returned {len(rows)} rows; summary per column:\n{summarize_rows(columns, rows)}\n"
+
+    # Fill the rest of the budget with leading rows
+    budget = max_tokens - estimate_tokens(header)
+    sample = render_csv(columns, [])
+    shown = 0
+    for row in rows[:max_rows]:
+        line = render_csv([], [row])
+        if estimate_tokens(sample + line) > budget:
+            break
+        sample += line
+        shown += 1
+
+    if not shown:
+        return header
+    return f"{header}\nFirst {shown} rows:\n{sample}"
+
+
+# ============================ Direct Answers ============================
+def _format_value(value) -> str:
+    """Format a single cell for a markdown answer."""
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return str(value).replace("|", "\\|").strip()
+
+
+def render_markdown_answer(columns: List[str], rows: List[tuple]) -> str:
+    """
+    Build a deterministic answer from a small result: a sentence for a scalar,
+    a bullet list for a single row, otherwise a markdown table.
+
+    Args:
+        columns (List[str]): Column names.
+        rows (List[tuple]): Result rows.
+
+    Returns:
+        str: Markdown answer.
+    """
+    if not rows:
+        return "No matching records were found."
+
+    if len(rows) == 1 and len(columns) == 1:
+        return f"The result is **{_format_value(rows[0][0])}**."
+
+    if len(rows) == 1:
+        return "\n".join(f"- **{name}**: {_format_value(value)}" for name, value in zip(columns, rows[0]))
+
+    lines = [
+        "| " + " | ".join(_format_value(name) for name in columns) + " |",
+        "|" + "---|" * len(columns),
+    ]
+    for row in rows:
+        lines.append("| " + " | ".join(_format_value(value) for value in row) + " |")
+    return "\n".join(lines)
@@ -1,12 +1,35 @@
-from src.pipeline import sql_query_pipeline
-from llama_index.core.base.llms.types import ChatResponse
+import time
+import asyncio
+import threading
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from src.pipeline import get_sql_query_pipeline
+from src.settings import get_app_context
+from src.cache import normalize_query
+from src.prompt import sql_llm_prompt_function, final_response_prompt
+from src.metrics import timed, request_latency, request_errors, stage_latency, record_token_usage
+from src.pipeline_modules import (
+    embed_queries,
+    retrieve_tables,
+    get_sqltable_info,
+    generate_sql_response,
+    extract_sql_query_from_response,
+    execute_sql_query,
+    executed_sql_query,
+    render_sql_result,
+    has_sql_query,
+    use_direct_answer,
+    build_direct_answer,
+    generate_final_response,
+)
+from llama_index.core.base.llms.types import ChatResponse, ChatMessage, MessageRole
 
 
-def run_text2sql_api(query_str):
-    """Run the API using the provided query string."""
-    response = sql_query_pipeline.run(query_str=query_str)
-
+def format_pipeline_response(response):
+    """Convert the pipeline output into the API result payload (`failed` is set when the SQL query failed)."""
     if isinstance(response, ChatResponse):
+        if response.additional_kwargs.get("failed_query"):
+            return {"message": response.message.content, "failed": True}
         return {"message": response.message.content}
     else:
         try:
@@ -14,3 +37,245 @@ def run_text2sql_api(query_str):
         except:
             return {"message": response[0]}
 
+
+@timed("sync", histogram=request_latency, errors=request_errors)
+def run_text2sql_api(query_str):
+    """Run the API using the provided query string, serving repeated questions from the answer cache."""
+    answer_cache = get_app_context().answer_cache
+    if answer_cache is not None:
+        cached = answer_cache.get(query_str)
+        if cached is not None:
+            return cached
+
+    # Independent modules run concurrently when the parallel executor is configured
+    pipeline_executor = get_app_context().pipeline_executor
+    if pipeline_executor is not None:
+        response = pipeline_executor.run(get_sql_query_pipeline(), query_str=query_str)
+    else:
+        response = get_sql_query_pipeline().run(query_str=query_str)
+    result = format_pipeline_response(response)
+
+    # A failed query is retried on the next request rather than served from the cache
+    if answer_cache is not None and not result.get("failed"):
+        answer_cache.put(query_str, result)
+    return result
+
+
+@timed("async", histogram=request_latency, errors=request_errors)
+async def arun_text2sql_api(query_str):
+    """Async version of `run_text2sql_api`, driving the pipeline through `arun`."""
+    app_context = get_app_context()
+    answer_cache = await asyncio.to_thread(lambda: app_context.answer_cache)
+    if answer_cache is not None:
+        cached = await answer_cache.aget(query_str)
+        if cached is not None:
+            return cached
+
+    sql_query_pipeline = await asyncio.to_thread(get_sql_query_pipeline)
+    response = await sql_query_pipeline.arun(query_str=query_str)
+    result = format_pipeline_response(response)
+
+    if answer_cache is not None and not result.get("failed"):
+        await answer_cache.aput(query_str, result)
+    return result
+
+
+def stream_text2sql_api(query_str):
+    """
+    Run the pipeline stage by stage, yielding progress events and then the final response tokens.
+
+    Yields:
+        tuple: (event name, payload) pairs: `tables`, `sql`, `rows`, `token` and finally `done`.
+    """
+    start = time.perf_counter()
+    try:
+        yield from _stream_events(query_str)
+    except Exception:
+        request_errors.inc("stream")
+        raise
+    finally:
+        request_latency.observe(time.perf_counter() - start, "stream")
+
+
+def _stream_events(query_str):
+    """Yield the events of `stream_text2sql_api` (its latency and errors are recorded by the caller)."""
+    app_context = get_app_context()
+    answer_cache = app_context.answer_cache
+    if answer_cache is not None:
+        cached = answer_cache.get(query_str)
+        if cached is not None:
+            yield "done", cached
+            return
+
+    table_schema_objs = retrieve_tables(query_str)
+    yield "tables", {"tables": [t.table_name for t in table_schema_objs]}
+
+    schema = get_sqltable_info(table_schema_objs)
+    prompt = sql_llm_prompt_function(query_str, schema)
+    sql_query = extract_sql_query_from_response(generate_sql_response(query_str, schema, prompt))
+    yield "sql", {"sql_query": sql_query}
+
+    data = None
+    if has_sql_query(sql_query):
+        data = execute_sql_query(sql_query, query_str, schema)
+        if data:
+            sql_query = executed_sql_query(data)
+            if data[0].metadata.get("repaired_from"):
+                yield "sql", {"sql_query": sql_query}
+        row_count = len(data[0].metadata.get("result", [])) if data else 0
+        yield "rows", {"row_count": row_count}
+
+    # Same routing as the pipeline: small results and non-database questions skip the response LLM
+    if use_direct_answer(sql_query, data):
+        result = format_pipeline_response(build_direct_answer(sql_query, data))
+        yield "token", {"text": result["message"]}
+    else:
+        # Stream the final response as it is generated
+        message = ""
+        chunk = None
+        response_start = time.perf_counter()
+        response_prompt = final_response_prompt(query_str, sql_query, render_sql_result(data))
+        for chunk in app_context.llm.stream_chat([ChatMessage(role=MessageRole.USER, content=response_prompt)]):
+            if chunk.delta:
+                message += chunk.delta
+                yield "token", {"text": chunk.delta}
+        stage_latency.observe(time.perf_counter() - response_start, "response_llm")
+        record_token_usage("response_llm", chunk)
+        result = {"message": message}
+
+    if answer_cache is not None and not result.get("failed"):
+        answer_cache.put(query_str, result)
+    yield "done", result
+
+
+def run_text2sql_batch(query_strs, concurrency=8):
+    """
+    Answer a list of questions, sharing work across the batch.
+
+    Identical questions (after normalization) are answered once, all questions are embedded
+    in a single embedding call, at most `concurrency` questions are in flight (bounding the
+    concurrent LLM calls) and identical generated SQL is executed once on the read-only pool.
+
+    Args:
+        query_strs (List[str]): Questions to answer.
+        concurrency (int): Maximum number of questions processed at once.
+
+    Yields:
+        tuple: (index, result) for every question as soon as its answer is ready; `result` holds
+            `status` and either `result` or `message`.
+    """
+    start = time.perf_counter()
+    answer_cache = get_app_context().answer_cache
+
+    # Group duplicate questions under their normalized form and embed each once
+    positions = {}
+    for index, query_str in enumerate(query_strs):
+        positions.setdefault(normalize_query(query_str), []).append(index)
+    keys = list(positions)
+    embeddings = dict(zip(keys, embed_queries(keys)))
+
+    sql_results = {}
+    sql_results_lock = threading.Lock()
+
+    def execute_once(sql_query, query_str, schema):
+        """Execute each distinct SQL query once; other questions wait for the same result (or repair)."""
+        with sql_results_lock:
+            future = sql_results.get(sql_query)
+            is_owner = future is None
+            if is_owner:
+                future = sql_results[sql_query] = Future()
+        if is_owner:
+            future.set_result(execute_sql_query(sql_query, query_str, schema))
+        return future.result()
+
+    def answer(key):
+        query_str = query_strs[positions[key][0]]
+        embedding = embeddings[key]
+        if answer_cache is not None:
+            cached = answer_cache.get(query_str, embedding)
+            if cached is not None:
+                return cached
+
+        schema = get_sqltable_info(retrieve_tables(query_str, embedding))
+        prompt = sql_llm_prompt_function(query_str, schema)
+        sql_query = extract_sql_query_from_response(generate_sql_response(query_str, schema, prompt))
+        data = execute_once(sql_query, query_str, schema) if has_sql_query(sql_query) else None
+        if data:
+            sql_query = executed_sql_query(data)
+
+        if use_direct_answer(sql_query, data):
+            response = build_direct_answer(sql_query, data)
+        else:
+            response = generate_final_response(final_response_prompt(query_str, sql_query, render_sql_result(data)))
+        result = format_pipeline_response(response)
+
+        if answer_cache is not None and not result.get("failed"):
+            answer_cache.put(query_str, result, embedding)
+        return result
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+        futures = {pool.submit(answer, key): key for key in keys}
+        for future in as_completed(futures):
+            try:
+                result = {"status": "success", "result": future.result()}
+            except Exception as e:
+                request_errors.inc("batch", amount=len(positions[futures[future]]))
+                result = {"status": "error", "message": str(e)}
+            for index in positions[futures[future]]:
+                yield index, result
+
+    request_latency.observe(time.perf_counter() - start, "batch")
+
+
+def parse_query_request(data):
+    """
+    Validate a `/run_api` or `/run_api/stream` request (JSON body or query parameters).
+
+    Args:
+        data (Mapping): JSON body or query parameters with `query`.
+
+    Returns:
+        str: The question.
+
+    Raises:
+        ValueError: If the request is not an object with a non-empty `query` string.
+    """
+    if not isinstance(data, Mapping) or 'query' not in data:
+        raise ValueError("Missing query parameter")
+    query = data['query']
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError("query must be a non-empty string")
+    return query
+
+
+def parse_batch_request(data, batch_config):
+    """
+    Validate a `/run_api/batch` request body.
+
+    Args:
+        data (dict): JSON body with `queries` (list of strings), optional `concurrency` and `stream`.
+        batch_config (dict): `batch` section of config.yml (`max_queries`, `concurrency`).
+
+    Returns:
+        tuple: (queries, concurrency, stream)
+
+    Raises:
+        ValueError: If the body is malformed or the batch is too large.
+    """
+    queries = data.get('queries') if isinstance(data, dict) else None
+    if not isinstance(queries, list) or not queries:
+        raise ValueError("Missing queries parameter")
+    if not all(isinstance(query, str) and query.strip() for query in queries):
+        raise ValueError("Every query must be a non-empty string")
+
+    max_queries = batch_config.get('max_queries', 500)
+    if len(queries) > max_queries:
+        raise ValueError(f"A batch can hold at most {max_queries} queries")
+
+    # Clients may lower the concurrency but not raise it above the configured limit
+    max_concurrency = batch_config.get('concurrency', 8)
+    try:
+        concurrency = max(1, min(int(data.get('concurrency', max_concurrency)), max_concurrency))
+    except (TypeError, ValueError):
+        raise ValueError("concurrency must be an integer")
+    return queries, concurrency, bool(data.get('stream', False))
@@ -0,0 +1,227 @@
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Union
+
+from llama_index.core import QueryBundle, VectorStoreIndex
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.objects import SQLTableSchema
+from llama_index.core.schema import NodeWithScore, TextNode
+from llama_index.core.vector_stores import ExactMatchFilter, MetadataFilters
+
+from src.cache import SchemaContextCache
+from src.result_renderer import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Node metadata that identifies the table/column but is not embedded
+NODE_METADATA_KEYS = ["kind", "table", "column"]
+
+
+class SelectedTable(SQLTableSchema):
+    """Table chosen for a question; only `columns` are shown in the prompt (all of them if None)"""
+
+    columns: Optional[List[str]] = None
+
+
+# ============================ Schema Nodes ============================
+def build_schema_nodes(
+    table_schema_objs: List[SQLTableSchema],
+    schema_context_cache: SchemaContextCache,
+) -> List[TextNode]:
+    """
+    Build one node per table (name, description and column names) and one node per column
+    (type and description), so tables and columns are embedded and matched separately.
+
+    Args:
+        table_schema_objs (List[SQLTableSchema]): Tables and their descriptions.
+        schema_context_cache (SchemaContextCache): Source of the rendered column lines.
+
+    Returns:
+        List[TextNode]: Nodes with stable ids (`table:<name>`, `column:<table>.<column>`).
+    """
+    nodes = []
+    for table_schema_obj in table_schema_objs:
+        table_name = table_schema_obj.table_name
+        column_lines = schema_context_cache.column_lines(table_name)
+
+        table_text = f"Table {table_name}"
+        if table_schema_obj.context_str:
+            table_text += f": {table_schema_obj.context_str}"
+        table_text += "\nColumns: " + ", ".join(name for name, _ in column_lines)
+        nodes.append(TextNode(
+            id_=f"table:{table_name}",
+            text=table_text,
+            metadata={"kind": "table", "table": table_name, "column": ""},
+            excluded_embed_metadata_keys=NODE_METADATA_KEYS,
+            excluded_llm_metadata_keys=NODE_METADATA_KEYS,
+        ))
+
+        for column_name, line in column_lines:
+            nodes.append(TextNode(
+                id_=f"column:{table_name}.{column_name}",
+                text=f"{table_name}.{line.lstrip('- ')}",
+                metadata={"kind": "column", "table": table_name, "column": column_name},
+                excluded_embed_metadata_keys=NODE_METADATA_KEYS,
+                excluded_llm_metadata_keys=NODE_METADATA_KEYS,
+            ))
+    return nodes
+
+
+# ============================ Schema Retriever ============================
+class SchemaRetriever:
+    """Picks the tables and columns relevant to a question so the rendered schema fits a token budget"""
+
+    def __init__(
+        self,
+        index: VectorStoreIndex,
+        table_schema_objs: List[SQLTableSchema],
+        schema_context_cache: SchemaContextCache,
+        embed_model: BaseEmbedding,
+        max_schema_tokens: int = 2000,
+        max_tables: int = 5,
+        table_candidates: int = 10,
+        column_candidates: int = 30,
+    ):
+        """
+        Initialize the table and column retrievers over the schema index.
+
+        Args:
+            index (VectorStoreIndex): Index over the nodes from `build_schema_nodes`.
+            table_schema_objs (List[SQLTableSchema]): Every table in the database.
+            schema_context_cache (SchemaContextCache): Rendered schema of each table.
+            embed_model (BaseEmbedding): Model embedding the question (once for both retrievers).
+            max_schema_tokens (int): Estimated token budget of the selected schema.
+            max_tables (int): Maximum number of tables selected per question.
+            table_candidates (int): Table descriptions matched per question.
+            column_candidates (int): Column descriptions matched per question.
+        """
+        self.embed_model = embed_model
+        self.schema_context_cache = schema_context_cache
+        self.max_schema_tokens = max_schema_tokens
+        self.max_tables = max_tables
+        self.table_candidates = table_candidates
+        self._tables = {obj.table_name: obj for obj in table_schema_objs}
+
+        self._table_retriever = index.as_retriever(
+            similarity_top_k=table_candidates,
+            embed_model=embed_model,
+            filters=MetadataFilters(filters=[ExactMatchFilter(key="kind", value="table")]),
+        )
+        self._column_retriever = index.as_retriever(
+            similarity_top_k=column_candidates,
+            embed_model=embed_model,
+            filters=MetadataFilters(filters=[ExactMatchFilter(key="kind", value="column")]),
+        )
+
+        # Column names shared by several tables are likely join keys; kept when a table is pruned
+        tables_per_column = defaultdict(int)
+        for table_name in self._tables:
+            for column_name, _ in schema_context_cache.column_lines(table_name):
+                tables_per_column[column_name] += 1
+        self._join_columns = {name for name, count in tables_per_column.items() if count > 1}
+
+
+    def full_schema_fits(self) -> bool:
+        """Return True if every table fits the budget in full, so a question can select the whole schema."""
+        if len(self._tables) > self.max_tables:
+            return False
+        tokens = sum(estimate_tokens(self.schema_context_cache.get(obj)) for obj in self._tables.values())
+        return tokens <= self.max_schema_tokens
+
+
+    def covers_all_tables(self) -> bool:
+        """Return True if every question selects the whole schema: it fits and every table is a candidate."""
+        return len(self._tables) <= self.table_candidates and self.full_schema_fits()
+
+
+    def retrieve(self, query: Union[str, QueryBundle]) -> List[SelectedTable]:
+        """
+        Select the tables and columns for a question.
+
+        Args:
+            query (Union[str, QueryBundle]): Question, optionally with its embedding precomputed.
+
+        Returns:
+            List[SelectedTable]: Selected tables, most relevant first.
+        """
+        query_bundle = QueryBundle(query_str=query) if isinstance(query, str) else query
+        if query_bundle.embedding is None:
+            query_bundle.embedding = self.embed_model.get_query_embedding(query_bundle.query_str)
+        return self._select(self._table_retriever.retrieve(query_bundle), self._column_retriever.retrieve(query_bundle))
+
+
+    async def aretrieve(self, query_str: str) -> List[SelectedTable]:
+        """Async version of `retrieve` using the embedding model's async client."""
+        embedding = await self.embed_model.aget_query_embedding(query_str)
+        return self.retrieve(QueryBundle(query_str=query_str, embedding=embedding))
+
+
+    def _select(self, table_hits: List[NodeWithScore], column_hits: List[NodeWithScore]) -> List[SelectedTable]:
+        """
+        Rank tables by their best table or column match and add them while the budget allows.
+
+        Tables that fit are shown in full; a table too wide for the remaining budget keeps only
+        its join keys and the columns that matched the question, best first.
+        """
+        relevance: Dict[str, float] = {}
+        column_scores: Dict[str, Dict[str, float]] = defaultdict(dict)
+        for hit in table_hits:
+            table_name = hit.node.metadata["table"]
+            relevance[table_name] = max(relevance.get(table_name, hit.score), hit.score)
+        for hit in column_hits:
+            table_name = hit.node.metadata["table"]
+            column_scores[table_name][hit.node.metadata["column"]] = hit.score
+            relevance[table_name] = max(relevance.get(table_name, hit.score), hit.score)
+
+        selected = []
+        budget = self.max_schema_tokens
+        for table_name in sorted(relevance, key=relevance.get, reverse=True):
+            table_schema_obj = self._tables.get(table_name)
+            if table_schema_obj is None:
+                continue  # Table dropped since the index was built
+            if len(selected) >= self.max_tables:
+                break
+
+            full_tokens = estimate_tokens(self.schema_context_cache.get(table_schema_obj))
+            if full_tokens <= budget:
+                selected.append(SelectedTable(table_name=table_name, context_str=table_schema_obj.context_str))
+                budget -= full_tokens
+                continue
+
+            columns = self._prune(table_schema_obj, column_scores[table_name], budget)
+            if not columns:
+                if selected:
+                    continue  # A smaller, less relevant table may still fit
+                # The most relevant table is always included, with at least its best column
+                best = sorted(column_scores[table_name], key=column_scores[table_name].get, reverse=True)
+                columns = best[:1] or [name for name, _ in self.schema_context_cache.column_lines(table_name)[:1]]
+
+            selected.append(SelectedTable(table_name=table_name, context_str=table_schema_obj.context_str, columns=columns))
+            budget -= estimate_tokens(self.schema_context_cache.get(table_schema_obj, columns))
+
+        logger.debug("Selected schema: %s", [(t.table_name, t.columns) for t in selected])
+        return selected
+
+
+    def _prune(self, table_schema_obj: SQLTableSchema, scores: Dict[str, float], budget: int) -> List[str]:
+        """Return the join keys and matched columns of a table that fit `budget`, in priority order."""
+        table_name = table_schema_obj.table_name
+        column_lines = dict(self.schema_context_cache.column_lines(table_name))
+        remaining = budget - estimate_tokens(self.schema_context_cache.get(table_schema_obj, []))
+
+        join_keys = [name for name in column_lines if name in self._join_columns]
+        matched = sorted(scores, key=scores.get, reverse=True)
+
+        columns = []
+        for column_name in join_keys + matched:
+            if column_name in columns or column_name not in column_lines:
+                continue
+            cost = estimate_tokens(column_lines[column_name] + "\n")
+            if cost <= remaining:
+                columns.append(column_name)
+                remaining -= cost
+
+        # Join keys alone do not answer anything
+        if not any(column_name in scores for column_name in columns):
+            return []
+        return columns
@@ -1,18 +1,34 @@
+
 # ============================ Imports and Environment Setup =============================
 import os
+import logging
+import threading
 from dotenv import load_dotenv
 from sqlalchemy import inspect
 
 # Llama Index imports
-from llama_index.llms.groq import Groq
-from llama_index.embeddings.ollama import OllamaEmbedding
-from llama_index.core import Settings, SQLDatabase, VectorStoreIndex
-from llama_index.core.objects import SQLTableNodeMapping, ObjectIndex, SQLTableSchema
-from llama_index.core.retrievers import SQLRetriever
+from llama_index.core import Settings, SQLDatabase
+from llama_index.core.objects import SQLTableSchema
 
 # Project-specific imports
-from src.utility import load_config, create_sqldb_and_tables
-from src.prompt import CONTEXT
+from src.utility import (
+    load_config,
+    setup_logging,
+    create_sqldb_and_tables,
+    connect_read_only_sqldb,
+    get_database_version,
+    get_table_versions,
+    load_table_descriptions,
+    load_or_build_schema_index,
+)
+from src.cache import AnswerCache, SQLQueryCache, SchemaContextCache
+from src.result_cache import ResultCache
+from src.shared_store import shared_store_from_uri
+from src.index_advisor import IndexAdvisor
+from src.sql_executor import ReadOnlySQLExecutor
+from src.sql_validator import SQLValidator
+from src.pipeline_executor import ParallelPipelineExecutor
+from src.schema_retriever import SchemaRetriever, build_schema_nodes
 
 # ============================ Load Environment Variables ================================
 load_dotenv()
@@ -21,67 +37,353 @@ api_key = os.environ.get("GROQ_API_KEY")
 
 # ============================ Load Configuration ========================================
 config = load_config()
+setup_logging(config.get('logging', {}))
+logger = logging.getLogger(__name__)
 
+# Define paths for data and database
+data_dir_path = f"{os.getcwd()}/resources/data"
+sqldb_path = os.path.join(os.getcwd(), config.get('storage', {}).get('database_path', "resources/Database.db"))
+sql_cache_path = f"{os.getcwd()}/resources/Cache.db"
+summary_db_path = f"{os.getcwd()}/resources/Summary.db"
+index_persist_dir = f"{os.getcwd()}/resources/index_storage"
 
-# ============================ Initialize LLM and Embedding Models =======================
-# Initialize the Groq LLM
-llm_model = config["groq"]["model"]
-llm = Groq(model=llm_model, api_key=api_key)
 
-# Access the Ollama settings from the config.yaml
-ollama_config = config['ollama']
-base_url = f"http://{ollama_config['host']}:{ollama_config['port']}"
+# ============================ Application Context =======================================
+class AppContext:
+    """
+    Lazily built LLM, embedding, database and retriever resources.
 
-# Initialize the embedding model
-embedding_model = OllamaEmbedding(
-    model_name=ollama_config['embedding_model'],  # Model for generating embeddings
-    base_url=base_url,                            # Base URL for the embedding model
-)
+    Nothing is connected or loaded at import time; each resource is created on first use.
+    Read-only state (ingested database, schema context, vector index) can be built before
+    a pre-fork server forks with `warmup`, and `after_fork` drops everything that holds
+    sockets or database connections so each worker opens its own.
+    """
 
-# Set the LLM and embedding model in the global settings
-Settings.llm = llm
-Settings.embed_model = embedding_model
+    # Resources that hold network clients or database connections and must not cross a fork
+    CONNECTION_RESOURCES = (
+        "llm",
+        "embedding_model",
+        "table_retriever",
+        "sql_query_executor",
+        "answer_cache",
+        "sql_query_cache",
+        "result_cache",
+        "shared_store",
+        "sql_query_pipeline",
+        "pipeline_executor",
+    )
 
+    def __init__(self, config: dict):
+        """
+        Initialize an empty context.
 
-# ============================ Database Initialization ==================================
-# Define paths for data and database
-data_dir_path = f"{os.getcwd()}/resources/data"
-sqldb_path = f"{os.getcwd()}/resources/Database.db"
+        Args:
+            config (dict): Application configuration loaded from config.yml.
+        """
+        self.config = config
+        self._resources = {}
+        self._lock = threading.RLock()
 
-# Create the database and tables
-engine = create_sqldb_and_tables(dir_path=data_dir_path, db_path=sqldb_path)
 
-# Inspect the database to get table names
-inspector = inspect(engine)
-tables = inspector.get_table_names()
-print(f"Tables Present in db: {tables}")
+    def get_or_create(self, name: str, factory):
+        """
+        Return the named resource, building it with `factory` on first use.
 
+        Args:
+            name (str): Resource name.
+            factory (Callable): Zero-argument function that builds the resource.
 
-# ============================ SQL Database and Index Setup =============================
-# Create an SQLDatabase instance
-sql_database = SQLDatabase(engine, include_tables=tables)
+        Returns:
+            Any: The cached resource.
+        """
+        if name in self._resources:
+            return self._resources[name]
+        with self._lock:
+            if name not in self._resources:
+                self._resources[name] = factory()
+            return self._resources[name]
 
-# Create a mapping between SQL tables and nodes in the index
-table_node_mapping = SQLTableNodeMapping(sql_database)
 
-# Create a list of SQLTableSchema objects with context descriptions
-table_schema_objs = [
-    SQLTableSchema(table_name=t, context_str=c)
-    for t, c in zip(tables, CONTEXT)
-]
+    @property
+    def ready(self) -> bool:
+        """Whether the read-only state has been built."""
+        return "schema_index" in self._resources
 
-# Create an ObjectIndex for efficient retrieval
-obj_index = ObjectIndex.from_objects(
-    table_schema_objs,    # List of table schemas with context descriptions
-    table_node_mapping,   # Mapping between SQL tables and index nodes
-    VectorStoreIndex,     # Index type used for storing and retrieving vectors
-)
 
-# Create a retriever for fetching similar objects (tables) based on queries
-table_retriever = obj_index.as_retriever(similarity_top_k=3)
+    @property
+    def read_only(self) -> bool:
+        """Whether this node serves a database and schema index built elsewhere, without writing to them."""
+        return self.config.get('storage', {}).get('read_only', False)
+
+
+    # ============================ LLM and Embedding Models ============================
+    @property
+    def llm(self):
+        """Groq LLM used for SQL generation and final responses."""
+        def build():
+            from llama_index.llms.groq import Groq
+
+            groq_config = self.config["groq"]
+            llm = Groq(
+                model=groq_config["model"],
+                api_key=api_key,
+                api_base=groq_config.get("api_base", "https://api.groq.com/openai/v1"),
+            )
+            Settings.llm = llm
+            return llm
+        return self.get_or_create("llm", build)
+
+
+    @property
+    def embedding_model(self):
+        """Ollama embedding model used for table retrieval and the answer cache."""
+        def build():
+            from llama_index.embeddings.ollama import OllamaEmbedding
+
+            ollama_config = self.config['ollama']
+            embedding_model = OllamaEmbedding(
+                model_name=ollama_config['embedding_model'],  # Model for generating embeddings
+                base_url=f"http://{ollama_config['host']}:{ollama_config['port']}",
+            )
+            Settings.embed_model = embedding_model
+            return embedding_model
+        return self.get_or_create("embedding_model", build)
+
+
+    # ============================ Database ============================
+    @property
+    def engine(self):
+        """SQLAlchemy engine on the SQLite database, populated from the CSV files unless read-only."""
+        if self.read_only:
+            return self.get_or_create("engine", lambda: connect_read_only_sqldb(sqldb_path))
+        ingestion_config = self.config.get('ingestion', {})
+        return self.get_or_create("engine", lambda: create_sqldb_and_tables(
+            dir_path=data_dir_path,
+            db_path=sqldb_path,
+            chunksize=ingestion_config.get('chunksize', 50000),
+            mode=ingestion_config.get('mode', "rebuild"),
+        ))
+
+
+    @property
+    def tables(self):
+        """Names of the tables present in the database."""
+        def build():
+            tables = inspect(self.engine).get_table_names()
+            logger.info("Tables Present in db: %s", tables)
+            return tables
+        return self.get_or_create("tables", build)
+
+
+    @property
+    def sql_database(self) -> SQLDatabase:
+        """SQLDatabase wrapper over the engine."""
+        return self.get_or_create("sql_database", lambda: SQLDatabase(self.engine, include_tables=self.tables))
+
+
+    @property
+    def table_descriptions(self):
+        """Table and column descriptions from the `<table>.yml` files next to the CSVs."""
+        return self.get_or_create("table_descriptions", lambda: load_table_descriptions(data_dir_path))
+
+
+    @property
+    def table_schema_objs(self):
+        """SQLTableSchema objects with context descriptions."""
+        return self.get_or_create("table_schema_objs", lambda: [
+            SQLTableSchema(table_name=t, context_str=self.table_descriptions.get(t, {}).get("description") or None)
+            for t in self.tables
+        ])
+
+
+    @property
+    def schema_context_cache(self) -> SchemaContextCache:
+        """Every table's schema and description rendered once; re-rendered only when a table changes."""
+        return self.get_or_create("schema_context_cache", lambda: SchemaContextCache(
+            sql_database=self.sql_database,
+            table_schema_objs=self.table_schema_objs,
+            column_descriptions={t: d["columns"] for t, d in self.table_descriptions.items()},
+            version_fn=lambda: get_database_version(sqldb_path),
+        ))
+
+
+    # ============================ SQL Index and Retrievers ============================
+    @property
+    def schema_index(self):
+        """Persisted vector index over table and column descriptions, embedding only changed ones."""
+        return self.get_or_create("schema_index", lambda: load_or_build_schema_index(
+            build_schema_nodes(self.table_schema_objs, self.schema_context_cache),
+            persist_dir=self.config.get('index', {}).get('persist_dir', index_persist_dir),
+            embed_model=self.embedding_model,
+            persist=not self.read_only,
+        ))
+
+
+    @property
+    def table_retriever(self) -> SchemaRetriever:
+        """Retriever selecting the tables and columns for a question within the schema token budget."""
+        def build():
+            retrieval_config = self.config.get('retrieval', {})
+            return SchemaRetriever(
+                index=self.schema_index,
+                table_schema_objs=self.table_schema_objs,
+                schema_context_cache=self.schema_context_cache,
+                embed_model=self.embedding_model,
+                max_schema_tokens=retrieval_config.get('max_schema_tokens', 2000),
+                max_tables=retrieval_config.get('max_tables', 5),
+                table_candidates=retrieval_config.get('table_candidates', 10),
+                column_candidates=retrieval_config.get('column_candidates', 30),
+            )
+        return self.get_or_create("table_retriever", build)
+
+
+    @property
+    def sql_query_executor(self) -> ReadOnlySQLExecutor:
+        """Pool of read-only connections that executes generated SQL with a per-query time limit."""
+        def build():
+            executor_config = self.config.get('sql_executor', {})
+            self.engine  # Ingest first; read-only connections cannot create the database
+            return ReadOnlySQLExecutor(
+                db_path=sqldb_path,
+                pool_size=executor_config.get('pool_size', 8),
+                timeout_seconds=executor_config.get('timeout_seconds', 10),
+                mmap_size_mb=executor_config.get('mmap_size_mb', 256),
+                cache_size_mb=executor_config.get('cache_size_mb', 64),
+                temp_store=executor_config.get('temp_store', "MEMORY"),
+            )
+        return self.get_or_create("sql_query_executor", build)
+
+
+    @property
+    def sql_validator(self) -> SQLValidator:
+        """Parser-based check of generated SQL against the cached schema and its query plan."""
+        def build():
+            validation_config = self.config.get('sql_validation', {})
+            return SQLValidator(
+                schema_context_cache=self.schema_context_cache,
+                explain_fn=(lambda sql_query: self.sql_query_executor.explain(sql_query))
+                if validation_config.get('explain', True) else None,
+                check_schema=validation_config.get('check_schema', True),
+                max_scan_rows=validation_config.get('max_scan_rows', 100_000_000),
+            )
+        return self.get_or_create("sql_validator", build)
+
+
+    @property
+    def index_advisor(self):
+        """Advisor recording executed SQL and proposing indexes for frequently filtered columns."""
+        def build():
+            advisor_config = self.config.get('index_advisor', {})
+            if not advisor_config.get('enabled', True):
+                return None
+            return IndexAdvisor(
+                engine=self.engine,
+                min_queries=advisor_config.get('min_queries', 5),
+                size_budget_mb=advisor_config.get('size_budget_mb', 64),
+                auto_create=advisor_config.get('auto_create', False) and not self.read_only,
+                check_every=advisor_config.get('check_every', 50),
+                version_fn=lambda: get_table_versions(sqldb_path),
+            )
+        return self.get_or_create("index_advisor", build)
+
+
+    @property
+    def pipeline_executor(self):
+        """Thread pool running independent pipeline modules concurrently, or None for the sequential runner."""
+        def build():
+            pipeline_config = self.config.get('pipeline', {})
+            if pipeline_config.get('executor', "parallel") != "parallel":
+                return None
+            return ParallelPipelineExecutor(max_workers=pipeline_config.get('max_workers', 16))
+        return self.get_or_create("pipeline_executor", build)
+
+
+    # ============================ Caches ============================
+    @property
+    def shared_store(self):
+        """Store shared by every worker process for rate limits and caches, or None to keep them per process."""
+        return self.get_or_create("shared_store", lambda: shared_store_from_uri(
+            self.config.get('shared_store', {}).get('uri', "memory://")
+        ))
+
+
+    @property
+    def answer_cache(self):
+        """Final answers by exact and semantically similar queries, invalidated on database changes."""
+        def build():
+            answer_cache_config = self.config.get('cache', {}).get('answer', {})
+            if not answer_cache_config.get('enabled', True):
+                return None
+            self.engine  # Ingest first so the cache starts from the post-ingestion database version
+            return AnswerCache(
+                embed_model=self.embedding_model,
+                max_size=answer_cache_config.get('max_size', 1024),
+                ttl_seconds=answer_cache_config.get('ttl_seconds', 3600),
+                similarity_threshold=answer_cache_config.get('similarity_threshold', 0.97),
+                version_fn=lambda: get_table_versions(sqldb_path),
+                shared_store=self.shared_store,
+            )
+        return self.get_or_create("answer_cache", build)
+
+
+    @property
+    def sql_query_cache(self):
+        """Generated SQL persisted across restarts so repeat questions skip the text2sql LLM call."""
+        def build():
+            sql_cache_config = self.config.get('cache', {}).get('sql', {})
+            if not sql_cache_config.get('enabled', True):
+                return None
+            return SQLQueryCache(db_path=sql_cache_config.get('path', sql_cache_path))
+        return self.get_or_create("sql_query_cache", build)
+
+
+    @property
+    def result_cache(self):
+        """Results of repeated SQL, invalidated per table on re-ingestion, with optional materialized aggregates."""
+        def build():
+            result_cache_config = self.config.get('cache', {}).get('result', {})
+            if not result_cache_config.get('enabled', True):
+                return None
+            materialize_config = result_cache_config.get('materialize', {})
+            self.engine  # Ingest first so cached results start from the post-ingestion table versions
+            return ResultCache(
+                version_fn=lambda: get_table_versions(sqldb_path),
+                max_entries=result_cache_config.get('max_entries', 256),
+                max_bytes=result_cache_config.get('max_size_mb', 64) * 1024 * 1024,
+                summary_db_path=materialize_config.get('path', summary_db_path)
+                if materialize_config.get('enabled', False) else None,
+                promote_after=materialize_config.get('promote_after', 5),
+                shared_store=self.shared_store,
+                shared_ttl_seconds=result_cache_config.get('shared_ttl_seconds', 3600),
+            )
+        return self.get_or_create("result_cache", build)
+
+
+    # ============================ Lifecycle ============================
+    def warmup(self):
+        """Build the read-only state (database, schema context and vector index) ahead of the first request."""
+        self.schema_context_cache
+        self.schema_index
+
+
+    def after_fork(self):
+        """Drop connection-holding resources inherited from the parent so the worker opens its own."""
+        with self._lock:
+            if "engine" in self._resources:
+                self._resources["engine"].dispose(close=False)
+            for name in self.CONNECTION_RESOURCES:
+                self._resources.pop(name, None)
+
 
+_app_context = None
+_app_context_lock = threading.Lock()
 
-# ============================ SQL Query Executor ============================
-# Initialize the SQLRetriever with the SQLDatabase instance
-SQL_QUERY_EXECUTOR = SQLRetriever(sql_database)
 
+def get_app_context() -> AppContext:
+    """Return the process-wide application context, creating it on first use."""
+    global _app_context
+    if _app_context is None:
+        with _app_context_lock:
+            if _app_context is None:
+                _app_context = AppContext(config)
+    return _app_context
@@ -0,0 +1,288 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Type
+
+from limits.storage import Storage as RateLimitStorage
+from limits.aio.storage import Storage as AsyncRateLimitStorage
+
+# Namespace of the rate limit counters in a shared store
+RATE_LIMIT_NAMESPACE = "rate_limit"
+
+
+# ============================ Shared Store ============================
+class SharedStore(ABC):
+    """Key-value store shared by every worker process (and every host, for a network backend); values are JSON"""
+
+    @classmethod
+    @abstractmethod
+    def from_uri(cls, location: str) -> "SharedStore":
+        """Create the store from the part of its URI after `<scheme>://`."""
+
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Any:
+        """Return the value of a key, or None if it is missing or expired."""
+
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a JSON-serializable value, expiring after `ttl_seconds` (never if None)."""
+
+
+    @abstractmethod
+    def incr(self, namespace: str, key: str, amount: int = 1, ttl_seconds: Optional[float] = None) -> int:
+        """Atomically add `amount` to a counter and return it; the expiry is set when the counter is created."""
+
+
+    @abstractmethod
+    def expires_at(self, namespace: str, key: str) -> Optional[float]:
+        """Return the Unix time a key expires at, or None if it is missing or never expires."""
+
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str):
+        """Remove a key."""
+
+
+    @abstractmethod
+    def clear(self, namespace: str) -> int:
+        """Remove every key of a namespace and return how many were removed."""
+
+
+class SQLiteSharedStore(SharedStore):
+    """
+    Shared store in a local SQLite file, for the workers of one host.
+
+    Connections are opened per process, so a store created before a pre-fork server forks
+    is safe to use in every worker. Hosts sharing state need a network backend instead;
+    SQLite's write-ahead log does not work over network filesystems.
+    """
+
+    def __init__(self, path: str, busy_timeout_seconds: float = 5.0, purge_every: int = 1000):
+        """
+        Initialize the store; the file is created on first use.
+
+        Args:
+            path (str): Path to the SQLite file.
+            busy_timeout_seconds (float): How long a write waits for another process's write.
+            purge_every (int): Writes between deletions of expired keys.
+        """
+        self.path = path
+        self.busy_timeout_seconds = busy_timeout_seconds
+        self.purge_every = purge_every
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._writes = 0
+
+
+    @classmethod
+    def from_uri(cls, location: str) -> "SQLiteSharedStore":
+        """`sqlite:///relative/path.db` or `sqlite:////absolute/path.db`, as in SQLAlchemy URLs."""
+        return cls(location[1:] if location.startswith("/") else location)
+
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this process's connection, opening it on first use and after a fork (lock held)."""
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(
+                self.path, timeout=self.busy_timeout_seconds, check_same_thread=False, isolation_level=None
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS shared_store (
+                    namespace  TEXT NOT NULL,
+                    key        TEXT NOT NULL,
+                    value      TEXT NOT NULL,
+                    expires_at REAL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            self._pid = os.getpid()
+        return self._conn
+
+
+    def _written(self, conn: sqlite3.Connection):
+        """Count a write and periodically delete expired keys (lock held)."""
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            conn.execute("DELETE FROM shared_store WHERE expires_at <= ?", (time.time(),))
+
+
+    def get(self, namespace: str, key: str) -> Any:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value FROM shared_store WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, key, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        expires_at = time.time() + ttl_seconds if ttl_seconds else None
+        value = json.dumps(value)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO shared_store (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, expires_at),
+            )
+            self._written(conn)
+
+
+    def incr(self, namespace: str, key: str, amount: int = 1, ttl_seconds: Optional[float] = None) -> int:
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            conn = self._connection()
+            # A single upsert is atomic across processes; an expired counter restarts from `amount`
+            row = conn.execute(
+                """
+                INSERT INTO shared_store (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (namespace, key) DO UPDATE SET
+                    value = CASE WHEN expires_at <= ? THEN excluded.value
+                                 ELSE CAST(value AS INTEGER) + excluded.value END,
+                    expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END
+                RETURNING value
+                """,
+                (namespace, key, amount, expires_at, now, now),
+            ).fetchone()
+            self._written(conn)
+        return int(row[0])
+
+
+    def expires_at(self, namespace: str, key: str) -> Optional[float]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT expires_at FROM shared_store WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return row[0] if row else None
+
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._connection().execute("DELETE FROM shared_store WHERE namespace = ? AND key = ?", (namespace, key))
+
+
+    def clear(self, namespace: str) -> int:
+        with self._lock:
+            return self._connection().execute("DELETE FROM shared_store WHERE namespace = ?", (namespace,)).rowcount
+
+
+# Shared store implementations by URI scheme; a network backend (e.g. Redis) is added here
+SHARED_STORE_BACKENDS: Dict[str, Type[SharedStore]] = {
+    "sqlite": SQLiteSharedStore,
+}
+
+
+def shared_store_from_uri(uri: Optional[str]) -> Optional[SharedStore]:
+    """
+    Create the shared store configured by a URI.
+
+    Args:
+        uri (str): `<scheme>://<location>`, e.g. `sqlite:///resources/Shared.db`; None or
+            `memory://` keeps state in each process.
+
+    Returns:
+        Optional[SharedStore]: Store, or None for per-process state.
+
+    Raises:
+        ValueError: If no backend is registered for the scheme.
+    """
+    if not uri or uri == "memory://":
+        return None
+    scheme, separator, location = uri.partition("://")
+    backend = SHARED_STORE_BACKENDS.get(scheme)
+    if not separator or backend is None:
+        raise ValueError(f"Unsupported shared store URI: {uri} (schemes: {', '.join(SHARED_STORE_BACKENDS)})")
+    return backend.from_uri(location)
+
+
+# ============================ Rate Limit Storage ============================
+class SharedRateLimitStorage(RateLimitStorage):
+    """Fixed-window rate limit counters in a shared store; `limits` registers it for the store URI schemes"""
+
+    STORAGE_SCHEME = list(SHARED_STORE_BACKENDS)
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.store = shared_store_from_uri(uri)
+
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        return self.store.incr(RATE_LIMIT_NAMESPACE, key, amount, ttl_seconds=expiry)
+
+
+    def get(self, key: str) -> int:
+        return self.store.get(RATE_LIMIT_NAMESPACE, key) or 0
+
+
+    def get_expiry(self, key: str) -> float:
+        return self.store.expires_at(RATE_LIMIT_NAMESPACE, key) or time.time()
+
+
+    def check(self) -> bool:
+        try:
+            self.store.get(RATE_LIMIT_NAMESPACE, "")
+            return True
+        except sqlite3.Error:
+            return False
+
+
+    def reset(self) -> int:
+        return self.store.clear(RATE_LIMIT_NAMESPACE)
+
+
+    def clear(self, key: str):
+        self.store.delete(RATE_LIMIT_NAMESPACE, key)
+
+
+class AsyncSharedRateLimitStorage(AsyncRateLimitStorage):
+    """Async version of `SharedRateLimitStorage` (`async+<scheme>://` URIs), running store calls on a worker thread"""
+
+    STORAGE_SCHEME = [f"async+{scheme}" for scheme in SHARED_STORE_BACKENDS]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.storage = SharedRateLimitStorage(uri.removeprefix("async+"))
+
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+
+    async def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        return await asyncio.to_thread(self.storage.incr, key, expiry, amount)
+
+
+    async def get(self, key: str) -> int:
+        return await asyncio.to_thread(self.storage.get, key)
+
+
+    async def get_expiry(self, key: str) -> float:
+        return await asyncio.to_thread(self.storage.get_expiry, key)
+
+
+    async def check(self) -> bool:
+        return await asyncio.to_thread(self.storage.check)
+
+
+    async def reset(self) -> int:
+        return await asyncio.to_thread(self.storage.reset)
+
+
+    async def clear(self, key: str):
+        await asyncio.to_thread(self.storage.clear, key)
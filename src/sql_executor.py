@@ -0,0 +1,178 @@
+import time
+import queue
+import sqlite3
+import threading
+from typing import List, Tuple
+
+from llama_index.core.schema import NodeWithScore, TextNode
+
+# Number of SQLite VM instructions between checks of the query deadline
+PROGRESS_HANDLER_STEPS = 10000
+
+# Same per-value truncation SQLDatabase.run_sql applies to results
+MAX_STRING_LENGTH = 300
+
+
+# ============================ Read-Only SQL Executor ============================
+class ReadOnlySQLExecutor:
+    """Pool of read-only SQLite connections with tuned pragmas and a per-query time limit"""
+
+    def __init__(
+        self,
+        db_path: str,
+        pool_size: int = 8,
+        timeout_seconds: float = 10,
+        mmap_size_mb: int = 256,
+        cache_size_mb: int = 64,
+        temp_store: str = "MEMORY",
+    ):
+        """
+        Initialize the pool; connections are opened on demand up to `pool_size`.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+            pool_size (int): Maximum number of open connections (concurrent queries).
+            timeout_seconds (float): Queries running longer than this are aborted.
+            mmap_size_mb (int): Size of the memory-mapped I/O region per connection.
+            cache_size_mb (int): Page cache size per connection.
+            temp_store (str): Where temporary tables and indices live (MEMORY or FILE).
+        """
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.timeout_seconds = timeout_seconds
+        self.mmap_size_mb = mmap_size_mb
+        self.cache_size_mb = cache_size_mb
+        self.temp_store = temp_store
+
+        self._pool = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a tuned read-only connection."""
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size = {self.mmap_size_mb * 1024 * 1024}")
+        conn.execute(f"PRAGMA cache_size = -{self.cache_size_mb * 1024}")
+        conn.execute(f"PRAGMA temp_store = {self.temp_store}")
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Take an idle connection, opening a new one while under `pool_size`, else wait."""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.pool_size:
+                self._opened += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        return self._pool.get()
+
+
+    def execute(self, sql_query: str) -> Tuple[List[str], List[tuple]]:
+        """
+        Run a read-only query, aborting it once it exceeds the time limit.
+
+        Args:
+            sql_query (str): SQL query to run.
+
+        Returns:
+            Tuple[List[str], List[tuple]]: Column names and result rows.
+        """
+        conn = self._acquire()
+        deadline = time.monotonic() + self.timeout_seconds
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_HANDLER_STEPS)
+        try:
+            cursor = conn.execute(sql_query)
+            rows = cursor.fetchall()
+            columns = [description[0] for description in cursor.description or []]
+        except sqlite3.OperationalError as e:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"SQL query exceeded the {self.timeout_seconds}s time limit") from e
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+            self._pool.put(conn)
+        return columns, rows
+
+
+    def explain(self, sql_query: str) -> List[Tuple[int, int, str]]:
+        """
+        Return the query plan of a query without running it.
+
+        Args:
+            sql_query (str): SQL query to plan.
+
+        Returns:
+            List[Tuple[int, int, str]]: (id, parent id, detail) rows of `EXPLAIN QUERY PLAN`.
+        """
+        conn = self._acquire()
+        try:
+            return [(row[0], row[1], row[3]) for row in conn.execute(f"EXPLAIN QUERY PLAN {sql_query}")]
+        finally:
+            self._pool.put(conn)
+
+
+    @staticmethod
+    def to_nodes(sql_query: str, columns: List[str], rows: List[tuple]) -> List[NodeWithScore]:
+        """
+        Wrap a query result the way `SQLRetriever.retrieve` does.
+
+        Args:
+            sql_query (str): SQL query that produced the result.
+            columns (List[str]): Column names.
+            rows (List[tuple]): Result rows.
+
+        Returns:
+            List[NodeWithScore]: Single node whose metadata holds `sql_query`, `result` and `col_keys`.
+        """
+        return [
+            NodeWithScore(
+                node=TextNode(
+                    text=str(rows),
+                    metadata={"sql_query": sql_query, "result": rows, "col_keys": columns},
+                    excluded_embed_metadata_keys=["sql_query", "result", "col_keys"],
+                    excluded_llm_metadata_keys=["sql_query", "result", "col_keys"],
+                )
+            )
+        ]
+
+
+    def retrieve(self, sql_query: str) -> List[NodeWithScore]:
+        """
+        Run a query and wrap the result the way `SQLRetriever.retrieve` does.
+
+        Args:
+            sql_query (str): SQL query to run.
+
+        Returns:
+            List[NodeWithScore]: Single node whose metadata holds `sql_query`, `result` and `col_keys`.
+        """
+        columns, rows = self.execute(sql_query)
+        rows = [
+            tuple(
+                value[:MAX_STRING_LENGTH] + "..." if isinstance(value, str) and len(value) > MAX_STRING_LENGTH else value
+                for value in row
+            )
+            for row in rows
+        ]
+        return self.to_nodes(sql_query, columns, rows)
+
+
+    def close(self):
+        """Close every idle connection in the pool."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._opened -= 1
@@ -0,0 +1,173 @@
+import re
+import math
+from collections import defaultdict
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import sqlglot
+from sqlglot import exp
+
+from src.cache import SchemaContextCache
+
+# Statements that are never allowed anywhere in generated SQL
+FORBIDDEN_EXPRESSIONS = (
+    exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Drop, exp.Create, exp.Alter,
+    exp.Command, exp.Pragma, exp.Transaction, exp.Attach, exp.Detach, exp.Set, exp.Use,
+)
+
+# Columns every SQLite table has without declaring them
+IMPLICIT_COLUMNS = {"rowid", "oid", "_rowid_"}
+
+# `SCAN <name>` lines of EXPLAIN QUERY PLAN are full scans; `SEARCH` lines use an index
+PLAN_SCAN_PATTERN = re.compile(r"^SCAN (\w+)")
+
+
+def referenced_tables(tree: exp.Expression) -> List[str]:
+    """Return the lower-cased names of the tables a parsed query reads, excluding CTEs."""
+    cte_names = {cte.alias_or_name.lower() for cte in tree.find_all(exp.CTE)}
+    return sorted({
+        table.name.lower() for table in tree.find_all(exp.Table)
+        if isinstance(table.this, exp.Identifier) and table.name.lower() not in cte_names
+    })
+
+
+def is_aggregate(tree: exp.Expression) -> bool:
+    """Whether a parsed query groups or aggregates rows."""
+    return any(select.args.get("group") for select in tree.find_all(exp.Select)) or any(tree.find_all(exp.AggFunc))
+
+
+class SQLValidationError(ValueError):
+    """Generated SQL rejected before it reaches the database"""
+
+
+# ============================ SQL Validator ============================
+class SQLValidator:
+    """Parses generated SQL and rejects anything but a single, read-only, schema-consistent and affordable query"""
+
+    def __init__(
+        self,
+        schema_context_cache: SchemaContextCache,
+        explain_fn: Optional[Callable[[str], Iterable[Tuple[int, int, str]]]] = None,
+        check_schema: bool = True,
+        max_scan_rows: int = 100_000_000,
+    ):
+        """
+        Initialize the validator with the cached schema.
+
+        Args:
+            schema_context_cache (SchemaContextCache): Source of the column names and row counts.
+            explain_fn (Callable): Returns the (id, parent, detail) rows of `EXPLAIN QUERY PLAN`
+                for a query; the plan check is skipped if None.
+            check_schema (bool): Reject unknown tables and columns.
+            max_scan_rows (int): Reject plans whose nested full-table scans multiply to more rows.
+        """
+        self.schema_context_cache = schema_context_cache
+        self.explain_fn = explain_fn
+        self.check_schema = check_schema
+        self.max_scan_rows = max_scan_rows
+
+
+    def validate(self, sql_query: str) -> exp.Expression:
+        """
+        Validate a generated query without executing it.
+
+        Args:
+            sql_query (str): SQL query to validate.
+
+        Returns:
+            exp.Expression: Parsed query.
+
+        Raises:
+            SQLValidationError: If the query is not a single valid read-only SELECT, refers to
+                unknown tables or columns, or its plan is too costly.
+        """
+        tree = self._parse(sql_query)
+        if self.check_schema:
+            self._check_schema(tree)
+        if self.explain_fn is not None:
+            self._check_plan(sql_query, tree)
+        return tree
+
+
+    def _parse(self, sql_query: str) -> exp.Expression:
+        """Parse the query and enforce a single SELECT (or WITH/compound SELECT) statement."""
+        try:
+            statements = [s for s in sqlglot.parse(sql_query, read="sqlite") if s is not None]
+        except sqlglot.errors.ParseError as e:
+            raise SQLValidationError(f"SQL syntax error: {e}") from e
+
+        if len(statements) != 1:
+            raise SQLValidationError(f"Expected a single SQL statement, got {len(statements)}")
+
+        tree = statements[0]
+        if not isinstance(tree, (exp.Select, exp.SetOperation)):
+            raise SQLValidationError(f"Only SELECT queries are allowed, got {tree.key.upper()}")
+        forbidden = next(tree.find_all(*FORBIDDEN_EXPRESSIONS), None)
+        if forbidden is not None:
+            raise SQLValidationError(f"Only read-only queries are allowed, found {forbidden.key.upper()}")
+        return tree
+
+
+    def _check_schema(self, tree: exp.Expression):
+        """Reject tables and columns that do not exist in the cached schema."""
+        # SQLite resolves table and column names case-insensitively
+        columns = {
+            table.lower(): {column.lower() for column in names}
+            for table, names in self.schema_context_cache.table_columns().items()
+        }
+        cte_names = {cte.alias_or_name.lower() for cte in tree.find_all(exp.CTE)}
+
+        referenced = set()
+        for table in tree.find_all(exp.Table):
+            if not isinstance(table.this, exp.Identifier):
+                continue  # Table-valued function
+            name = table.name.lower()
+            if name in cte_names:
+                continue
+            if name not in columns:
+                raise SQLValidationError(f"no such table: {table.name}")
+            referenced.add(name)
+
+        # Names a column reference may legitimately resolve to
+        known = set(IMPLICIT_COLUMNS)
+        for name in referenced:
+            known |= columns[name]
+        known |= {alias.alias.lower() for alias in tree.find_all(exp.Alias)}
+        for table_alias in tree.find_all(exp.TableAlias):
+            known |= {column.name.lower() for column in table_alias.columns}
+
+        for column in tree.find_all(exp.Column):
+            if isinstance(column.this, exp.Star) or column.name.lower() in known:
+                continue
+            # SQLite reads an unknown double-quoted identifier as a string literal
+            if column.this.args.get("quoted"):
+                continue
+            raise SQLValidationError(f"no such column: {column.sql(dialect='sqlite')}")
+
+
+    def _check_plan(self, sql_query: str, tree: exp.Expression):
+        """Reject plans whose nested full-table scans (e.g. a cross join) cover too many rows."""
+        row_counts = {table.lower(): count for table, count in self.schema_context_cache.row_counts().items()}
+
+        # Plan lines name tables by alias; CTEs and subqueries count as the largest table they read
+        aliases = {}
+        for table in tree.find_all(exp.Table):
+            aliases[table.alias_or_name.lower()] = table.name.lower()
+        largest = max((row_counts.get(t, 0) for t in set(aliases.values())), default=0)
+
+        # Scans sharing a parent are nested loops, so their row counts multiply
+        scans = defaultdict(list)
+        for _, parent, detail in self.explain_fn(sql_query):
+            match = PLAN_SCAN_PATTERN.match(detail)
+            if match is None or detail.startswith("SCAN CONSTANT ROW"):
+                continue
+            name = aliases.get(match.group(1).lower(), match.group(1).lower())
+            scans[parent].append(row_counts.get(name, largest))
+
+        for scanned in scans.values():
+            cost = math.prod(max(count, 1) for count in scanned)
+            if cost > self.max_scan_rows:
+                kind = "a cross join of full table scans" if len(scanned) > 1 else "a full table scan"
+                raise SQLValidationError(
+                    f"Query plan rejected: {kind} over ~{cost:,} rows exceeds the limit of {self.max_scan_rows:,}; "
+                    "add a join condition or a more selective filter"
+                )
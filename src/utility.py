@@ -1,29 +1,245 @@
+import io
 import os
+import json
 import yaml
+import logging
+import sqlite3
+import hashlib
 import pandas as pd
-from sqlalchemy import create_engine, inspect
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from sqlalchemy import create_engine, inspect, text
+from llama_index.core import StorageContext, VectorStoreIndex, load_index_from_storage
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.schema import MetadataMode, TextNode
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; ingestion there is not locked against other processes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
 
 # ============================ Configuration Loader ============================
 def load_config():
     """
     Load the configuration from a YAML file.
 
+    The default path can be overridden with the TEXT2SQL_CONFIG environment variable.
+
     Returns:
         dict: Configuration dictionary loaded from the YAML file.
     """
-    config_path = f"{os.getcwd()}/config/config.yml"
+    config_path = os.environ.get("TEXT2SQL_CONFIG", f"{os.getcwd()}/config/config.yml")
     with open(config_path, "r") as file:
         config = yaml.safe_load(file)
     return config
 
+
+# ============================ Logging Setup ============================
+class JsonLogFormatter(logging.Formatter):
+    """Format log records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+def setup_logging(logging_config: dict):
+    """
+    Configure the `src` loggers from the `logging` section of config.yml.
+
+    Args:
+        logging_config (dict): `level` (e.g. INFO, DEBUG) and `format` ("text" or "json").
+    """
+    handler = logging.StreamHandler()
+    if logging_config.get('format', "text") == "json":
+        handler.setFormatter(JsonLogFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    logger = logging.getLogger("src")
+    logger.handlers[:] = [handler]
+    logger.setLevel(logging_config.get('level', "INFO").upper())
+    logger.propagate = False
+
+
 # ============================ Database Utility Functions ============================
-def create_sqldb_and_tables(dir_path: str, db_path: str):
+def _file_sha256(path: str, limit: int = None) -> str:
+    """
+    Hash a file (or its first `limit` bytes) without reading it into memory at once.
+
+    Args:
+        path (str): Path to the file.
+        limit (int): Number of leading bytes to hash; the whole file if None.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    remaining = limit
+    with open(path, "rb") as file:
+        while remaining is None or remaining > 0:
+            block = file.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return digest.hexdigest()
+
+
+# Strings pandas parses as booleans
+TRUE_VALUES = ("True", "TRUE", "true")
+FALSE_VALUES = ("False", "FALSE", "false")
+
+
+def _infer_sqlite_type(values: pd.Series) -> Optional[str]:
+    """Return the SQLite column type `DataFrame.to_sql` would use for the values of a column of CSV strings, or None if all are missing."""
+    values = values.dropna()
+    if values.empty:
+        return None
+    if values.isin(TRUE_VALUES + FALSE_VALUES).all():
+        return "BOOLEAN"
+    numbers = pd.to_numeric(values, errors="coerce")
+    if numbers.isna().any():
+        return "TEXT"
+    return "BIGINT" if pd.api.types.is_integer_dtype(numbers) else "FLOAT"
+
+
+def _widen_type(current: Optional[str], chunk_type: Optional[str]) -> Optional[str]:
+    """Combine the type of a column so far with its type in another chunk, as pandas would for the whole file."""
+    if current is None or chunk_type is None or current == chunk_type:
+        return current or chunk_type
+    if {current, chunk_type} == {"BIGINT", "FLOAT"}:
+        return "FLOAT"
+    return "TEXT"
+
+
+def _typed_column(column: str, sqlite_type: str) -> str:
+    """SQL converting a column of CSV strings to its type (numbers are converted by the column's affinity)."""
+    if sqlite_type == "BOOLEAN":
+        true_values = ", ".join(f"'{value}'" for value in TRUE_VALUES)
+        return f'CASE WHEN "{column}" IS NULL THEN NULL WHEN "{column}" IN ({true_values}) THEN 1 ELSE 0 END'
+    return f'"{column}"'
+
+
+def _insert_chunks(conn: sqlite3.Connection, table_name: str, chunks, create: bool) -> int:
+    """
+    Insert DataFrame chunks into a table with batched `executemany` calls.
+
+    Args:
+        conn (sqlite3.Connection): Connection with an open transaction.
+        table_name (str): Destination table.
+        chunks (Iterable[pd.DataFrame]): Chunks of CSV rows read as strings (`dtype=str`).
+        create (bool): Create the table, typing each column from its values in every chunk;
+            otherwise the values are converted by the existing table's column types.
+
+    Returns:
+        int: Number of rows inserted.
+    """
+    rows = 0
+    insert_sql = None
+    column_types = {}
+    missing_columns = set()
+    # A created table is filled through untyped columns holding the CSV strings, then copied
+    # into typed columns once every chunk has been seen (parsing each chunk by itself would
+    # e.g. turn "007" into 7 in a chunk of numbers when the column holds text further down)
+    target_table = f"{table_name}__untyped" if create else table_name
+    boolean_columns = [] if create else [
+        row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")') if row[2] == "BOOLEAN"
+    ]
+    for chunk in chunks:
+        if insert_sql is None:
+            if create:
+                columns = ", ".join(f'"{c}"' for c in chunk.columns)
+                conn.execute(f'CREATE TABLE "{target_table}" ({columns})')
+                column_types = dict.fromkeys(chunk.columns)
+            placeholders = ", ".join("?" for _ in chunk.columns)
+            insert_sql = f'INSERT INTO "{target_table}" VALUES ({placeholders})'
+
+        if create:
+            for column in chunk.columns:
+                column_types[column] = _widen_type(column_types[column], _infer_sqlite_type(chunk[column]))
+            missing_columns.update(chunk.columns[chunk.isna().any()])
+        for column in boolean_columns:
+            chunk[column] = chunk[column].isin(TRUE_VALUES).where(chunk[column].notna())
+
+        # Store missing values as NULL
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        conn.executemany(insert_sql, chunk.itertuples(index=False, name=None))
+        rows += len(chunk)
+
+    if create and insert_sql is not None:
+        # Columns without any value, and integers with missing values in any chunk, are FLOAT, as pandas parses them
+        column_types = {
+            column: "FLOAT" if sqlite_type is None or (sqlite_type == "BIGINT" and column in missing_columns) else sqlite_type
+            for column, sqlite_type in column_types.items()
+        }
+        columns = ", ".join(f'"{c}" {t}' for c, t in column_types.items())
+        conn.execute(f'CREATE TABLE "{table_name}" ({columns})')
+        values = ", ".join(_typed_column(c, t) for c, t in column_types.items())
+        conn.execute(f'INSERT INTO "{table_name}" SELECT {values} FROM "{target_table}"')
+        conn.execute(f'DROP TABLE "{target_table}"')
+    return rows
+
+
+def _load_manifest(manifest_path: str) -> dict:
+    """Load the ingestion manifest, or an empty one if it does not exist yet."""
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r") as file:
+        return json.load(file)
+
+
+@contextmanager
+def _manifest_lock(manifest_path: str):
+    """Hold an exclusive lock on the ingestion manifest, so concurrent processes ingest and write it one at a time."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{manifest_path}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _save_manifest(manifest_path: str, manifest: dict):
+    """Atomically write the ingestion manifest (with `_manifest_lock` held)."""
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def get_manifest_path(db_path: str) -> str:
+    """Return the path of the ingestion manifest kept next to the database."""
+    return f"{os.path.splitext(db_path)[0]}.manifest.json"
+
+
+def create_sqldb_and_tables(dir_path: str, db_path: str, chunksize: int = 50000, mode: str = "rebuild"):
     """
     Create a SQLite database and populate it with tables from CSV files in the specified directory.
 
+    A manifest of each CSV's mtime, size and hash is kept next to the database so unchanged
+    files are skipped without being read. Changed files are streamed in chunks and inserted
+    in a single transaction, either by appending only the rows added to the end of the file
+    (mode="append") or by building a fresh table and atomically swapping it in.
+
     Args:
         dir_path (str): Path to the directory containing CSV files.
         db_path (str): Path to the SQLite database file.
+        chunksize (int): Number of CSV rows read and inserted per batch.
+        mode (str): "append" to load only new trailing rows when possible, "rebuild" to reload changed files.
 
     Returns:
         sqlalchemy.engine.Engine: SQLAlchemy engine connected to the database.
@@ -33,24 +249,257 @@ def create_sqldb_and_tables(dir_path: str, db_path: str):
 
     # Create a SQLAlchemy engine
     engine = create_engine(f"sqlite:///{db_path}")
-    print(f"Successfully connected to the SQL database: {engine}")
-
-    # Inspect existing tables in the database
-    inspector = inspect(engine)
-    existing_tables = inspector.get_table_names()
-    print("Tables before table creation:", existing_tables)
-
-    # Iterate through CSV files and create tables
-    for file in csv_files:
-        table_name = os.path.splitext(file)[0]  # Extract table name from the file name
-        csv_path = os.path.join(dir_path, file)
-        df = pd.read_csv(csv_path)
-
-        if table_name not in existing_tables:
-            # Create a new table and populate it with data
-            df.to_sql(table_name, engine, index=False)
-            print(f"Table '{table_name}' has been created and data has been added.")
-        else:
-            print(f"Table '{table_name}' already exists in the database.")
+    logger.info("Successfully connected to the SQL database: %s", engine)
+
+    # Use write-ahead logging so read-only connections never block on (or block) the writer
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.close()
+
+    # Other processes ingesting the same database wait, then find their tables up to date
+    manifest_path = get_manifest_path(db_path)
+    with _manifest_lock(manifest_path):
+        # Inspect existing tables in the database
+        inspector = inspect(engine)
+        existing_tables = inspector.get_table_names()
+        logger.info("Tables before table creation: %s", existing_tables)
+
+        manifest = _load_manifest(manifest_path)
+
+        # Iterate through CSV files and create, append to or rebuild tables
+        for file in csv_files:
+            table_name = os.path.splitext(file)[0]  # Extract table name from the file name
+            csv_path = os.path.join(dir_path, file)
+            stat = os.stat(csv_path)
+            entry = manifest.get(table_name)
+
+            if table_name in existing_tables and entry is None:
+                # Table created before manifests existed; record it without reloading
+                with engine.connect() as conn:
+                    rows = conn.execute(text(f'SELECT COUNT(*) FROM "{table_name}"')).scalar()
+                manifest[table_name] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                                        "sha256": _file_sha256(csv_path), "rows": rows, "version": 1}
+                logger.info("Table '%s' already exists in the database.", table_name)
+                continue
+
+            if table_name in existing_tables and (entry["mtime_ns"], entry["size"]) == (stat.st_mtime_ns, stat.st_size):
+                logger.info("Table '%s' already exists in the database.", table_name)
+                continue
+
+            file_hash = _file_sha256(csv_path)
+            if table_name in existing_tables and file_hash == entry["sha256"]:
+                # Touched but unchanged
+                entry.update(mtime_ns=stat.st_mtime_ns)
+                logger.info("Table '%s' already exists in the database.", table_name)
+                continue
+
+            appendable = (
+                mode == "append"
+                and table_name in existing_tables
+                and stat.st_size > entry["size"]
+                and _file_sha256(csv_path, limit=entry["size"]) == entry["sha256"]
+            )
+
+            conn = sqlite3.connect(db_path, isolation_level=None)
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                if appendable:
+                    # Parse only the bytes added after the previously loaded content
+                    columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')]
+                    with open(csv_path, "rb") as raw:
+                        raw.seek(entry["size"])
+                        chunks = pd.read_csv(io.TextIOWrapper(raw, encoding="utf-8"), header=None,
+                                             names=columns, chunksize=chunksize, dtype=str)
+                        rows = _insert_chunks(conn, table_name, chunks, create=False)
+                    rows += entry["rows"]
+                    action = "appended to"
+                else:
+                    # Build the new table beside the old one, then swap it in
+                    staging_table = f"{table_name}__staging"
+                    conn.execute(f'DROP TABLE IF EXISTS "{staging_table}"')
+                    chunks = pd.read_csv(csv_path, chunksize=chunksize, dtype=str)
+                    rows = _insert_chunks(conn, staging_table, chunks, create=True)
+                    index_sqls = [row[0] for row in conn.execute(
+                        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                        (table_name,),
+                    )]
+                    conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+                    conn.execute(f'ALTER TABLE "{staging_table}" RENAME TO "{table_name}"')
 
+                    # Recreate the indexes the old table had (e.g. from the index advisor)
+                    for index_sql in index_sqls:
+                        conn.execute(index_sql)
+                    action = "rebuilt in" if table_name in existing_tables else "created in"
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+            manifest[table_name] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": file_hash,
+                                    "rows": rows, "version": (entry or {}).get("version", 0) + 1}
+            logger.info("Table '%s' has been %s the database (%s rows).", table_name, action, rows)
+
+        _save_manifest(manifest_path, manifest)
     return engine
+
+
+def connect_read_only_sqldb(db_path: str):
+    """
+    Connect to a database ingested elsewhere (e.g. a shared copy written by another node) without ingesting.
+
+    Args:
+        db_path (str): Path to the SQLite database file.
+
+    Returns:
+        sqlalchemy.engine.Engine: SQLAlchemy engine opening read-only connections.
+
+    Raises:
+        FileNotFoundError: If the database has not been ingested yet.
+    """
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"Read-only database not found: {db_path}")
+    engine = create_engine(f"sqlite:///file:{db_path}?mode=ro&uri=true")
+    logger.info("Connected to the read-only SQL database: %s", engine)
+    return engine
+
+
+# ============================ Database Version Functions ============================
+def get_database_version(db_path: str) -> tuple:
+    """
+    Return a cheap fingerprint of the SQLite database that changes whenever a table is written.
+
+    Args:
+        db_path (str): Path to the SQLite database file.
+
+    Returns:
+        tuple: (mtime, size) stamps of the database file and its write-ahead log.
+    """
+    stamps = []
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            stat = os.stat(path)
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            stamps.append(None)
+    return tuple(stamps)
+
+
+_table_versions = {}  # manifest path -> ((mtime, size), versions)
+
+
+def get_table_versions(db_path: str) -> Dict[str, int]:
+    """
+    Return the data version of every table, bumped by ingestion whenever a table is (re)loaded.
+
+    The manifest is re-read only when its file changes.
+
+    Args:
+        db_path (str): Path to the SQLite database file.
+
+    Returns:
+        Dict[str, int]: Version per lower-cased table name.
+    """
+    manifest_path = get_manifest_path(db_path)
+    try:
+        stat = os.stat(manifest_path)
+    except FileNotFoundError:
+        return {}
+
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _table_versions.get(manifest_path)
+    if cached is None or cached[0] != stamp:
+        versions = {t.lower(): entry.get("version", 1) for t, entry in _load_manifest(manifest_path).items()}
+        cached = _table_versions[manifest_path] = (stamp, versions)
+    return cached[1]
+
+
+# ============================ Table Description Functions ============================
+def load_table_descriptions(dir_path: str) -> Dict[str, dict]:
+    """
+    Load the description file kept next to each CSV (`<table>.yml` beside `<table>.csv`).
+
+    A description file holds a `description` of the table and a `columns` mapping of
+    column name to description; both are optional.
+
+    Args:
+        dir_path (str): Path to the directory containing the CSV and description files.
+
+    Returns:
+        Dict[str, dict]: `{"description": str, "columns": {column: description}}` per table name.
+    """
+    descriptions = {}
+    for file in os.listdir(dir_path):
+        table_name, extension = os.path.splitext(file)
+        if extension not in (".yml", ".yaml"):
+            continue
+        with open(os.path.join(dir_path, file), "r") as description_file:
+            content = yaml.safe_load(description_file) or {}
+        descriptions[table_name] = {
+            "description": (content.get("description") or "").strip(),
+            "columns": {str(column): (column_description or "").strip()
+                        for column, column_description in (content.get("columns") or {}).items()},
+        }
+    return descriptions
+
+
+# ============================ Index Utility Functions ============================
+def load_or_build_schema_index(
+    nodes: List[TextNode],
+    persist_dir: str,
+    embed_model: BaseEmbedding,
+    persist: bool = True,
+) -> VectorStoreIndex:
+    """
+    Load the schema vector index from disk, re-embedding only nodes whose content changed.
+
+    Args:
+        nodes (List[TextNode]): Table and column description nodes with stable ids.
+        persist_dir (str): Directory the index and its content hashes are stored in.
+        embed_model (BaseEmbedding): Embedding model used for new or changed nodes.
+        persist (bool): Write the updated index back; False for a read-only shared copy.
+
+    Returns:
+        VectorStoreIndex: Vector index over the nodes.
+    """
+    hashes_path = os.path.join(persist_dir, "node_hashes.json")
+    embed_model_name = embed_model.model_name
+
+    content_hashes = {}
+    for node in nodes:
+        content = f"{embed_model_name}\n{node.get_content(metadata_mode=MetadataMode.EMBED)}"
+        content_hashes[node.id_] = hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    stored_hashes = {}
+    if os.path.exists(hashes_path):
+        with open(hashes_path, "r") as file:
+            stored_hashes = json.load(file)
+
+    if stored_hashes:
+        # Load the persisted index and re-embed only new, changed or removed nodes
+        storage_context = StorageContext.from_defaults(persist_dir=persist_dir)
+        index = load_index_from_storage(storage_context, embed_model=embed_model)
+
+        stale_ids = [n for n, h in stored_hashes.items() if content_hashes.get(n) != h]
+        new_nodes = [node for node in nodes if stored_hashes.get(node.id_) != content_hashes[node.id_]]
+        if stale_ids:
+            index.delete_nodes(stale_ids, delete_from_docstore=True)
+            for node_id in stale_ids:
+                index.index_struct.delete(node_id)
+        if new_nodes:
+            index.insert_nodes(new_nodes)
+        index.storage_context.index_store.add_index_struct(index.index_struct)
+        logger.info("Loaded schema index from %s, re-embedded %d nodes", persist_dir, len(new_nodes))
+    else:
+        # Embed every node and create the index from scratch
+        index = VectorStoreIndex(nodes, embed_model=embed_model)
+        new_nodes = nodes
+        logger.info("Built schema index with %d nodes", len(nodes))
+
+    if persist and (new_nodes or stored_hashes != content_hashes):
+        index.storage_context.persist(persist_dir=persist_dir)
+        with open(hashes_path, "w") as file:
+            json.dump(content_hashes, file, indent=2)
+
+    return index
@@ -0,0 +1,100 @@
+// ============================ Text2SQL Streaming Client ============================
+// Posts the question to /run_api/stream and renders server-sent events as they arrive:
+// stage progress (tables, sql, rows), then the answer token by token.
+
+const form = document.getElementById("query-form");
+const queryInput = document.getElementById("query-input");
+const submitButton = document.getElementById("submit-button");
+const progressList = document.getElementById("progress");
+const sqlQueryBlock = document.getElementById("sql-query");
+const answerBlock = document.getElementById("answer");
+
+function addProgress(text) {
+    const item = document.createElement("li");
+    item.textContent = text;
+    progressList.appendChild(item);
+}
+
+function handleEvent(event, payload) {
+    switch (event) {
+        case "tables":
+            addProgress(`Tables retrieved: ${payload.tables.join(", ") || "none"}`);
+            break;
+        case "sql":
+            addProgress("SQL generated");
+            sqlQueryBlock.textContent = payload.sql_query;
+            sqlQueryBlock.hidden = false;
+            break;
+        case "rows":
+            addProgress(`Rows fetched: ${payload.row_count}`);
+            break;
+        case "token":
+            answerBlock.textContent += payload.text;
+            break;
+        case "done":
+            answerBlock.textContent = payload.message;
+            break;
+        case "error":
+            addProgress(`Error: ${payload.message}`);
+            break;
+    }
+}
+
+// Split an SSE buffer into complete events, returning the unfinished remainder
+function parseEvents(buffer) {
+    const blocks = buffer.split("\n\n");
+    const remainder = blocks.pop();
+
+    for (const block of blocks) {
+        let event = "message";
+        let data = "";
+        for (const line of block.split("\n")) {
+            if (line.startsWith("event: ")) event = line.slice(7);
+            else if (line.startsWith("data: ")) data += line.slice(6);
+        }
+        if (data) handleEvent(event, JSON.parse(data));
+    }
+    return remainder;
+}
+
+async function askQuestion(query) {
+    const response = await fetch("/run_api/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ query }),
+    });
+
+    if (!response.ok) {
+        addProgress(`Request failed: ${response.status}`);
+        return;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer = parseEvents(buffer + decoder.decode(value, { stream: true }));
+    }
+}
+
+form.addEventListener("submit", async (e) => {
+    e.preventDefault();
+    const query = queryInput.value.trim();
+    if (!query) return;
+
+    progressList.innerHTML = "";
+    sqlQueryBlock.hidden = true;
+    answerBlock.textContent = "";
+    submitButton.disabled = true;
+
+    try {
+        await askQuestion(query);
+    } catch (err) {
+        addProgress(`Error: ${err.message}`);
+    } finally {
+        submitButton.disabled = false;
+    }
+});
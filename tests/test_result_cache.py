@@ -0,0 +1,74 @@
+import pytest
+import sqlglot
+
+from src.result_cache import ColumnarResult, ResultCache
+from src.sql_validator import is_aggregate, referenced_tables
+
+SALES_SQL = "SELECT Employee_Name FROM HR_Dataset WHERE Department = 'Sales'"
+COUNT_SQL = "SELECT COUNT(*) FROM HR_Dataset"
+
+
+@pytest.fixture
+def versions():
+    """Current data version of every table, as the ingestion manifest reports it"""
+    return {"hr_dataset": 1, "projects": 1}
+
+
+def test_result_is_served_until_its_table_is_reingested(versions):
+    cache = ResultCache(version_fn=lambda: versions)
+    cache.put(SALES_SQL, f"{SALES_SQL} LIMIT 1000", ["hr_dataset"], ["Employee_Name"], [("Ann",), ("Bob",)])
+
+    # Whitespace and a trailing semicolon do not change the key
+    assert cache.get(f"  {SALES_SQL};") == (f"{SALES_SQL} LIMIT 1000", ["Employee_Name"], [("Ann",), ("Bob",)])
+
+    versions["projects"] = 2
+    assert cache.get(SALES_SQL) is not None
+
+    versions["hr_dataset"] = 2
+    assert cache.get(SALES_SQL) is None
+    assert cache.get(SALES_SQL) is None
+
+
+def test_least_recently_used_result_is_evicted(versions):
+    cache = ResultCache(version_fn=lambda: versions, max_entries=2)
+    cache.put("SELECT 'a'", "SELECT 'a'", [], ["value"], [("a",)])
+    cache.put("SELECT 'b'", "SELECT 'b'", [], ["value"], [("b",)])
+    cache.get("SELECT 'a'")
+    cache.put("SELECT 'c'", "SELECT 'c'", [], ["value"], [("c",)])
+
+    assert cache.get("SELECT 'a'") is not None
+    assert cache.get("SELECT 'b'") is None
+    assert cache.get("SELECT 'c'") is not None
+
+
+def test_hot_aggregate_is_materialized_until_its_table_is_reingested(versions, tmp_path):
+    summary_db_path = str(tmp_path / "Summary.db")
+    cache = ResultCache(version_fn=lambda: versions, summary_db_path=summary_db_path, promote_after=2)
+    cache.put(COUNT_SQL, COUNT_SQL, ["hr_dataset"], ["COUNT(*)"], [(311,)], aggregate=True)
+    cache.get(COUNT_SQL)
+
+    # Another process (or a restart) finds the summary table
+    restarted = ResultCache(version_fn=lambda: versions, summary_db_path=summary_db_path, promote_after=2)
+    assert restarted.get(COUNT_SQL) == (COUNT_SQL, ["COUNT(*)"], [(311,)])
+
+    versions["hr_dataset"] = 2
+    restarted = ResultCache(version_fn=lambda: versions, summary_db_path=summary_db_path, promote_after=2)
+    assert restarted.get(COUNT_SQL) is None
+
+
+def test_columnar_result_round_trips_rows():
+    rows = [(1, 1.5, "a", None), (2, 2.5, "b", 3)]
+    result = ColumnarResult.from_rows(["id", "score", "name", "mixed"], rows)
+
+    assert result.arrays[0].dtype.kind == "i" and result.arrays[1].dtype.kind == "f"
+    assert result.to_rows() == rows
+    assert ColumnarResult.from_rows([], [(), ()]).to_rows() == [(), ()]
+
+
+def test_cache_key_tables_and_aggregates_of_a_query():
+    tree = sqlglot.parse_one(
+        "WITH sales AS (SELECT * FROM HR_Dataset) SELECT COUNT(*) FROM sales JOIN Projects USING (EmpID)", read="sqlite"
+    )
+    assert referenced_tables(tree) == ["hr_dataset", "projects"]
+    assert is_aggregate(tree)
+    assert not is_aggregate(sqlglot.parse_one(SALES_SQL, read="sqlite"))
@@ -0,0 +1,40 @@
+import pytest
+
+from src.result_renderer import add_row_limit
+
+
+@pytest.mark.parametrize("sql_query, expected", [
+    ("SELECT Employee_Name FROM HR_Dataset", "SELECT Employee_Name FROM HR_Dataset LIMIT 100"),
+    # The query is kept as written, e.g. functions sqlglot would rename
+    ("SELECT substr(Employee_Name, 1, 3) FROM HR_Dataset",
+     "SELECT substr(Employee_Name, 1, 3) FROM HR_Dataset LIMIT 100"),
+    # Aggregates in a subquery or window function do not aggregate the outer rows
+    ("SELECT Employee_Name FROM HR_Dataset WHERE Salary > (SELECT AVG(Salary) FROM HR_Dataset)",
+     "SELECT Employee_Name FROM HR_Dataset WHERE Salary > (SELECT AVG(Salary) FROM HR_Dataset) LIMIT 100"),
+    ("SELECT Employee_Name, COUNT(*) OVER () FROM HR_Dataset",
+     "SELECT Employee_Name, COUNT(*) OVER () FROM HR_Dataset LIMIT 100"),
+    ("WITH sales AS (SELECT * FROM HR_Dataset WHERE Department = 'Sales') SELECT Employee_Name FROM sales",
+     "WITH sales AS (SELECT * FROM HR_Dataset WHERE Department = 'Sales') SELECT Employee_Name FROM sales LIMIT 100"),
+    # A trailing semicolon or comment would swallow the LIMIT
+    ("SELECT Employee_Name FROM HR_Dataset;", "SELECT Employee_Name FROM HR_Dataset LIMIT 100"),
+    ("SELECT Employee_Name FROM HR_Dataset -- all employees", "SELECT Employee_Name FROM HR_Dataset LIMIT 100"),
+])
+def test_row_limit_is_appended_to_plain_selects(sql_query, expected):
+    assert add_row_limit(sql_query, 100) == expected
+
+
+@pytest.mark.parametrize("sql_query", [
+    "SELECT COUNT(*) FROM HR_Dataset",
+    "SELECT Department, AVG(Salary) FROM HR_Dataset GROUP BY Department",
+    "SELECT Department FROM HR_Dataset GROUP BY Department HAVING COUNT(*) > 5",
+    "SELECT MAX(Salary) FROM (SELECT Salary FROM HR_Dataset WHERE Department = 'Sales')",
+    "SELECT Employee_Name FROM HR_Dataset LIMIT 5",
+    "SELECT Employee_Name FROM HR_Dataset UNION SELECT ManagerName FROM HR_Dataset",
+    "SELECT FROM WHERE",
+])
+def test_aggregates_limited_and_unparsable_queries_are_unchanged(sql_query):
+    assert add_row_limit(sql_query, 100) == sql_query
+
+
+def test_zero_limit_disables_the_rewrite():
+    assert add_row_limit("SELECT Employee_Name FROM HR_Dataset", 0) == "SELECT Employee_Name FROM HR_Dataset"
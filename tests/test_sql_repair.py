@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src import pipeline_modules
+from src.pipeline_modules import FAILED_QUERY_REPLY, build_direct_answer, execute_sql_query, repair_sql_query
+from src.run_api import format_pipeline_response
+
+QUESTION = "What is the highest salary?"
+SCHEMA = "Table 'HR_Dataset' has columns: Salary (FLOAT)"
+GOOD_SQL = "SELECT MAX(Salary) FROM HR_Dataset"
+
+
+class FakeSQLQueryCache:
+    """Records the fixes and discards the repair loop makes"""
+
+    def __init__(self, fixes=None):
+        self.fixes = dict(fixes or {})
+        self.answers = {}
+        self.discarded = []
+
+    def get_fix(self, query_str, sql_query, schema):
+        return self.fixes.get((query_str, sql_query, schema))
+
+    def put_fix(self, query_str, sql_query, schema, fixed_sql):
+        self.fixes[(query_str, sql_query, schema)] = fixed_sql
+
+    def put(self, query_str, schema, sql_query):
+        self.answers[(query_str, schema)] = sql_query
+
+    def discard(self, sql_query):
+        self.discarded.append(sql_query)
+
+
+@pytest.fixture
+def app_context(monkeypatch):
+    """App context whose database only runs GOOD_SQL"""
+    context = SimpleNamespace(
+        config={"sql_repair": {"enabled": True, "max_attempts": 2, "latency_budget_seconds": 10}, "response": {}},
+        sql_query_cache=FakeSQLQueryCache(),
+        llm=None,
+    )
+
+    def run_sql_query(sql_query):
+        if sql_query != GOOD_SQL:
+            raise ValueError(f"no such column in: {sql_query}")
+        return [SimpleNamespace(metadata={"sql_query": sql_query})]
+
+    monkeypatch.setattr(pipeline_modules, "get_app_context", lambda: context)
+    monkeypatch.setattr(pipeline_modules, "_run_sql_query", run_sql_query)
+    return context
+
+
+def script_repairs(monkeypatch, corrections):
+    """Answer each repair request with the next scripted correction; returns the failed SQL of each request."""
+    corrections = iter(corrections)
+    requests = []
+
+    def repair(query_str, schema, sql_query, error):
+        requests.append(sql_query)
+        return next(corrections)
+
+    monkeypatch.setattr(pipeline_modules, "repair_sql_query", repair)
+    return requests
+
+
+def test_failed_query_is_corrected_and_the_fix_cached(app_context, monkeypatch):
+    requests = script_repairs(monkeypatch, [GOOD_SQL])
+
+    data = execute_sql_query("SELECT MAX(Salry) FROM HR_Dataset", QUESTION, SCHEMA)
+
+    assert data[0].metadata == {"sql_query": GOOD_SQL, "repaired_from": "SELECT MAX(Salry) FROM HR_Dataset"}
+    assert requests == ["SELECT MAX(Salry) FROM HR_Dataset"]
+    cache = app_context.sql_query_cache
+    assert cache.discarded == ["SELECT MAX(Salry) FROM HR_Dataset"]
+    assert cache.fixes == {(QUESTION, "SELECT MAX(Salry) FROM HR_Dataset", SCHEMA): GOOD_SQL}
+    assert cache.answers == {(QUESTION, SCHEMA): GOOD_SQL}
+
+
+def test_every_query_of_a_correction_chain_is_mapped_to_the_fix(app_context, monkeypatch):
+    requests = script_repairs(monkeypatch, ["SELECT MAX(Salary) FROM HR", GOOD_SQL])
+
+    data = execute_sql_query("SELECT MAX(Salry) FROM HR", QUESTION, SCHEMA)
+
+    assert data[0].metadata["repaired_from"] == "SELECT MAX(Salry) FROM HR"
+    assert requests == ["SELECT MAX(Salry) FROM HR", "SELECT MAX(Salary) FROM HR"]
+    assert app_context.sql_query_cache.fixes == {
+        (QUESTION, "SELECT MAX(Salry) FROM HR", SCHEMA): GOOD_SQL,
+        (QUESTION, "SELECT MAX(Salary) FROM HR", SCHEMA): GOOD_SQL,
+    }
+
+
+def test_repairs_stop_after_the_attempt_budget(app_context, monkeypatch):
+    requests = script_repairs(monkeypatch, ["SELECT 1 FROM a", "SELECT 1 FROM b", GOOD_SQL])
+
+    assert execute_sql_query("SELECT 1 FROM x", QUESTION, SCHEMA) is None
+    assert len(requests) == 2
+    assert app_context.sql_query_cache.fixes == {}
+
+
+@pytest.mark.parametrize("correction", ["SELECT 1 FROM x", "", "None"])
+def test_repairs_stop_when_the_llm_repeats_itself_or_gives_up(app_context, monkeypatch, correction):
+    requests = script_repairs(monkeypatch, [correction, GOOD_SQL])
+
+    assert execute_sql_query("SELECT 1 FROM x", QUESTION, SCHEMA) is None
+    assert len(requests) == 1
+
+
+def test_no_repair_without_the_question_or_when_disabled(app_context, monkeypatch):
+    requests = script_repairs(monkeypatch, [GOOD_SQL, GOOD_SQL])
+
+    assert execute_sql_query("SELECT 1 FROM x") is None
+    app_context.config["sql_repair"]["enabled"] = False
+    assert execute_sql_query("SELECT 1 FROM x", QUESTION, SCHEMA) is None
+    assert requests == []
+
+
+def test_known_fix_is_reused_without_asking_the_llm(app_context):
+    app_context.sql_query_cache.fixes[(QUESTION, "SELECT 1 FROM x", SCHEMA)] = GOOD_SQL
+
+    # The context has no LLM, so any request to it would fail
+    assert repair_sql_query(QUESTION, SCHEMA, "SELECT 1 FROM x", "no such table: x") == GOOD_SQL
+
+
+def test_query_that_could_not_be_repaired_gets_the_fixed_reply_flagged_as_failed(app_context):
+    result = format_pipeline_response(build_direct_answer("SELECT 1 FROM x", None))
+
+    # The flag keeps the reply out of the answer cache and without an ETag
+    assert result == {"message": FAILED_QUERY_REPLY, "failed": True}
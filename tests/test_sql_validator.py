@@ -0,0 +1,64 @@
+import pytest
+
+from src.sql_validator import SQLValidationError, SQLValidator
+
+
+class StubSchemaContextCache:
+    """Schema of the validated tables, as the SchemaContextCache reports it"""
+
+    def table_columns(self):
+        return {"HR_Dataset": ["EmpID", "Employee_Name", "Department", "Salary", "ManagerID"]}
+
+    def row_counts(self):
+        return {"HR_Dataset": 20_000}
+
+
+def full_scan_plan(sql_query):
+    """EXPLAIN QUERY PLAN rows of a self cross join: two nested full scans"""
+    return [(2, 0, "SCAN a"), (3, 0, "SCAN b")]
+
+
+@pytest.fixture
+def validator():
+    return SQLValidator(StubSchemaContextCache())
+
+
+@pytest.mark.parametrize("sql_query", [
+    "SELECT Employee_Name FROM HR_Dataset WHERE Salary > 50000",
+    # SQLite resolves names case-insensitively
+    "select employee_name from hr_dataset where DEPARTMENT = 'Sales'",
+    "SELECT h.Employee_Name AS name FROM HR_Dataset AS h ORDER BY name",
+    "WITH sales AS (SELECT * FROM HR_Dataset WHERE Department = 'Sales') SELECT EmpID FROM sales",
+    "SELECT rowid, EmpID FROM HR_Dataset",
+    "SELECT Department, COUNT(*) AS employees FROM HR_Dataset GROUP BY Department HAVING employees > 5",
+    "SELECT EmpID FROM HR_Dataset UNION SELECT ManagerID FROM HR_Dataset",
+])
+def test_read_only_queries_on_known_columns_are_accepted(validator, sql_query):
+    validator.validate(sql_query)
+
+
+@pytest.mark.parametrize("sql_query, message", [
+    ("DELETE FROM HR_Dataset", "Only SELECT queries are allowed"),
+    ("DROP TABLE HR_Dataset", "Only SELECT queries are allowed"),
+    ("SELECT 1; DELETE FROM HR_Dataset", "Expected a single SQL statement"),
+    ("SELECT Employee_Name FROM Employees", "no such table: Employees"),
+    ("SELECT Salry FROM HR_Dataset", "no such column: Salry"),
+    ("SELECT Employee_Name FROM HR_Dataset WHERE", "SQL syntax error"),
+])
+def test_unsafe_or_unknown_queries_are_rejected(validator, sql_query, message):
+    with pytest.raises(SQLValidationError, match=message):
+        validator.validate(sql_query)
+
+
+def test_schema_check_can_be_disabled():
+    SQLValidator(StubSchemaContextCache(), check_schema=False).validate("SELECT Salry FROM HR_Dataset")
+
+
+def test_plans_with_too_many_scanned_rows_are_rejected():
+    validator = SQLValidator(StubSchemaContextCache(), explain_fn=full_scan_plan, max_scan_rows=100_000_000)
+    sql_query = "SELECT a.EmpID FROM HR_Dataset AS a, HR_Dataset AS b"
+    with pytest.raises(SQLValidationError, match="cross join of full table scans over ~400,000,000 rows"):
+        validator.validate(sql_query)
+
+    SQLValidator(StubSchemaContextCache(), explain_fn=full_scan_plan, max_scan_rows=500_000_000).validate(sql_query)
+
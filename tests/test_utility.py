@@ -0,0 +1,63 @@
+import sqlite3
+
+from src.utility import create_sqldb_and_tables
+
+
+def write_csv(path, lines):
+    path.write_text("\n".join(lines) + "\n")
+
+
+def column_types(db_path, table_name):
+    with sqlite3.connect(db_path) as conn:
+        return {row[1]: row[2] for row in conn.execute(f'PRAGMA table_info("{table_name}")')}
+
+
+def fetch_rows(db_path, sql_query):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(sql_query).fetchall()
+
+
+def test_column_types_are_inferred_from_every_chunk(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    write_csv(data_dir / "People.csv", [
+        "Code,Amount,ManagerID,Active,Empty",
+        "007,1,10,True,",
+        "008,2,11,False,",
+        "A09,2.5,,true,",
+    ])
+    db_path = str(tmp_path / "Database.db")
+
+    create_sqldb_and_tables(str(data_dir), db_path, chunksize=2)
+
+    assert column_types(db_path, "People") == {
+        "Code": "TEXT",        # Numbers in the first chunk, text in the last
+        "Amount": "FLOAT",     # Integers, then a float
+        "ManagerID": "FLOAT",  # Integers with a missing value
+        "Active": "BOOLEAN",
+        "Empty": "FLOAT",
+    }
+    assert fetch_rows(db_path, 'SELECT Code, Amount, ManagerID, Active, Empty FROM "People"') == [
+        ("007", 1.0, 10.0, 1, None),
+        ("008", 2.0, 11.0, 0, None),
+        ("A09", 2.5, None, 1, None),
+    ]
+    assert fetch_rows(db_path, "SELECT name FROM sqlite_master WHERE name LIKE '%staging%' OR name LIKE '%untyped%'") == []
+
+
+def test_appended_rows_are_converted_to_the_existing_types(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    csv_path = data_dir / "People.csv"
+    write_csv(csv_path, ["Code,Amount,Active", "A01,1,True", "A02,2,False"])
+    db_path = str(tmp_path / "Database.db")
+    create_sqldb_and_tables(str(data_dir), db_path, chunksize=1)
+
+    with open(csv_path, "a") as file:
+        file.write("003,3,false\n004,,True\n")
+    create_sqldb_and_tables(str(data_dir), db_path, chunksize=1, mode="append")
+
+    assert column_types(db_path, "People") == {"Code": "TEXT", "Amount": "BIGINT", "Active": "BOOLEAN"}
+    assert fetch_rows(db_path, 'SELECT Code, Amount, Active FROM "People" ORDER BY rowid') == [
+        ("A01", 1, 1), ("A02", 2, 0), ("003", 3, 0), ("004", None, 1),
+    ]